@@ -1,5 +1,6 @@
 import functools
 import logging
+from typing import Optional
 from uuid import UUID
 
 from starlette.responses import Response
@@ -176,6 +177,10 @@ class PaginationQueryParams:
                  page_size: int = Query(default=settings.PAGE_SIZE,
                                         ge=settings.MIN_PAGE_SIZE,
                                         le=settings.MAX_PAGE_SIZE,
-                                        alias="size")) -> None:
+                                        alias="size"),
+                 cursor: Optional[str] = Query(default=None,
+                                               description="Keyset cursor returned as next_cursor, "
+                                                           "pass an empty value to start cursor pagination")) -> None:
         self.page = page
-        self.page_size = page_size
\ No newline at end of file
+        self.page_size = page_size
+        self.cursor = cursor
\ No newline at end of file
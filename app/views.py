@@ -10,6 +10,8 @@ from data.logger import create_logger
 from data.db import declare_database
 from data.cache import Cache, RedisConfig
 from data.rabbit import RabbitMQ, RabbitConfig
+from data.flight import flights
+from apps.intelligence import prefetch, token_snapshots, social_links, latest_tokens
 import settings
 from sqlalchemy import text
 
@@ -32,6 +34,27 @@ def on_init(app: FastAPI):
     async def _():
         return Text('pong')
 
+    @app.get('/stats', description="Worker cache and coalescing counters")
+    async def _(request: Request):
+        request = Request.from_request(request)
+        local = request.context.slavecache.local
+        touches = request.context.mastercache.touches
+        return Json({
+            "coalesced": {name: flight.stats() for name, flight in flights.items()},
+            "local_cache": local.stats() if local is not None else None,
+            "touches": touches.stats() if touches is not None else None,
+            "prefetch": prefetch.scheduler.stats(),
+            "token_snapshots": token_snapshots.snapshots.stats(),
+            "social_links": social_links.index.stats(),
+            "latest_tokens": latest_tokens.feed.stats(),
+        })
+
+    @app.get('/ready', description="Readiness check, ready once the startup cache warm-up has finished")
+    async def _(request: Request):
+        if not getattr(request.app.state, "ready", False):
+            return Json({"status": "warming"}, status_code=503)
+        return Json({"status": "ready"})
+
     @app.get('/health', description="Service health check")
     async def health_check():
         errors = []
@@ -0,0 +1,215 @@
+"""
+Redis counters of the intelligence list totals
+
+Each filter combination of the plain list query (type / social group, subtype, is_valuable) and each token
+(network, contract address) has a counter. A counter is seeded from Postgres on first use, the intelligence
+consumer then increments (or decrements on hide / delete) every seeded counter an intelligence matches, and a
+periodic reconciliation on one worker rewrites all counters in use from Postgres to correct drift. Only reads
+extend the TTL of a counter, so the counters nobody reads expire and leave the reconciliation.
+"""
+import json
+from typing import Optional, List, Dict, Any
+
+from fastapi import FastAPI
+from sqlalchemy import select, func, distinct
+
+from apps.intelligence import schemas, services, feed_index
+from apps.intelligence.models import IntelligenceModel, EntityIntelligenceModel, EntityModel, TokenChainDataModel
+from data import Context, create_logger
+from middleware import Request
+from middleware.lifespan import on_startup, run_on_one_worker
+import settings
+
+
+logger = create_logger("dogex-intelligence-counters")
+
+COUNTER_PREFIX = "aigun:intelligence:count"
+COUNTER_REGISTRY_KEY = f"{COUNTER_PREFIX}:registry"
+COUNTER_RECONCILE_LOCK_KEY = f"{COUNTER_PREFIX}:reconcile:lock"
+# Every valuable intelligence, hidden and deleted ones included, the token related count without a token
+VALUABLE_COUNTER_KEY = f"{COUNTER_PREFIX}:valuable:all"
+
+# Marks an intelligence as counted so redelivered messages are not counted twice
+COUNTED_MARKER_TTL = 86400 * 7
+
+# KEYS[1] counted marker, KEYS[2..] counters, ARGV[1] 1 to count / -1 to uncount, ARGV[2] marker ttl
+# Only seeded counters move, an unseeded counter is computed from Postgres on first read
+COUNT_SCRIPT = """
+local changed
+if ARGV[1] == "1" then
+    changed = redis.call("SET", KEYS[1], "1", "NX", "EX", ARGV[2])
+else
+    changed = redis.call("DEL", KEYS[1]) == 1
+end
+if not changed then
+    return 0
+end
+for i = 2, #KEYS do
+    if redis.call("EXISTS", KEYS[i]) == 1 then
+        redis.call("INCRBY", KEYS[i], ARGV[1])
+    end
+end
+return 1
+"""
+
+
+def filter_counter_key(type: Optional[str], subtype: Optional[str], is_valuable: Optional[bool]) -> str:
+    valuable = "*" if is_valuable is None else int(bool(is_valuable))
+    return f"{COUNTER_PREFIX}:type:{type or '*'}:subtype:{subtype or '*'}:valuable:{valuable}"
+
+
+def token_counter_key(network: str, address: str) -> str:
+    return f"{COUNTER_PREFIX}:token:{network}:{address}"
+
+
+def counted_marker_key(intelligence_id: Any) -> str:
+    return f"{COUNTER_PREFIX}:counted:{intelligence_id}"
+
+
+def valuable_marker_key(intelligence_id: Any) -> str:
+    return f"{COUNTER_PREFIX}:counted_valuable:{intelligence_id}"
+
+
+def matching_counter_keys(intelligence: Dict[str, Any]) -> List[str]:
+    """All counter keys an intelligence message contributes to"""
+    keys = [
+        filter_counter_key(*combination)
+        for combination in feed_index.matching_filter_combinations(
+            intelligence.get("type"), intelligence.get("subtype"), intelligence.get("is_valuable")
+        )
+    ]
+
+    # Token related counts only cover valuable intelligence
+    if intelligence.get("is_valuable"):
+        tokens = {
+            (entity.get("network"), entity.get("contractAddress"))
+            for entity in intelligence.get("entities") or []
+            if entity.get("network") and entity.get("contractAddress")
+        }
+        keys.extend(token_counter_key(network, address) for network, address in sorted(tokens))
+
+    return keys
+
+
+async def count_intelligence(master_cache: Any, intelligence: Dict[str, Any]) -> None:
+    """Count a published intelligence once, or uncount it when it is hidden / deleted"""
+    if not intelligence.get("id"):
+        return
+
+    hidden = not feed_index.is_listed(intelligence)
+    keys = [counted_marker_key(intelligence["id"])] + matching_counter_keys(intelligence)
+    await master_cache.eval(COUNT_SCRIPT, len(keys), *keys, -1 if hidden else 1, COUNTED_MARKER_TTL)
+
+    if intelligence.get("is_valuable"):
+        # Counted once whatever its visibility, hiding or deleting it does not uncount it
+        await master_cache.eval(
+            COUNT_SCRIPT, 2, valuable_marker_key(intelligence["id"]), VALUABLE_COUNTER_KEY, 1, COUNTED_MARKER_TTL
+        )
+
+
+async def _count_from_database(session: Any, spec: Dict[str, Any]) -> int:
+    """Exact count of one counter from Postgres"""
+    visible = [IntelligenceModel.is_deleted == False, IntelligenceModel.is_visible == True]
+
+    if spec["kind"] == "valuable":
+        sql = select(func.count(IntelligenceModel.id)).where(IntelligenceModel.is_valuable == True)
+    elif spec["kind"] == "token":
+        sql = select(
+            func.count(distinct(IntelligenceModel.id))
+        ).join(
+            IntelligenceModel.entity_intelligences
+        ).join(
+            EntityIntelligenceModel.entity
+        ).join(
+            EntityModel.tokendata_entity
+        ).where(
+            *visible,
+            IntelligenceModel.is_valuable == True,
+            TokenChainDataModel.contract_address == spec["address"],
+            TokenChainDataModel.network == spec["network"]
+        )
+    else:
+        query_params = schemas.IntelligenceQueryParams(
+            type=spec["type"], subtype=spec["subtype"], is_valuable=spec["is_valuable"]
+        )
+        sql = select(func.count(IntelligenceModel.id)).where(*visible, *services._build_filters(query_params))
+
+    return (await session.execute(sql)).scalar() or 0
+
+
+async def _get_count(request: Request, key: str, spec: Dict[str, Any]) -> int:
+    """One GET on a hit (its TTL touched), otherwise seed the counter from Postgres and register it for reconciliation"""
+    cached = await request.context.slavecache.backend.get(key)
+    if cached is not None:
+        await request.context.mastercache.touch(key, settings.EXPIRES_FOR_INTELLIGENCE_COUNTER)
+        return max(int(cached), 0)
+
+    async with request.context.database.dogex() as session:
+        total = await _count_from_database(session, spec)
+
+    pipe = request.context.mastercache.backend.pipeline(transaction=False)
+    pipe.set(key, total, ex=settings.EXPIRES_FOR_INTELLIGENCE_COUNTER, nx=True)
+    pipe.hset(COUNTER_REGISTRY_KEY, key, json.dumps(spec))
+    await pipe.execute()
+    return total
+
+
+async def get_list_count(request: Request, query_params: schemas.IntelligenceQueryParams) -> Optional[int]:
+    """Total of the list query from its counter, None when the query uses filters that have no counter"""
+    if any(getattr(query_params, name, None) for name in feed_index.UNINDEXED_PARAMS):
+        return None
+
+    spec = {
+        "kind": "filter",
+        "type": query_params.type,
+        "subtype": query_params.subtype,
+        "is_valuable": query_params.is_valuable,
+    }
+    return await _get_count(request, filter_counter_key(query_params.type, query_params.subtype, query_params.is_valuable), spec)
+
+
+async def get_token_count(request: Request, network: Optional[str], address: Optional[str]) -> int:
+    """Number of valuable intelligence related to a token, every valuable intelligence without a token"""
+    if address is None or network is None:
+        return await _get_count(request, VALUABLE_COUNTER_KEY, {"kind": "valuable"})
+
+    spec = {"kind": "token", "network": network, "address": address}
+    return await _get_count(request, token_counter_key(network, address), spec)
+
+
+async def reconcile_counters(context: Context) -> int:
+    """Rewrite every counter in use from Postgres, counters that expired unused are dropped from the registry"""
+    master_cache = context.mastercache.backend
+    registry = await master_cache.hgetall(COUNTER_REGISTRY_KEY)
+
+    reconciled = 0
+    async with context.database.dogex() as session:
+        for key, spec in registry.items():
+            key = key.decode("utf-8")
+            if not await master_cache.exists(key):
+                await master_cache.hdel(COUNTER_REGISTRY_KEY, key)
+                continue
+
+            total = await _count_from_database(session, json.loads(spec))
+            # The TTL is left to the reads, an unread counter expires and is dropped from the registry
+            await master_cache.set(key, total, xx=True, keepttl=True)
+            reconciled += 1
+
+    return reconciled
+
+
+@on_startup
+async def reconcile_counters_periodically(app: FastAPI):
+    """Reconcile the counters every INTELLIGENCE_COUNTER_RECONCILE_INTERVAL seconds on one worker"""
+    if not isinstance(app, FastAPI):
+        return
+
+    context: Context = app.state.context
+
+    async def reconcile() -> None:
+        reconciled = await reconcile_counters(context)
+        logger.info(f"Reconciled {reconciled} intelligence counters")
+
+    await run_on_one_worker(
+        context, COUNTER_RECONCILE_LOCK_KEY, settings.INTELLIGENCE_COUNTER_RECONCILE_INTERVAL, reconcile, delay=True
+    )
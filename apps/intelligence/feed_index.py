@@ -0,0 +1,314 @@
+"""
+Redis sorted-set index of the intelligence feed
+
+Every filter combination of the plain list query (type / social group, subtype, is_valuable) has its own
+sorted set of intelligence ids scored by published_at. The intelligence consumer adds each new item to all
+sets it matches, and head pages of the list are served with a ZREVRANGE plus one MGET of rendered items.
+Every rendered item is stored with a version (the hash of its bytes), so the ETag of a page is known from its
+ids, total and item versions without reading or rendering the items.
+
+Backfill: python -m apps.intelligence.feed_index
+"""
+import json
+from itertools import product
+from typing import Optional, List, Dict, Any
+
+from fastapi import FastAPI
+from sqlalchemy import select
+
+from apps.intelligence import schemas, services, counters
+from apps.intelligence.models import IntelligenceModel
+from apps.websocket import services as ws_services
+from data import Context, Cache, create_logger
+from middleware import Request
+from middleware.lifespan import on_startup, run_command
+from views.render import JsonResponseEncoder, make_etag
+import settings
+
+
+logger = create_logger("dogex-intelligence-feed-index")
+
+FEED_INDEX_PREFIX = "aigun:intelligence:feed"
+FEED_INDEX_READY_KEY = f"{FEED_INDEX_PREFIX}:ready"
+FEED_INDEX_LOCK_KEY = f"{FEED_INDEX_PREFIX}:backfill:lock"
+
+# Query parameters the index cannot answer, any of them set falls back to SQL
+UNINDEXED_PARAMS = ("address", "chain_name", "key_word", "influence_level")
+
+
+def feed_item_key(intelligence_id: Any) -> str:
+    return f"{FEED_INDEX_PREFIX}:item:{intelligence_id}"
+
+
+def feed_item_version_key(intelligence_id: Any) -> str:
+    return f"{FEED_INDEX_PREFIX}:item:{intelligence_id}:version"
+
+
+def feed_page_etag(versions: List[str], total: int, page: int, page_size: int) -> str:
+    """ETag of a feed index page, derived from what it is rendered from instead of its body"""
+    return make_etag(json.dumps([versions, total, page, page_size]).encode("utf-8"))
+
+
+def feed_index_key(type: Optional[str], subtype: Optional[str], is_valuable: Optional[bool]) -> str:
+    """Sorted set key of one filter combination, '*' stands for an unset filter"""
+    valuable = "*" if is_valuable is None else int(bool(is_valuable))
+    return f"{FEED_INDEX_PREFIX}:type:{type or '*'}:subtype:{subtype or '*'}:valuable:{valuable}"
+
+
+def matching_filter_combinations(type: Optional[str], subtype: Optional[str], is_valuable: Optional[bool]) -> List[tuple]:
+    """All (type, subtype, is_valuable) filter combinations an intelligence with the given attributes matches"""
+    types = [None]
+    if type:
+        types.append(type)
+        if type in services.SOCIAL_INTELLIGENCE_TYPES:
+            types.append("social")
+    subtypes = [None, subtype] if subtype else [None]
+    valuables = [None, bool(is_valuable)] if is_valuable is not None else [None]
+
+    return list(product(types, subtypes, valuables))
+
+
+def matching_index_keys(type: Optional[str], subtype: Optional[str], is_valuable: Optional[bool]) -> List[str]:
+    """All sorted set keys whose filter combination matches an intelligence with the given attributes"""
+    return [feed_index_key(*combination) for combination in matching_filter_combinations(type, subtype, is_valuable)]
+
+
+def index_key_for_query(query_params: schemas.IntelligenceQueryParams) -> Optional[str]:
+    """Sorted set key answering the query, None when the query uses filters the index does not cover"""
+    if any(getattr(query_params, name, None) for name in UNINDEXED_PARAMS):
+        return None
+    return feed_index_key(query_params.type, query_params.subtype, query_params.is_valuable)
+
+
+def is_listed(intelligence: Dict[str, Any]) -> bool:
+    """Whether the list query returns the intelligence, the same is_deleted / is_visible filters as its SQL"""
+    return not intelligence.get("is_deleted") and intelligence.get("is_visible") is True
+
+
+async def with_visibility(context: Context, intelligence: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The message with is_visible / is_deleted read from Postgres when it does not carry is_visible
+
+    Without it the message is not listed, as an unknown visibility would index ids the list never renders.
+    """
+    if "is_visible" in intelligence or not intelligence.get("id"):
+        return intelligence
+
+    async with context.database.dogex() as session:
+        row = (await session.execute(
+            select(IntelligenceModel.is_visible, IntelligenceModel.is_deleted).where(IntelligenceModel.id == intelligence["id"])
+        )).first()
+
+    if row is None:
+        return intelligence
+    return {**intelligence, "is_visible": row.is_visible, "is_deleted": row.is_deleted}
+
+
+def _queue_index_commands(pipe: Any, intelligence: Dict[str, Any]) -> None:
+    """Queue the sorted set updates of one intelligence on a pipeline"""
+    published_at = ws_services._parse_datetime(intelligence.get("published_at"))
+    if not intelligence.get("id") or published_at is None:
+        return
+
+    intelligence_id = str(intelligence["id"])
+    keys = matching_index_keys(intelligence.get("type"), intelligence.get("subtype"), intelligence.get("is_valuable"))
+
+    if not is_listed(intelligence):
+        for key in keys:
+            pipe.zrem(key, intelligence_id)
+        pipe.delete(feed_item_key(intelligence_id), feed_item_version_key(intelligence_id))
+        return
+
+    for key in keys:
+        pipe.zadd(key, {intelligence_id: published_at.timestamp()})
+        pipe.zremrangebyrank(key, 0, -(settings.FEED_INDEX_MAX_LENGTH + 1))
+
+
+async def index_intelligence(master_cache: Cache, intelligence: Dict[str, Any]) -> None:
+    """
+    Add a published intelligence to every matching sorted set (or remove it once hidden / deleted)
+    """
+    pipe = master_cache.backend.pipeline(transaction=False)
+    _queue_index_commands(pipe, intelligence)
+    await pipe.execute()
+
+    # Workers may still hold the rendered item in memory
+    if intelligence.get("id") and not is_listed(intelligence):
+        await master_cache.invalidate(feed_item_key(intelligence["id"]), feed_item_version_key(intelligence["id"]))
+
+
+def covers_page(query_params: schemas.IntelligenceQueryParams, page: int, page_size: int) -> bool:
+    """Whether the index answers the page once backfilled, the page cache is never read for it then"""
+    return index_key_for_query(query_params) is not None and page * page_size - 1 < settings.FEED_INDEX_MAX_LENGTH
+
+
+async def get_feed_index_ids(request: Request, query_params: schemas.IntelligenceQueryParams, page: int, page_size: int) -> Optional[tuple[List[str], int]]:
+    """
+    Ids and total of a head page of the intelligence list from the sorted set index
+
+    Returns None when the page cannot be answered by the index (unindexed filter, index not backfilled,
+    or page beyond the indexed head), the caller then falls back to the SQL path.
+    """
+    if not covers_page(query_params, page, page_size):
+        return None
+
+    key = index_key_for_query(query_params)
+    start = (page - 1) * page_size
+    end = start + page_size - 1
+
+    slave_cache = request.context.slavecache.backend
+    pipe = slave_cache.pipeline(transaction=False)
+    pipe.exists(FEED_INDEX_READY_KEY)
+    pipe.zrevrange(key, start, end)
+    pipe.zcard(key)
+    ready, ids, indexed_count = await pipe.execute()
+    if not ready:
+        return None
+
+    # A set shorter than the cap holds every matching intelligence, so its size is the exact total
+    if indexed_count < settings.FEED_INDEX_MAX_LENGTH:
+        total = indexed_count
+    else:
+        total = await counters.get_list_count(request, query_params)
+
+    return [intelligence_id.decode("utf-8") for intelligence_id in ids], total
+
+
+async def get_feed_page_etag(request: Request, intelligence_ids: List[str], total: int, page: int, page_size: int) -> Optional[str]:
+    """ETag of a feed index page from the versions of its items, None when one of them is not rendered"""
+    versions = await request.context.slavecache.mget([feed_item_version_key(i) for i in intelligence_ids])
+    if any(version is None for version in versions):
+        return None
+    return feed_page_etag([version.decode("utf-8") for version in versions], total, page, page_size)
+
+
+async def get_feed_index_page(request: Request, query_params: schemas.IntelligenceQueryParams, page: int, page_size: int) -> Optional[tuple[List[Dict[str, Any]], int]]:
+    """
+    Serve a head page of the intelligence list from the sorted set index, None when the index cannot answer it
+    """
+    feed_ids = await get_feed_index_ids(request, query_params, page, page_size)
+    if feed_ids is None:
+        return None
+
+    intelligence_ids, total = feed_ids
+    items, _ = await get_versioned_feed_items(request, intelligence_ids)
+    return items, total
+
+
+async def get_versioned_feed_items(request: Request, intelligence_ids: List[str]) -> tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Fetch rendered list items with one MGET, rendering the missing ones with a single query
+
+    :return: Items and their versions, in the order of the ids (unreadable ones left out)
+    """
+    if not intelligence_ids:
+        return [], []
+
+    cached_items = await request.context.slavecache.mget([feed_item_key(i) for i in intelligence_ids])
+    items = {
+        intelligence_id: (json.loads(cached.decode("utf-8")), make_etag(cached))
+        for intelligence_id, cached in zip(intelligence_ids, cached_items)
+        if cached is not None
+    }
+
+    missing_ids = [intelligence_id for intelligence_id in intelligence_ids if intelligence_id not in items]
+    if missing_ids:
+        async with request.context.database.dogex() as session:
+            sql = select(*services._list_columns()).where(
+                IntelligenceModel.id.in_(missing_ids),
+                IntelligenceModel.is_deleted == False,
+                IntelligenceModel.is_visible == True
+            )
+            intelligences = (await session.execute(sql)).all()
+
+        rendered = await services._process_intelligence_results(request, intelligences, None)
+
+        pipe = request.context.mastercache.backend.pipeline(transaction=False)
+        for item in rendered:
+            serialized = json.dumps(item, cls=JsonResponseEncoder)
+            version = make_etag(serialized.encode("utf-8"))
+            # Round trip so fresh and cached items serialize identically
+            items[str(item["id"])] = json.loads(serialized), version
+            pipe.set(feed_item_key(item["id"]), serialized, ex=settings.EXPIRES_FOR_FEED_ITEM)
+            pipe.set(feed_item_version_key(item["id"]), version, ex=settings.EXPIRES_FOR_FEED_ITEM)
+        request.context.mastercache.queue_invalidation(pipe, *(
+            key for item in rendered for key in (feed_item_key(item["id"]), feed_item_version_key(item["id"]))
+        ))
+        await pipe.execute()
+
+    found = [items[intelligence_id] for intelligence_id in intelligence_ids if intelligence_id in items]
+    return [item for item, _ in found], [version for _, version in found]
+
+
+async def _get_feed_items(request: Request, intelligence_ids: List[str]) -> List[Dict[str, Any]]:
+    """Fetch rendered list items, see get_versioned_feed_items"""
+    items, _ = await get_versioned_feed_items(request, intelligence_ids)
+    return items
+
+
+async def backfill_feed_index(context: Context) -> int:
+    """
+    Rebuild the sorted sets from Postgres
+
+    The newest FEED_INDEX_MAX_LENGTH rows of every leaf combination (type, subtype, is_valuable) are indexed,
+    which always covers the newest FEED_INDEX_MAX_LENGTH rows of every aggregate combination as well.
+    """
+    visible = [IntelligenceModel.is_deleted == False, IntelligenceModel.is_visible == True]
+    indexed = 0
+
+    async with context.database.dogex() as session:
+        combinations = (await session.execute(
+            select(IntelligenceModel.type, IntelligenceModel.subtype, IntelligenceModel.is_valuable)
+            .where(*visible).distinct()
+        )).all()
+
+        for type, subtype, is_valuable in combinations:
+            sql = select(
+                IntelligenceModel.id, IntelligenceModel.published_at
+            ).where(
+                *visible,
+                IntelligenceModel.type.is_(None) if type is None else IntelligenceModel.type == type,
+                IntelligenceModel.subtype.is_(None) if subtype is None else IntelligenceModel.subtype == subtype,
+                IntelligenceModel.is_valuable.is_(None) if is_valuable is None else IntelligenceModel.is_valuable == is_valuable,
+            ).order_by(
+                IntelligenceModel.published_at.desc()
+            ).limit(settings.FEED_INDEX_MAX_LENGTH)
+
+            rows = (await session.execute(sql)).all()
+            pipe = context.mastercache.backend.pipeline(transaction=False)
+            for row in rows:
+                _queue_index_commands(pipe, {
+                    "id": row.id,
+                    "published_at": row.published_at,
+                    "type": type,
+                    "subtype": subtype,
+                    "is_valuable": is_valuable,
+                    "is_visible": True,
+                })
+            await pipe.execute()
+            indexed += len(rows)
+
+    await context.mastercache.backend.set(FEED_INDEX_READY_KEY, "1")
+    logger.info(f"Feed index backfilled with {indexed} intelligence from {len(combinations)} combinations")
+    return indexed
+
+
+@on_startup
+async def ensure_feed_index(app: FastAPI):
+    """Backfill the feed index once (on one worker) when it is missing, e.g. after a Redis flush"""
+    if not isinstance(app, FastAPI):
+        return
+
+    context: Context = app.state.context
+    if await context.slavecache.backend.exists(FEED_INDEX_READY_KEY):
+        return
+    if not await context.mastercache.backend.set(FEED_INDEX_LOCK_KEY, "1", ex=600, nx=True):
+        return
+    try:
+        await backfill_feed_index(context)
+    finally:
+        await context.mastercache.backend.delete(FEED_INDEX_LOCK_KEY)
+
+
+if __name__ == '__main__':
+    run_command(backfill_feed_index)
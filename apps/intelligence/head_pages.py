@@ -0,0 +1,162 @@
+"""
+Event-driven upkeep of the cached first pages of the intelligence list
+
+Every cached first page (offset page 1 or keyset head page) is registered under the plain filter combination (type / social group, subtype,
+is_valuable) of its query. When the consumer receives an intelligence, the first pages of every combination
+it matches are patched in place: the rendered item is inserted by published_at and the page trimmed to its size
+(or the item removed once hidden / deleted). Pages whose query also has filters the consumer cannot evaluate
+(keyword, address, chain, influence level) are dropped instead. write_page / invalidate then broadcast the
+change, so every worker drops its in-process copy and pages stay fresh without short TTLs.
+"""
+import json
+from typing import List, Dict, Any
+
+from apps.intelligence import schemas, services, feed_index
+from data import Cache, create_logger
+from middleware import Request
+import settings
+
+
+logger = create_logger("dogex-intelligence-head-pages")
+
+HEAD_PAGES_PREFIX = "aigun:intelligence:page:heads"
+
+
+def head_pages_key(type: str | None, subtype: str | None, is_valuable: bool | None) -> str:
+    """Registry hash of the cached first pages of one filter combination, '*' stands for an unset filter"""
+    valuable = "*" if is_valuable is None else int(bool(is_valuable))
+    return f"{HEAD_PAGES_PREFIX}:type:{type or '*'}:subtype:{subtype or '*'}:valuable:{valuable}"
+
+
+async def register_head_page(master_cache: Cache, query_params: schemas.IntelligenceQueryParams, cache_key: str, page_size: int, cursor: bool = False) -> None:
+    """Register a cached first page (offset page 1, or keyset head page when cursor) so new intelligence can patch it"""
+    key = head_pages_key(query_params.type, query_params.subtype, query_params.is_valuable)
+    entry = {"query_params": query_params.model_dump(mode="json"), "page_size": page_size}
+    if cursor:
+        entry["cursor"] = True
+
+    pipe = master_cache.backend.pipeline(transaction=False)
+    pipe.hset(key, cache_key, json.dumps(entry))
+    # Entries of pages that expired are removed when they are next patched
+    pipe.expire(key, settings.EXPIRES_FOR_INTELLIGENCE * 2)
+    await pipe.execute()
+
+
+def patch_page(items: List[Dict[str, Any]], total: int, item: Dict[str, Any] | None, intelligence_id: str, page_size: int) -> tuple[List[Dict[str, Any]], int] | None:
+    """
+    Page items and total after the intelligence was published (item) or hidden (None)
+
+    Items are ordered by published_at, newest first. Returns None when the page does not change.
+    """
+    present = any(str(existing.get("id")) == intelligence_id for existing in items)
+
+    if item is None:
+        if not present:
+            return None
+        return [existing for existing in items if str(existing.get("id")) != intelligence_id], max(total - 1, 0)
+
+    if present:
+        return None
+
+    published_at = item.get("published_at") or ""
+    position = next(
+        (index for index, existing in enumerate(items) if (existing.get("published_at") or "") < published_at),
+        len(items)
+    )
+    # Older than a full page: it lands on a later page, only the total moves
+    patched = items[:position] + [item] + items[position:]
+    return patched[:page_size], total + 1
+
+
+def patch_cursor_page(items: List[Dict[str, Any]], next_cursor: str | None, item: Dict[str, Any] | None, intelligence_id: str, page_size: int) -> tuple[List[Dict[str, Any]], str | None] | None:
+    """
+    Items and next cursor of a keyset head page after the intelligence was published (item) or hidden (None)
+
+    An item pushing the last one off a full page moves the next cursor to the new last item, so the pushed item
+    starts the next page. Returns None when the page does not change.
+    """
+    patched = patch_page(items, 0, item, intelligence_id, page_size)
+    if patched is None:
+        return None
+    if item is not None and len(items) >= page_size:
+        next_cursor = services.item_cursor(patched[0][-1])
+    return patched[0], next_cursor
+
+
+async def apply_intelligence(request: Request, intelligence: Dict[str, Any]) -> int:
+    """
+    Patch or drop the cached first pages an intelligence message affects
+
+    :return: Number of pages patched or dropped
+    """
+    if not intelligence.get("id"):
+        return 0
+
+    intelligence_id = str(intelligence["id"])
+    hidden = not feed_index.is_listed(intelligence)
+    master_cache = request.context.mastercache
+
+    registry_keys = [
+        head_pages_key(*combination)
+        for combination in feed_index.matching_filter_combinations(
+            intelligence.get("type"), intelligence.get("subtype"), intelligence.get("is_valuable")
+        )
+    ]
+    pipe = master_cache.backend.pipeline(transaction=False)
+    for registry_key in registry_keys:
+        pipe.hgetall(registry_key)
+    registries = await pipe.execute()
+
+    heads = [
+        (registry_key, cache_key.decode("utf-8"), json.loads(entry))
+        for registry_key, registry in zip(registry_keys, registries)
+        for cache_key, entry in registry.items()
+    ]
+    if not heads:
+        return 0
+
+    item = None
+    patchable = {
+        cache_key for _, cache_key, entry in heads
+        if not any(entry["query_params"].get(name) for name in feed_index.UNINDEXED_PARAMS)
+    }
+    if patchable and not hidden:
+        # Rendered like a list row, the feed item cache is warmed on the way
+        items = await feed_index._get_feed_items(request, [intelligence_id])
+        if not items:
+            # Not readable yet, the pages cannot be patched and are dropped
+            patchable = set()
+        else:
+            item = items[0]
+
+    changed = 0
+    for registry_key, cache_key, entry in heads:
+        if cache_key not in patchable:
+            await master_cache.delete(cache_key)
+            await master_cache.backend.hdel(registry_key, cache_key)
+            changed += 1
+            continue
+
+        cached = await master_cache.hgetall(cache_key)
+        if not cached:
+            await master_cache.backend.hdel(registry_key, cache_key)
+            continue
+
+        query_params = schemas.IntelligenceQueryParams(**entry["query_params"])
+        if entry.get("cursor"):
+            patched = patch_cursor_page(
+                json.loads(cached[b"data"]), cached[b"next_cursor"].decode("utf-8") or None, item, intelligence_id, entry["page_size"]
+            )
+            if patched is None:
+                continue
+            await services.write_cursor_page(request, query_params, cache_key, patched[0], patched[1], "", entry["page_size"])
+            changed += 1
+            continue
+
+        patched = patch_page(json.loads(cached[b"data"]), int(cached[b"total"]), item, intelligence_id, entry["page_size"])
+        if patched is None:
+            continue
+        await services.write_page(request, query_params, cache_key, patched[0], patched[1], 1, entry["page_size"])
+        changed += 1
+
+    return changed
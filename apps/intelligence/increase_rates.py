@@ -0,0 +1,168 @@
+"""
+Precomputed highest increase rate of every token
+
+token_increase_rate holds MAX(entity_intelligence.highest_increase_rate) per (network, contract address), so
+the token detail reads it with one indexed lookup instead of joining entity_intelligence, entity and token.
+One worker refreshes it every INCREASE_RATE_REFRESH_INTERVAL seconds: the tokens with entity_intelligence rows
+updated since the watermark (kept in Redis) are recomputed exactly, which also lowers the rate when rows are
+deleted. Without a watermark (first run, Redis flush) every token is rebuilt, and readers aggregate
+entity_intelligence until the rebuild sets it.
+
+Rebuild: python -m apps.intelligence.increase_rates
+"""
+from datetime import datetime
+from typing import List, Tuple, Dict, Optional
+
+from fastapi import FastAPI
+from sqlalchemy import select, func, tuple_
+from sqlalchemy.dialects.postgresql import insert
+
+from apps.intelligence.models import EntityIntelligenceModel, EntityModel, TokenChainDataModel, TokenIncreaseRateModel
+from data import Context, create_logger
+from middleware.lifespan import on_startup, run_on_one_worker, run_command, WATERMARK_OVERLAP
+import settings
+
+
+logger = create_logger("dogex-intelligence-increase-rates")
+
+INCREASE_RATE_PREFIX = "aigun:intelligence:increase_rate"
+INCREASE_RATE_WATERMARK_KEY = f"{INCREASE_RATE_PREFIX}:watermark"
+INCREASE_RATE_LOCK_KEY = f"{INCREASE_RATE_PREFIX}:refresh:lock"
+
+# Tokens recomputed per statement
+REFRESH_BATCH_SIZE = 500
+
+
+def _token_join(sql):
+    """Join entity_intelligence to its tokens the way the token detail relates them"""
+    return sql.join(
+        EntityModel, EntityModel.id == EntityIntelligenceModel.entity_id
+    ).join(
+        TokenChainDataModel, TokenChainDataModel.entity_id == EntityModel.id
+    )
+
+
+async def _changed_tokens(session, since: Optional[datetime]) -> Tuple[List[Tuple[str, str]], Optional[datetime]]:
+    """Tokens with entity_intelligence rows updated after since (all when None) and the latest update among them"""
+    sql = _token_join(select(
+        TokenChainDataModel.network, TokenChainDataModel.contract_address, func.max(EntityIntelligenceModel.updated_at)
+    ).select_from(EntityIntelligenceModel)).where(
+        TokenChainDataModel.network.isnot(None),
+        TokenChainDataModel.contract_address.isnot(None)
+    ).group_by(
+        TokenChainDataModel.network, TokenChainDataModel.contract_address
+    )
+    if since is not None:
+        # Served by idx_entity_intelligence_updated_at
+        sql = sql.where(EntityIntelligenceModel.updated_at > since)
+
+    rows = (await session.execute(sql)).all()
+    latest = max((row[2] for row in rows if row[2] is not None), default=None)
+    return [(row[0], row[1]) for row in rows], latest
+
+
+async def _recompute(session, tokens: List[Tuple[str, str]]) -> None:
+    """Write the exact highest increase rate of the tokens, 0 once all their rows are deleted"""
+    sql = _token_join(select(
+        TokenChainDataModel.network,
+        TokenChainDataModel.contract_address,
+        func.coalesce(
+            func.max(EntityIntelligenceModel.highest_increase_rate).filter(EntityIntelligenceModel.is_deleted == False), 0
+        )
+    ).select_from(EntityIntelligenceModel)).where(
+        tuple_(TokenChainDataModel.network, TokenChainDataModel.contract_address).in_(tokens)
+    ).group_by(
+        TokenChainDataModel.network, TokenChainDataModel.contract_address
+    )
+    rates = (await session.execute(sql)).all()
+    if not rates:
+        return
+
+    statement = insert(TokenIncreaseRateModel)
+    await session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[TokenIncreaseRateModel.network, TokenIncreaseRateModel.contract_address],
+            set_={
+                "highest_increase_rate": statement.excluded.highest_increase_rate,
+                "updated_at": func.timezone('UTC', func.now())
+            }
+        ),
+        [{"network": network, "contract_address": address, "highest_increase_rate": rate} for network, address, rate in rates]
+    )
+
+
+async def refresh_increase_rates(context: Context) -> int:
+    """
+    Recompute the rates of the tokens changed since the last run and advance the watermark
+
+    :return: Number of tokens recomputed
+    """
+    master_cache = context.mastercache.backend
+    watermark = await master_cache.get(INCREASE_RATE_WATERMARK_KEY)
+    since = datetime.fromisoformat(watermark.decode("utf-8")) - WATERMARK_OVERLAP if watermark else None
+
+    async with context.database.dogex() as session:
+        tokens, latest = await _changed_tokens(session, since)
+        for start in range(0, len(tokens), REFRESH_BATCH_SIZE):
+            await _recompute(session, tokens[start:start + REFRESH_BATCH_SIZE])
+        await session.commit()
+
+    if latest is not None:
+        await master_cache.set(INCREASE_RATE_WATERMARK_KEY, latest.isoformat())
+    return len(tokens)
+
+
+# Set once the table has been built, it never stops being ready
+_table_ready = False
+
+
+async def table_ready(backend) -> bool:
+    """Whether a full build of the table completed (its watermark exists), remembered by the worker once it has"""
+    global _table_ready
+    if not _table_ready:
+        _table_ready = bool(await backend.exists(INCREASE_RATE_WATERMARK_KEY))
+    return _table_ready
+
+
+async def get_increase_rate(session, network: str, address: str) -> Optional[float]:
+    """Highest increase rate of a token from the precomputed table, None for tokens without a row"""
+    sql = select(TokenIncreaseRateModel.highest_increase_rate).where(
+        TokenIncreaseRateModel.network == network,
+        TokenIncreaseRateModel.contract_address == address
+    )
+    return (await session.execute(sql)).scalar()
+
+
+async def get_increase_rates(session, tokens: List[Tuple[str, str]]) -> Dict[Tuple[str, str], float]:
+    """Highest increase rates of several tokens from the precomputed table, tokens without a row are left out"""
+    sql = select(
+        TokenIncreaseRateModel.network, TokenIncreaseRateModel.contract_address, TokenIncreaseRateModel.highest_increase_rate
+    ).where(
+        tuple_(TokenIncreaseRateModel.network, TokenIncreaseRateModel.contract_address).in_(tokens)
+    )
+    return {(network, address): rate for network, address, rate in (await session.execute(sql)).all()}
+
+
+async def rebuild_increase_rates(context: Context) -> int:
+    """Recompute the rate of every token, whatever the watermark"""
+    await context.mastercache.backend.delete(INCREASE_RATE_WATERMARK_KEY)
+    return await refresh_increase_rates(context)
+
+
+@on_startup
+async def refresh_increase_rates_periodically(app: FastAPI):
+    """Refresh the rates at startup and every INCREASE_RATE_REFRESH_INTERVAL seconds on one worker"""
+    if not isinstance(app, FastAPI) or not settings.INCREASE_RATE_FROM_TABLE:
+        return
+
+    context: Context = app.state.context
+
+    async def refresh() -> None:
+        refreshed = await refresh_increase_rates(context)
+        logger.info(f"Refreshed the highest increase rate of {refreshed} tokens")
+
+    await run_on_one_worker(context, INCREASE_RATE_LOCK_KEY, settings.INCREASE_RATE_REFRESH_INTERVAL, refresh)
+
+
+if __name__ == '__main__':
+    run_command(rebuild_increase_rates)
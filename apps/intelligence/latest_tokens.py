@@ -0,0 +1,264 @@
+"""
+Feed of the latest appeared tokens
+
+The tokens with the newest display_time are kept in Redis, a sorted set of token ids scored by display_time next
+to a hash of their serialized rows, bounded to LATEST_TOKENS_SIZE. One worker publishes to it every
+LATEST_TOKENS_REFRESH_INTERVAL seconds: the tokens whose display_time is past the watermark (kept in Redis) are
+added and the oldest ones beyond the bound dropped. Without a watermark (first run, Redis flush) the feed is
+backfilled with the newest LATEST_TOKENS_SIZE tokens. The rows of the held tokens are republished as they change
+(prices, names, logos...), by a second watermark on updated_at. Every worker copies the feed into memory when its version
+changes, and /token/latest pages are slices of that copy; cursors past the oldest held token fall back to SQL.
+
+Rebuild: python -m apps.intelligence.latest_tokens
+"""
+import json
+import uuid
+import asyncio
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Any
+
+from fastapi import FastAPI
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from apps.intelligence import models, schemas
+from data import Context, create_logger
+from middleware.lifespan import on_startup, run_on_one_worker, run_command, WATERMARK_OVERLAP
+from views.render import JsonResponseEncoder
+import settings
+
+
+logger = create_logger("dogex-intelligence-latest-tokens")
+
+LATEST_TOKENS_PREFIX = "aigun:intelligence:latest_tokens"
+LATEST_TOKENS_FEED_KEY = f"{LATEST_TOKENS_PREFIX}:feed"
+LATEST_TOKENS_ITEMS_KEY = f"{LATEST_TOKENS_PREFIX}:items"
+LATEST_TOKENS_VERSION_KEY = f"{LATEST_TOKENS_PREFIX}:version"
+LATEST_TOKENS_WATERMARK_KEY = f"{LATEST_TOKENS_PREFIX}:watermark"
+LATEST_TOKENS_UPDATED_WATERMARK_KEY = f"{LATEST_TOKENS_PREFIX}:updated_watermark"
+LATEST_TOKENS_LOCK_KEY = f"{LATEST_TOKENS_PREFIX}:refresh:lock"
+
+# Tokens per /token/latest page
+LATEST_TOKENS_PAGE_SIZE = 20
+
+# Format of display_time in the serialized tokens, ordered like the times themselves
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+
+
+def latest_tokens_query(since: Optional[datetime] = None, before: Optional[datetime] = None):
+    """Tokens by display_time then market cap, newest first, served by idx_token_display_time"""
+    conditions = [models.TokenChainDataModel.display_time.is_not(None)]
+    if since is not None:
+        conditions.append(models.TokenChainDataModel.display_time > since)
+    if before is not None:
+        conditions.append(models.TokenChainDataModel.display_time < before)
+
+    return select(models.TokenChainDataModel).where(
+        *conditions
+    ).options(
+        selectinload(models.TokenChainDataModel.chain)
+    ).order_by(
+        models.TokenChainDataModel.display_time.desc(),
+        models.TokenChainDataModel.market_cap.desc()
+    )
+
+
+def held_tokens_query(ids: List[bytes], updated_since: Optional[datetime] = None):
+    """Held tokens updated since the last run, all of them without a watermark"""
+    conditions = [
+        models.TokenChainDataModel.id.in_([uuid.UUID(token_id.decode("utf-8")) for token_id in ids]),
+        models.TokenChainDataModel.display_time.is_not(None)
+    ]
+    if updated_since is not None:
+        conditions.append(models.TokenChainDataModel.updated_at > updated_since)
+
+    return select(models.TokenChainDataModel).where(*conditions).options(
+        selectinload(models.TokenChainDataModel.chain)
+    )
+
+
+def _since(watermark: Optional[bytes]) -> Optional[datetime]:
+    return datetime.fromisoformat(watermark.decode("utf-8")) - WATERMARK_OVERLAP if watermark else None
+
+
+def cursor_time(last_query_time: Optional[datetime]) -> Optional[datetime]:
+    """display_time is stored as naive UTC"""
+    if last_query_time is None or last_query_time.tzinfo is None:
+        return last_query_time
+    return last_query_time.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _order(item: Dict[str, Any]):
+    return item["display_time"], item.get("market_cap") or 0
+
+
+async def publish_latest_tokens(context: Context) -> int:
+    """
+    Add the tokens displayed since the last run to the feed, republish the held ones that changed and drop the
+    oldest beyond LATEST_TOKENS_SIZE
+
+    :return: Number of tokens added or republished
+    """
+    master_cache = context.mastercache.backend
+    since = _since(await master_cache.get(LATEST_TOKENS_WATERMARK_KEY))
+    updated_since = _since(await master_cache.get(LATEST_TOKENS_UPDATED_WATERMARK_KEY))
+    held_ids = await master_cache.zrange(LATEST_TOKENS_FEED_KEY, 0, -1)
+
+    async with context.database.dogex() as session:
+        tokens = (await session.execute(latest_tokens_query(since).limit(settings.LATEST_TOKENS_SIZE))).scalars().all()
+        held = (await session.execute(held_tokens_query(held_ids, updated_since))).scalars().all() if held_ids else []
+        items = {
+            str(token.id): json.dumps(
+                schemas.TokenChainDataOutSchema.model_validate(token).model_dump(), ensure_ascii=False, cls=JsonResponseEncoder
+            )
+            for token in [*held, *tokens]
+        }
+
+    if held:
+        # updated_at also moves on writes that leave the served fields as they are
+        current = await master_cache.hmget(LATEST_TOKENS_ITEMS_KEY, [str(token.id) for token in held])
+        for token, value in zip(held, current):
+            if value is not None and value.decode("utf-8") == items[str(token.id)]:
+                items.pop(str(token.id))
+
+    updated = [token.updated_at for token in [*held, *tokens] if token.updated_at is not None]
+    pipe = master_cache.pipeline(transaction=False)
+    if items:
+        pipe.zadd(LATEST_TOKENS_FEED_KEY, {
+            str(token.id): token.display_time.replace(tzinfo=timezone.utc).timestamp()
+            for token in [*held, *tokens] if str(token.id) in items
+        })
+        pipe.hset(LATEST_TOKENS_ITEMS_KEY, mapping=items)
+    if updated:
+        pipe.set(LATEST_TOKENS_UPDATED_WATERMARK_KEY, max(updated).isoformat())
+    await pipe.execute()
+
+    if not items:
+        return 0
+
+    # Oldest first, everything past the newest LATEST_TOKENS_SIZE
+    dropped = await master_cache.zrange(LATEST_TOKENS_FEED_KEY, 0, -(settings.LATEST_TOKENS_SIZE + 1))
+    pipe = master_cache.pipeline(transaction=False)
+    if dropped:
+        pipe.zrem(LATEST_TOKENS_FEED_KEY, *dropped)
+        pipe.hdel(LATEST_TOKENS_ITEMS_KEY, *dropped)
+    pipe.incr(LATEST_TOKENS_VERSION_KEY)
+    if tokens:
+        pipe.set(LATEST_TOKENS_WATERMARK_KEY, max(token.display_time for token in tokens).isoformat())
+    await pipe.execute()
+
+    return len(items)
+
+
+class LatestTokens:
+    """
+    Worker copy of the feed, newest token first
+    """
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.version: Optional[int] = None
+        self.syncs = 0
+        self.hits = 0
+        self.misses = 0
+        self._items: List[Dict[str, Any]] = []
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @property
+    def loaded(self) -> bool:
+        return self.version is not None
+
+    async def sync(self, backend: Any) -> bool:
+        """Copy the feed when it changed since the last copy, returns whether it did"""
+        version = await backend.get(LATEST_TOKENS_VERSION_KEY)
+        if version is None or int(version) == self.version:
+            return False
+
+        items = await backend.hgetall(LATEST_TOKENS_ITEMS_KEY)
+        self._items = sorted((json.loads(value.decode("utf-8")) for value in items.values()), key=_order, reverse=True)
+        self.version = int(version)
+        self.syncs += 1
+        return True
+
+    def page(self, last_query_time: Optional[datetime], limit: int = LATEST_TOKENS_PAGE_SIZE) -> Optional[List[Dict[str, Any]]]:
+        """
+        Tokens displayed before the cursor, the first page without one
+
+        :return: Copies of the tokens, None when the feed does not reach the cursor
+        """
+        if not self.loaded:
+            return None
+
+        cursor = cursor_time(last_query_time)
+        start = 0
+        if cursor is not None:
+            cursor = cursor.strftime(TIME_FORMAT)
+            start = next((index for index, item in enumerate(self._items) if item["display_time"] < cursor), len(self._items))
+
+        items = self._items[start:start + limit]
+        if len(items) < limit and len(self._items) >= self.size:
+            # The feed is full, older tokens are only in the table
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return [dict(item) for item in items]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "loaded": self.loaded,
+            "tokens": len(self._items),
+            "version": self.version,
+            "syncs": self.syncs,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+feed = LatestTokens(settings.LATEST_TOKENS_SIZE)
+
+
+async def rebuild_latest_tokens(context: Context) -> int:
+    """Backfill the feed with the newest tokens, whatever the watermark"""
+    await context.mastercache.backend.delete(
+        LATEST_TOKENS_FEED_KEY, LATEST_TOKENS_ITEMS_KEY, LATEST_TOKENS_WATERMARK_KEY,
+        LATEST_TOKENS_UPDATED_WATERMARK_KEY
+    )
+    return await publish_latest_tokens(context)
+
+
+@on_startup
+async def publish_latest_tokens_periodically(app: FastAPI):
+    """Publish new tokens every LATEST_TOKENS_REFRESH_INTERVAL seconds on one worker"""
+    if not isinstance(app, FastAPI) or not settings.LATEST_TOKENS_FEED:
+        return
+
+    context: Context = app.state.context
+
+    async def publish() -> None:
+        published = await publish_latest_tokens(context)
+        if published:
+            logger.info(f"Published {published} latest tokens")
+
+    await run_on_one_worker(context, LATEST_TOKENS_LOCK_KEY, settings.LATEST_TOKENS_REFRESH_INTERVAL, publish)
+
+
+@on_startup
+async def sync_latest_tokens(app: FastAPI):
+    """Keep the copy of every worker in sync with the feed"""
+    if not isinstance(app, FastAPI) or not settings.LATEST_TOKENS_FEED:
+        return
+
+    context: Context = app.state.context
+    while True:
+        try:
+            await feed.sync(context.slavecache.backend)
+        except Exception as e:
+            logger.error(f"Latest tokens sync error: {e}")
+        await asyncio.sleep(settings.LATEST_TOKENS_REFRESH_INTERVAL)
+
+
+if __name__ == '__main__':
+    run_command(rebuild_latest_tokens)
@@ -98,6 +98,16 @@ class EntityIntelligenceModel(Base):
                                 foreign_keys=[intelligence_id])
 
 
+class TokenIncreaseRateModel(Base):
+    """
+    Highest increase rate of each token over its intelligence, maintained by apps.intelligence.increase_rates
+    """
+    __tablename__ = "token_increase_rate"
+    network = Column(Text, nullable=False)
+    contract_address = Column(Text, nullable=False)
+    highest_increase_rate = Column(Float, nullable=False, default=0)
+
+
 class EntityModel(Base):
     __tablename__ = "entity"
 
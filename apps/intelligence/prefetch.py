@@ -0,0 +1,165 @@
+"""
+Demand-driven prefetch of intelligence list pages
+
+Every list request records a page view in a per-filter Redis hash. The follow-through probability of a page
+N + k is estimated as views(N + k) / views(N), and only pages above PREFETCH_THRESHOLD are prefetched. Jobs are
+deduplicated across workers with a short Redis claim, and each worker runs them from a bounded queue with
+PREFETCH_CONCURRENCY consumers, dropping jobs when the queue is full so prefetch never queues behind live traffic.
+"""
+import asyncio
+from typing import Optional, Any, Callable, Awaitable
+
+from apps.intelligence import schemas, services, feed_index
+from data import create_logger
+from data.keys import digest
+from middleware import Request
+import settings
+
+
+logger = create_logger("dogex-intelligence-prefetch")
+
+PREFETCH_PREFIX = "aigun:intelligence:prefetch"
+
+# Pseudo page numbers of the keyset pagination: head page and pages after a cursor
+CURSOR_HEAD = "cursor:head"
+CURSOR_NEXT = "cursor:next"
+
+
+def stats_key(query_params: schemas.IntelligenceQueryParams, page_size: int) -> str:
+    return f"{PREFETCH_PREFIX}:stats:{digest(query_params, page_size=page_size)}"
+
+
+def job_key(query_params: schemas.IntelligenceQueryParams, page_size: int, page: Any) -> str:
+    return f"{PREFETCH_PREFIX}:job:{digest(query_params, page_size=page_size, page=page)}"
+
+
+def pages_to_prefetch(page: int, views: list[Optional[bytes]]) -> list[int]:
+    """
+    Pages after the current one worth prefetching
+
+    :param page: Current page
+    :param views: View counts of the current page and of the PREFETCH_MAX_DEPTH pages after it
+    """
+    current = int(views[0] or 0)
+    if current < settings.PREFETCH_MIN_SAMPLES:
+        return []
+
+    pages = []
+    for depth, count in enumerate(views[1:], start=1):
+        # Follow-through only drops with depth, the first page below the threshold ends the run
+        if int(count or 0) / current < settings.PREFETCH_THRESHOLD:
+            break
+        pages.append(page + depth)
+    return pages
+
+
+class PrefetchScheduler:
+    """
+    Bounded per-worker queue of prefetch jobs
+    """
+
+    def __init__(self) -> None:
+        self.scheduled = 0
+        self.dropped = 0
+        self._queue: asyncio.Queue | None = None
+        self._workers: list[asyncio.Task] = []
+        self._pending: set[str] = set()
+
+    def _ensure_workers(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=settings.PREFETCH_QUEUE_SIZE)
+        self._workers = [worker for worker in self._workers if not worker.done()]
+        while len(self._workers) < settings.PREFETCH_CONCURRENCY:
+            self._workers.append(asyncio.create_task(self._work(), name="intelligence-prefetch"))
+
+    async def submit(self, master_cache: Any, key: str, job: Callable[[], Awaitable[Any]]) -> bool:
+        """
+        Queue a job unless it is already pending here or claimed by another worker
+
+        :return: Whether the job was queued
+        """
+        if key in self._pending:
+            return False
+        if not await master_cache.set(key, "1", ex=settings.PREFETCH_JOB_TTL, nx=True):
+            return False
+
+        self._ensure_workers()
+        try:
+            self._queue.put_nowait((key, job))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            await master_cache.delete(key)
+            return False
+        self._pending.add(key)
+        self.scheduled += 1
+        return True
+
+    async def _work(self) -> None:
+        while True:
+            key, job = await self._queue.get()
+            try:
+                await job()
+            except Exception as e:
+                logger.error(f"Prefetch error: {e}")
+            finally:
+                self._pending.discard(key)
+                self._queue.task_done()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "scheduled": self.scheduled,
+            "dropped": self.dropped,
+            "pending": len(self._pending),
+        }
+
+
+scheduler = PrefetchScheduler()
+
+
+async def record_and_prefetch(request: Request, query_params: schemas.IntelligenceQueryParams, page: int, page_size: int) -> None:
+    """Record a view of an offset page and prefetch the following pages readers are likely to reach"""
+    master_cache = request.context.mastercache.backend
+    key = stats_key(query_params, page_size)
+
+    pipe = master_cache.pipeline(transaction=False)
+    pipe.hincrby(key, str(page), 1)
+    pipe.expire(key, settings.PREFETCH_STATS_TTL)
+    pipe.hmget(key, [str(page + depth) for depth in range(settings.PREFETCH_MAX_DEPTH + 1)])
+    _, _, views = await pipe.execute()
+
+    # Pages the feed index answers are never read from the page cache
+    pages = [next_page for next_page in pages_to_prefetch(page, views) if not feed_index.covers_page(query_params, next_page, page_size)]
+    if not pages:
+        return
+
+    # The run of pages is read with one query
+    await scheduler.submit(
+        master_cache,
+        job_key(query_params, page_size, f"{pages[0]}-{pages[-1]}"),
+        lambda: services.cache_pages(request, query_params, pages, page_size)
+    )
+
+
+async def record_and_prefetch_cursor(request: Request, query_params: schemas.IntelligenceQueryParams, cursor: Optional[str], next_cursor: Optional[str], page_size: int) -> None:
+    """Record a view of a keyset page and prefetch the next one when readers usually go on"""
+    master_cache = request.context.mastercache.backend
+    key = stats_key(query_params, page_size)
+
+    pipe = master_cache.pipeline(transaction=False)
+    pipe.hincrby(key, CURSOR_NEXT if cursor else CURSOR_HEAD, 1)
+    pipe.expire(key, settings.PREFETCH_STATS_TTL)
+    pipe.hmget(key, [CURSOR_HEAD, CURSOR_NEXT])
+    _, _, (head, following) = await pipe.execute()
+
+    if not next_cursor:
+        return
+    # Share of keyset page views that were a following page, readers go on at least this often
+    views = int(head or 0) + int(following or 0)
+    if views < settings.PREFETCH_MIN_SAMPLES or int(following or 0) / views < settings.PREFETCH_THRESHOLD:
+        return
+
+    await scheduler.submit(
+        master_cache,
+        job_key(query_params, page_size, f"cursor:{next_cursor}"),
+        lambda: services.cache_cursor_page(request, query_params, next_cursor, page_size)
+    )
@@ -15,6 +15,7 @@ class IntelligenceQueryParams(BaseModel):
     type: Optional[str] | None = Query(default=None, description="radar_signal/event")
     subtype: Optional[str] | None = Query(default=None, description="subtype")
     is_valuable: Optional[bool] | None = Query(default=True, description="Whether it is valuable")
+    key_word: Optional[str] | None = Query(default=None, description="Keyword, matched against content and analyzed zh/en text")
 
     address: Optional[str] | None = Query(default=None, description="Token address")
     chain_name: Optional[str] | None = Query(default=None, description="Chain")
@@ -66,6 +67,50 @@ class TokenInfoOutSchema(BaseModel):
         from_attributes = True
 
 
+class ChainOutSchema(BaseModel):
+    id: uuid.UUID
+    slug: Optional[str]
+    name: Optional[str]
+    symbol: Optional[str]
+    logo: Optional[str] = None
+    network_id: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class TokenChainDataOutSchema(BaseModel):
+    id: uuid.UUID
+    network: Optional[str]
+    contract_address: Optional[str]
+    name: Optional[str]
+    symbol: Optional[str]
+    logo: Optional[str] = None
+    decimals: Optional[int] = None
+    price_usd: Optional[float] = 0
+    market_cap: Optional[float] = 0
+    liquidity: Optional[float] = 0
+    volume_24h: Optional[float] = 0
+    price_change_24h: Optional[float] = 0
+    is_native: Optional[bool] = False
+    is_mainstream: Optional[bool] = False
+    display_time: Optional[datetime]
+    chain: Optional[ChainOutSchema] = None
+
+    class Config:
+        from_attributes = True
+
+    @model_serializer(mode='wrap')
+    def serialize_wrap(self, handler):
+        data = handler(self)
+
+        for key, val in data.items():
+            if isinstance(val, datetime):
+                data[key] = val.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+        return data
+
+
 
 class EntityResponse(BaseModel):
     id: uuid.UUID
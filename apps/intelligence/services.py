@@ -1,73 +1,360 @@
 import json
+import uuid
+import base64
+import binascii
 import decimal
+import time
 import asyncio
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Awaitable, Callable
 
-from sqlalchemy import select, func, and_, or_, cast, String
+from fastapi import FastAPI
+from sqlalchemy import select, func, and_, or_, cast, String, Text, tuple_, literal_column
 from sqlalchemy.orm import selectinload, defer
+from sqlalchemy.dialects.postgresql import TSVECTOR
 
 from apps.intelligence.models import (
     IntelligenceModel, EntityIntelligenceModel, EntityModel, 
     TokenChainDataModel, ChainModel, TokenModel
 )
-from apps.intelligence import models, schemas
+from apps.intelligence import models, schemas, counters, head_pages, feed_index, token_snapshots, increase_rates, social_links, latest_tokens
 from apps.websocket import services as ws_services
 from data import create_logger
+from data.flight import Waiters, SingleFlight, coalesce
+from data.keys import KeyNamespace
+from data import codec
 from middleware import Request
-from views.render import JsonResponseEncoder
+from middleware.lifespan import on_startup, on_warmup
+from utils.compression import precompress
+from views.render import JsonResponseEncoder, HTTPException, APIResponse, make_etag
+from data import code
 import settings
 
 
 logger = create_logger("dogex-intelligence")
 
+# Pub/sub channel announcing the key of every freshly written intelligence page
+PAGE_READY_CHANNEL = "aigun:intelligence:page:ready"
 
-async def cache_page(request: Request, query_params: schemas.IntelligenceQueryParams, page: int, page_size: int) -> None:
-    """Cache a single page with lock protection"""
-    cache_key = f"aigun:intelligence:page:{query_params.model_dump_json()}:{page}:{page_size}"
+# Requests waiting for a page another request is building
+page_waiters = Waiters()
+
+# Concurrent identical list / detail / token lookups of this worker share one call
+request_flight = SingleFlight("intelligence")
+
+# Versioned key namespaces, bump a generation to drop every key of the namespace at once
+PAGE_KEYS = KeyNamespace("aigun:intelligence:page")
+LIST_COUNT_KEYS = KeyNamespace("aigun:intelligence:list_count")
+CHAIN_INFOS_KEYS = KeyNamespace("aigun:intelligence:chain_infos")
+NEXT_PAGES_KEYS = KeyNamespace("aigun:intelligence:next_pages_data")
+RESPONSE_KEYS = KeyNamespace("aigun:intelligence:response")
+
+# Showed tokens of an intelligence, also read by get_intelligence_latest_entities_v2
+LATEST_ENTITIES_PREFIX = "dogex:intelligence:latest_entities"
+
+# Large JSON values of these namespaces are compressed in Redis
+for _prefix in (PAGE_KEYS.prefix, CHAIN_INFOS_KEYS.prefix, RESPONSE_KEYS.prefix, LATEST_ENTITIES_PREFIX):
+    codec.register(_prefix, settings.CACHE_CODEC, settings.CACHE_CODEC_MIN_SIZE)
+
+# Intelligence types grouped under type=social
+SOCIAL_INTELLIGENCE_TYPES = ("twitter", "farcaster", "binancesquare")
+
+# Generated search columns maintained by Postgres (see init.sql), left unmapped so SQLite schemas stay portable
+SEARCH_TEXT_COLUMN = literal_column("intelligence.search_text", Text)
+SEARCH_VECTOR_COLUMN = literal_column("intelligence.search_vector", TSVECTOR)
+
+
+async def page_cache_key(request: Request, query_params: schemas.IntelligenceQueryParams, page: int, page_size: int) -> str:
+    return await PAGE_KEYS.key(request.context.slavecache, query_params, page=page, page_size=page_size)
+
+
+def render_page_body(data: str | bytes, page: int, page_size: int, total: int) -> bytes:
+    """Final response bytes of a cached page, pagination envelope included"""
+    return APIResponse(data=json.loads(data), page=page, page_size=page_size, total=total).body
+
+
+async def write_page(request: Request, query_params: schemas.IntelligenceQueryParams, cache_key: str, result: List[Dict], total: int, page: int, page_size: int) -> None:
+    """Store a page with its refresh time and wake the requests waiting for it on every worker"""
+    master_cache = request.context.mastercache
+    data = json.dumps(result, cls=JsonResponseEncoder)
+    mapping = {"data": data, "total": total, "refreshed_at": time.time()}
+    if settings.INTELLIGENCE_PAGE_CACHE_BODY:
+        # Rendered from the stored data so the bytes match what a cache hit used to return
+        mapping["body"] = render_page_body(data, page, page_size, total)
+        mapping["etag"] = make_etag(mapping["body"])
+        mapping.update(variant_fields(mapping["body"]))
+
+    await master_cache.hset(cache_key, mapping)
+    await master_cache.backend.expire(cache_key, settings.EXPIRES_FOR_INTELLIGENCE)
+    if page == 1:
+        await head_pages.register_head_page(master_cache, query_params, cache_key, page_size)
+
+    page_waiters.notify(cache_key)
+    await master_cache.publish(PAGE_READY_CHANNEL, cache_key)
+
+
+async def cache_page(request: Request, query_params: schemas.IntelligenceQueryParams, page: int, page_size: int, refresh: bool = False) -> None:
+    """Cache a single page with lock protection, refresh rebuilds a page that is already cached"""
+    cache_key = await page_cache_key(request, query_params, page, page_size)
     
-    if await request.context.slavecache.backend.exists(cache_key):
+    if not refresh and await request.context.slavecache.backend.exists(cache_key):
         return
     
     lock_key = f"{cache_key}:lock"
     if await request.context.mastercache.backend.set(lock_key, "1", ex=10, nx=True):
         try:
             result, total = await list_intelligence(request, query_params, page, page_size)
-            await request.context.mastercache.backend.hset(
-                cache_key,
-                mapping={"data": json.dumps(result, cls=JsonResponseEncoder), "total": total}
-            )
-            await request.context.mastercache.backend.expire(cache_key, settings.EXPIRES_FOR_INTELLIGENCE)
+            await write_page(request, query_params, cache_key, result, total, page, page_size)
         finally:
             await request.context.mastercache.backend.delete(lock_key)
 
 
-async def prefetch_pages(request: Request, query_params: schemas.IntelligenceQueryParams, current_page: int, page_size: int) -> None:
-    """Pre-cache next 3 pages"""
+def split_pages(rows: List[Any], page_size: int, pages: int, position: Optional[Callable[[Any], Any]] = None) -> List[List[Any]]:
+    """
+    Consecutive pages of rows read for several pages at once
+
+    Fetch pages * page_size + 1 rows, the extra one tells whether the rows reached the end of the results: only
+    then is a short page kept. With a keyset position (rows ordered by it descending), a page starts at the
+    first row strictly before the last row of the previous page, as a query on that cursor would.
+    """
+    exhausted = len(rows) <= pages * page_size
+    result, start = [], 0
+    while len(result) < pages and start < len(rows):
+        page = rows[start:start + page_size]
+        if len(page) < page_size and not exhausted:
+            break
+        result.append(page)
+        start += len(page)
+        if position is not None:
+            last = position(page[-1])
+            while start < len(rows) and not position(rows[start]) < last:
+                start += 1
+    return result
+
+
+async def cache_pages(request: Request, query_params: schemas.IntelligenceQueryParams, pages: List[int], page_size: int) -> None:
+    """Cache consecutive pages read with one query, the ones cached or locked by another request are skipped"""
+    master_cache = request.context.mastercache.backend
+    cache_keys = {page: await page_cache_key(request, query_params, page, page_size) for page in pages}
+
+    pipe = request.context.slavecache.backend.pipeline(transaction=False)
+    for cache_key in cache_keys.values():
+        pipe.exists(cache_key)
+    missing = [page for page, exists in zip(pages, await pipe.execute()) if not exists]
+    if not missing:
+        return
+
+    pipe = master_cache.pipeline(transaction=False)
+    for page in missing:
+        pipe.set(f"{cache_keys[page]}:lock", "1", ex=10, nx=True)
+    locked = [page for page, acquired in zip(missing, await pipe.execute()) if acquired]
+    if not locked:
+        return
+
     try:
-        await asyncio.gather(
-            *[cache_page(request, query_params, current_page + i, page_size) for i in range(1, 4)],
-            return_exceptions=True
-        )
-    except Exception as e:
-        logger.error(f"Prefetch error: {e}")
+        first, count = locked[0], locked[-1] - locked[0] + 1
+        result, total = await _list_intelligence_rows(request, query_params, (first - 1) * page_size, count * page_size)
+        for page, rows in zip(range(first, first + count), split_pages(result, page_size, count)):
+            if page in locked:
+                await write_page(request, query_params, cache_keys[page], rows, total, page, page_size)
+    finally:
+        await master_cache.delete(*[f"{cache_keys[page]}:lock" for page in locked])
 
 
-async def get_from_cache(cache_key: str, slave_cache: Any, master_cache: Any) -> tuple[Optional[List[Dict]], Optional[int]]:
-    """Get data from cache and extend TTL"""
+def variant_fields(body: bytes) -> Dict[str, bytes]:
+    """
+    Hash fields of the pre-compressed variants of a rendered body, empty when it is too small to compress so a
+    rewrite also clears the variants of the previous body
+    """
+    variants = precompress(body)
+    return {f"body_{encoding}": variants.get(encoding, b"") for encoding in settings.RESPONSE_COMPRESSION}
+
+
+def cached_variants(cached: Dict[bytes, bytes]) -> Dict[str, bytes]:
+    """Pre-compressed variants stored with a cached body by encoding"""
+    return {
+        encoding: cached[f"body_{encoding}".encode("utf-8")]
+        for encoding in settings.RESPONSE_COMPRESSION
+        if cached.get(f"body_{encoding}".encode("utf-8"))
+    }
+
+
+def _is_stale(cached: Dict[bytes, bytes]) -> bool:
+    return time.time() - float(cached.get(b"refreshed_at", 0)) > settings.EXPIRES_FOR_INTELLIGENCE_SOFT
+
+
+async def get_from_cache(cache_key: str, slave_cache: Any, master_cache: Any) -> tuple[Optional[List[Dict]], Optional[int], bool]:
+    """Get data from cache and extend TTL, the flag tells whether the page is past its soft TTL"""
     cached = await slave_cache.hgetall(cache_key)
     if cached:
-        await master_cache.expire(cache_key, settings.EXPIRES_FOR_INTELLIGENCE)
-        return json.loads(cached[b"data"].decode("utf-8")), int(cached[b"total"])
-    return None, None
+        await master_cache.touch(cache_key, settings.EXPIRES_FOR_INTELLIGENCE)
+        return json.loads(cached[b"data"].decode("utf-8")), int(cached[b"total"]), _is_stale(cached)
+    return None, None, False
+
+
+async def get_body_from_cache(cache_key: str, slave_cache: Any, master_cache: Any, page: int, page_size: int) -> tuple[Optional[bytes], Optional[str], Dict[str, bytes], bool]:
+    """
+    Get the rendered response bytes of a page, their ETag and pre-compressed variants from cache and extend TTL,
+    the flag tells whether the page is past its soft TTL. Pages cached without a body are rendered from their data.
+    """
+    cached = await slave_cache.hgetall(cache_key)
+    if not cached:
+        return None, None, {}, False
+
+    await master_cache.touch(cache_key, settings.EXPIRES_FOR_INTELLIGENCE)
+    if not cached.get(b"body"):
+        body = render_page_body(cached[b"data"], page, page_size, int(cached[b"total"]))
+        return body, make_etag(body), {}, _is_stale(cached)
+
+    etag = cached[b"etag"].decode("utf-8") if cached.get(b"etag") else make_etag(cached[b"body"])
+    return cached[b"body"], etag, cached_variants(cached), _is_stale(cached)
+
+
+@on_startup
+async def subscribe_page_ready(app: FastAPI):
+    """Wake local waiters when any worker finishes building a page"""
+    if not isinstance(app, FastAPI):
+        return
+    app.state.context.slavecache.subscribe(PAGE_READY_CHANNEL, page_waiters.on_message)
+
+
+def encode_cursor(published_at: datetime, intelligence_id: Any) -> str:
+    """Encode the keyset position (published_at, id) of the last row of a page into an opaque cursor"""
+    raw = f"{published_at.isoformat()}|{intelligence_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[tuple[datetime, uuid.UUID]]:
+    """Decode an opaque cursor back into its keyset position, an empty cursor means the head of the feed"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        published_at, intelligence_id = raw.split("|", 1)
+        return datetime.fromisoformat(published_at), uuid.UUID(intelligence_id)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise HTTPException(code=code.CODE_ERROR, message="Invalid cursor", status_code=400)
+
+
+async def cursor_page_cache_key(request: Request, query_params: schemas.IntelligenceQueryParams, cursor: Optional[str], page_size: int) -> str:
+    """Cache key of a keyset page, pages after a cursor never shift when new intelligence arrives"""
+    return await PAGE_KEYS.key(request.context.slavecache, query_params, cursor=cursor or "", page_size=page_size)
+
+
+def item_cursor(item: Dict[str, Any]) -> str:
+    """Cursor of the page after a rendered list item"""
+    published_at = item["published_at"]
+    if isinstance(published_at, str):
+        published_at = datetime.strptime(published_at, "%Y-%m-%dT%H:%M:%S.%fZ")
+    return encode_cursor(published_at, item["id"])
+
+
+async def get_cursor_page_from_cache(cache_key: str, slave_cache: Any, master_cache: Any, head: bool = False) -> tuple[Optional[List[Dict]], Optional[str], bool]:
+    """
+    Get a keyset page and its next cursor from cache, the flag tells whether the page is past its soft TTL
+
+    Pages after a cursor never change, reads extend their TTL. The head page (empty cursor) gets new intelligence,
+    it expires with its TTL and is refreshed past the soft TTL instead.
+    """
+    cached = await slave_cache.hgetall(cache_key)
+    if not cached:
+        return None, None, False
+    if not head:
+        await master_cache.touch(cache_key, settings.EXPIRES_FOR_INTELLIGENCE)
+    return json.loads(cached[b"data"].decode("utf-8")), cached[b"next_cursor"].decode("utf-8") or None, head and _is_stale(cached)
+
+
+async def write_cursor_page(request: Request, query_params: schemas.IntelligenceQueryParams, cache_key: str, result: List[Dict], next_cursor: Optional[str], cursor: Optional[str], page_size: int) -> None:
+    """Store a keyset page with its refresh time, the head page is registered so new intelligence patches it"""
+    master_cache = request.context.mastercache
+    await master_cache.hset(cache_key, {
+        "data": json.dumps(result, cls=JsonResponseEncoder), "next_cursor": next_cursor or "", "refreshed_at": time.time()
+    })
+    await master_cache.backend.expire(cache_key, settings.EXPIRES_FOR_INTELLIGENCE)
+    if not cursor:
+        await head_pages.register_head_page(master_cache, query_params, cache_key, page_size, cursor=True)
+
+
+async def cache_cursor_page(request: Request, query_params: schemas.IntelligenceQueryParams, cursor: str, page_size: int, refresh: bool = False) -> Optional[str]:
+    """
+    Cache a single keyset page with lock protection and return the cursor of the page after it, refresh rebuilds
+    a page that is already cached
+    """
+    cache_key = await cursor_page_cache_key(request, query_params, cursor, page_size)
+
+    if not refresh:
+        cached_next_cursor = await request.context.slavecache.hget(cache_key, "next_cursor")
+        if cached_next_cursor is not None:
+            return cached_next_cursor.decode("utf-8") or None
+
+    lock_key = f"{cache_key}:lock"
+    if not await request.context.mastercache.backend.set(lock_key, "1", ex=10, nx=True):
+        return None
+    try:
+        result, next_cursor = await list_intelligence_by_cursor(request, query_params, cursor, page_size)
+        await write_cursor_page(request, query_params, cache_key, result, next_cursor, cursor, page_size)
+        return next_cursor
+    finally:
+        await request.context.mastercache.backend.delete(lock_key)
+
+
+async def get_response_from_cache(request: Request, name: str, **params: Any) -> tuple[str, Optional[bytes], Optional[str], Dict[str, bytes]]:
+    """Key, rendered body, ETag and pre-compressed variants of a cached endpoint response (None when missing)"""
+    cache_key = await RESPONSE_KEYS.key(request.context.slavecache, name, **params)
+    cached = await request.context.slavecache.hgetall(cache_key)
+    if not cached:
+        return cache_key, None, None, {}
+    return cache_key, cached[b"body"], cached[b"etag"].decode("utf-8"), cached_variants(cached)
+
+
+async def write_response(request: Request, cache_key: str, body: bytes, etag: str) -> None:
+    """Store a rendered endpoint response with its ETag and compressed variants for EXPIRES_FOR_RESPONSE_CACHE seconds"""
+    master_cache = request.context.mastercache
+    await master_cache.hset(cache_key, {"body": body, "etag": etag, **variant_fields(body)})
+    await master_cache.backend.expire(cache_key, settings.EXPIRES_FOR_RESPONSE_CACHE)
+
+
+def supports_full_text(session: Any) -> bool:
+    """Whether the session is bound to Postgres, which carries the tsvector / trigram search columns"""
+    return session.bind.dialect.name == "postgresql"
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("/", "//").replace("%", "/%").replace("_", "/_")
 
-def _build_filters(query_params: schemas.IntelligenceQueryParams) -> List[Any]:
+
+def _keyword_filter(key_word: str, full_text: bool) -> Any:
+    """
+    Keyword condition, full_text uses the GIN indexed search_vector (word match) and search_text (trigram
+    substring match, which also covers CJK text the simple parser does not split), otherwise a plain ILIKE
+    """
+    if full_text:
+        return or_(
+            SEARCH_VECTOR_COLUMN.op("@@")(func.websearch_to_tsquery("simple", key_word)),
+            SEARCH_TEXT_COLUMN.ilike(f"%{_escape_like(key_word)}%", escape="/")
+        )
+    return or_(
+        IntelligenceModel.content.ilike(f"%{key_word}%"),
+        cast(IntelligenceModel.analyzed["zh"], String).ilike(f"%{key_word}%")
+    )
+
+
+def _keyword_rank(query_params: Any, full_text: bool) -> Optional[Any]:
+    """Relevance of a row to the keyword, None when the query is not a full-text search"""
+    key_word = getattr(query_params, "key_word", None)
+    if not key_word or not full_text:
+        return None
+    return func.ts_rank_cd(SEARCH_VECTOR_COLUMN, func.websearch_to_tsquery("simple", key_word)) + \
+        func.word_similarity(key_word, SEARCH_TEXT_COLUMN)
+
+
+def _build_filters(query_params: schemas.IntelligenceQueryParams, full_text: bool = False) -> List[Any]:
     """Build filter conditions for intelligence query"""
     filters = []
     
     if query_params.type:
         if query_params.type == "social":
-            filters.append(IntelligenceModel.type.in_(["twitter", "farcaster", "binancesquare"]))
+            filters.append(IntelligenceModel.type.in_(SOCIAL_INTELLIGENCE_TYPES))
         else:
             filters.append(IntelligenceModel.type == query_params.type)
     
@@ -78,14 +365,38 @@ def _build_filters(query_params: schemas.IntelligenceQueryParams) -> List[Any]:
         filters.append(IntelligenceModel.is_valuable == bool(query_params.is_valuable))
     
     if hasattr(query_params, 'key_word') and query_params.key_word:
-        filters.append(or_(
-            IntelligenceModel.content.ilike(f"%{query_params.key_word}%"),
-            cast(IntelligenceModel.analyzed["zh"], String).ilike(f"%{query_params.key_word}%")
-        ))
+        filters.append(_keyword_filter(query_params.key_word, full_text))
     
     return filters
 
 
+def _list_columns() -> List[Any]:
+    """Intelligence columns the list response is rendered from (IntelligenceListOutSchema fields)"""
+    return [getattr(IntelligenceModel, name) for name in schemas.IntelligenceListOutSchema.model_fields]
+
+
+def _build_list_query(query_params: schemas.IntelligenceQueryParams, full_text: bool = False) -> tuple[Any, List[Any]]:
+    """Build the base query and filters shared by the offset and keyset list paths"""
+    filters = _build_filters(query_params, full_text)
+    filters.extend([
+        IntelligenceModel.is_deleted == False,
+        IntelligenceModel.is_visible == True
+    ])
+
+    # Plain column rows, no ORM objects or relationship loading per row
+    base_query = select(*_list_columns())
+
+    # Apply influence level filter if specified, as EXISTS so rows never repeat and need no DISTINCT
+    if hasattr(query_params, 'influence_level') and query_params.influence_level is not None:
+        filters.append(IntelligenceModel.entity_intelligences.any(and_(
+            EntityIntelligenceModel.type == "author",
+            EntityIntelligenceModel.entity.has(EntityModel.influence_level == query_params.influence_level)
+        )))
+
+    return base_query, filters
+
+
+@coalesce(request_flight, lambda request, query_params, page, page_size: (query_params.model_dump_json(), page, page_size))
 async def list_intelligence(request: Request, query_params: schemas.IntelligenceQueryParams, page: int, page_size: int) -> tuple[List[Dict[str, Any]], int]:
     """
     Get intelligence list with pagination and filtering support
@@ -99,57 +410,30 @@ async def list_intelligence(request: Request, query_params: schemas.Intelligence
     Returns:
         tuple: (intelligence_list, total_count)
     """
-    # Initialize context and pagination
-    master_cache = request.context.mastercache.backend
-    offset = (page - 1) * page_size
+    return await _list_intelligence_rows(request, query_params, (page - 1) * page_size, page_size)
 
-    # Build query filters
-    filters = _build_filters(query_params)
-    filters.extend([
-        IntelligenceModel.is_deleted == False,
-        IntelligenceModel.is_visible == True
-    ])
 
-    # Configure entity preloading options
-    entity_load_options = selectinload(
-        IntelligenceModel.entity_intelligences
-    ).selectinload(
-        EntityIntelligenceModel.entity
-    ).options(
-        selectinload(EntityModel.token_entity)
-        .selectinload(TokenModel.chain_datas)
-        .selectinload(TokenChainDataModel.chain),
-        selectinload(EntityModel.tokendata_entity)
-        .selectinload(TokenChainDataModel.chain),
-        selectinload(EntityModel.entity_tags)
-    )
+async def _list_intelligence_rows(request: Request, query_params: schemas.IntelligenceQueryParams, offset: int, limit: int) -> tuple[List[Dict[str, Any]], int]:
+    """List rows from offset, one page or several consecutive ones, with the total count"""
+    master_cache = request.context.mastercache.backend
 
     async with request.context.database.dogex() as session:
-        # Construct base query
-        base_query = select(IntelligenceModel)
-
-        # Apply influence level filter if specified
-        if hasattr(query_params, 'influence_level') and query_params.influence_level is not None:
-            base_query = base_query.join(
-                IntelligenceModel.entity_intelligences
-            ).join(
-                EntityIntelligenceModel.entity
+        # Build query and filters
+        full_text = supports_full_text(session)
+        base_query, filters = _build_list_query(query_params, full_text)
+
+        # Handle total count, from the filter counter when one covers the query, otherwise cached
+        total_count = await counters.get_list_count(request, query_params)
+        if total_count is None:
+            cache_key = await LIST_COUNT_KEYS.key(request.context.slavecache, query_params)
+            total_count = await _get_cached_total_count(
+                master_cache, session, base_query, filters, cache_key
             )
-            filters.append(and_(
-                EntityIntelligenceModel.type == "author",
-                EntityModel.influence_level == query_params.influence_level
-            ))
-
-        # Handle total count with caching
-        cache_key = f"dogex:intelligence:intelligence_list:count:query_params:{query_params.model_dump_json()}"
-        total_count = await _get_cached_total_count(
-            master_cache, session, base_query, filters, cache_key
-        )
 
         # Execute main query with pagination
         results = await _execute_intelligence_query(
-            session, base_query, filters, entity_load_options,
-            offset, page_size
+            session, base_query, filters,
+            offset, limit, _keyword_rank(query_params, full_text)
         )
 
     # Post-process results
@@ -160,6 +444,42 @@ async def list_intelligence(request: Request, query_params: schemas.Intelligence
     return processed_results, total_count
 
 
+async def list_intelligence_by_cursor(request: Request, query_params: schemas.IntelligenceQueryParams, cursor: Optional[str], page_size: int) -> tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Get intelligence list with keyset pagination on (published_at, id)
+
+    Args:
+        request: HTTP request containing context information
+        query_params: Query parameters for filtering intelligence data
+        cursor: Opaque cursor returned with the previous page (empty for the head of the feed)
+        page_size: Number of items per page
+
+    Returns:
+        tuple: (intelligence_list, next_cursor), next_cursor is None on the last page
+    """
+    position = decode_cursor(cursor)
+
+    async with request.context.database.dogex() as session:
+        # Keyword matches are kept in time order here, relevance ranking would break the keyset
+        base_query, filters = _build_list_query(query_params, supports_full_text(session))
+        results = await _execute_intelligence_keyset_query(
+            session, base_query, filters,
+            position, page_size
+        )
+
+    # One extra row is fetched to know whether a next page exists without a COUNT
+    next_cursor = None
+    if len(results) > page_size:
+        results = results[:page_size]
+        next_cursor = encode_cursor(results[-1].published_at, results[-1].id)
+
+    processed_results = await _process_intelligence_results(
+        request, results, query_params
+    )
+
+    return processed_results, next_cursor
+
+
 async def _get_cached_total_count(master_cache: Any, session: Any, base_query: Any, filters: List[Any], cache_key: str) -> int:
     """Get total count from cache or database"""
     cached_total = await master_cache.get(cache_key)
@@ -168,24 +488,42 @@ async def _get_cached_total_count(master_cache: Any, session: Any, base_query: A
         return int(cached_total.decode("utf-8")) if cached_total.decode("utf-8") else 0
 
     # Calculate and cache total count
-    count_query = base_query.where(*filters).distinct()
-
-    total_count_sql = select(func.count()).select_from(count_query.subquery())
+    total_count_sql = base_query.with_only_columns(
+        func.count(IntelligenceModel.id)
+    ).where(*filters)
     total_count = (await session.execute(total_count_sql)).scalar()
 
     await master_cache.set(name=cache_key, value=total_count, ex=3600 * 6)
     return total_count
 
 
-async def _execute_intelligence_query(session: Any, base_query: Any, filters: List[Any], load_options: Any, offset: int, limit: int) -> List[Any]:
-    """Execute the main intelligence query with pagination"""
-    query = base_query.where(*filters).options(
-        load_options
-    ).order_by(
-        IntelligenceModel.published_at.desc()
-    ).offset(offset).limit(limit).distinct()
+async def _execute_intelligence_query(session: Any, base_query: Any, filters: List[Any], offset: int, limit: int, rank: Optional[Any] = None) -> List[Any]:
+    """Execute the main intelligence query with pagination, ordered by relevance first when a rank is given"""
+    order_by = [IntelligenceModel.published_at.desc()]
+    if rank is not None:
+        order_by.insert(0, rank.desc())
+
+    query = base_query.where(*filters).order_by(
+        *order_by
+    ).offset(offset).limit(limit)
+
+    return (await session.execute(query)).all()
+
+
+async def _execute_intelligence_keyset_query(session: Any, base_query: Any, filters: List[Any], position: Optional[tuple[datetime, uuid.UUID]], limit: int) -> List[Any]:
+    """Execute the main intelligence query after a keyset position, fetching limit + 1 rows"""
+    conditions = list(filters)
+    if position is not None:
+        conditions.append(
+            tuple_(IntelligenceModel.published_at, IntelligenceModel.id) < tuple_(*position)
+        )
 
-    return (await session.execute(query)).scalars().all()
+    query = base_query.where(*conditions).order_by(
+        IntelligenceModel.published_at.desc(),
+        IntelligenceModel.id.desc()
+    ).limit(limit + 1)
+
+    return (await session.execute(query)).all()
 
 
 async def _process_intelligence_results(request: Request, intelligences: List[Any], query_params: schemas.IntelligenceQueryParams) -> List[Dict[str, Any]]:
@@ -199,25 +537,23 @@ async def _process_intelligence_results(request: Request, intelligences: List[An
         "name": {"en": "Event Hunter", "zh": "Event Hunter"}
     }
 
+    # Validate and convert intelligence data
+    intelligence_infos = [
+        schemas.IntelligenceListOutSchema.model_validate(intelligence).model_dump()
+        for intelligence in intelligences
+    ]
+
+    # Enrich token and author information for the whole page at once
+    entities_by_id, authors_by_id = await _enrich_intelligence_page(request, intelligence_infos, chain_infos)
+
     # Process each intelligence item
     processed_results = []
-    for intelligence in intelligences:
-        # Validate and convert intelligence data
-        intelligence_info = schemas.IntelligenceListOutSchema.model_validate(intelligence).model_dump()
-
-        # Enrich with token information
-        intelligence_info["entities"] = await get_showed_tokens_info(
-            request,
-            intelligence_info.get("showed_tokens", []),
-            chain_infos,
-            intelligence
-        )
+    for intelligence_info in intelligence_infos:
+        intelligence_id = str(intelligence_info["id"])
+        intelligence_info["entities"] = entities_by_id.get(intelligence_id, [])
 
         # Add supplementary information
-        intelligence_info["author"] = await ws_services.get_author_info(
-            intelligence_info,
-            request.context
-        )
+        intelligence_info["author"] = authors_by_id.get(intelligence_id, ws_services.DEFAULT_AUTHOR_INFO)
         intelligence_info["monitor_time"] = await ws_services.get_monitor_time(
             intelligence_info.get("spider_time"),
             intelligence_info.get("published_at")
@@ -231,7 +567,132 @@ async def _process_intelligence_results(request: Request, intelligences: List[An
     return processed_results
 
 
+async def _enrich_intelligence_page(request: Request, intelligence_infos: List[Dict[str, Any]], chain_infos: Dict) -> tuple[Dict[str, List], Dict[str, Dict]]:
+    """
+    Showed tokens and author of every intelligence of a page
+
+    One MGET covers all author and showed token cache keys, the misses are resolved with one token query
+    and one author query, and everything is written back (and hits refreshed) with a single pipeline.
+
+    Returns:
+        tuple: (entities by intelligence id, author info by intelligence id)
+    """
+    if not intelligence_infos:
+        return {}, {}
+
+    intelligence_ids = [str(intelligence_info["id"]) for intelligence_info in intelligence_infos]
+    showed_tokens_by_id = {
+        str(intelligence_info["id"]): intelligence_info.get("showed_tokens")
+        for intelligence_info in intelligence_infos
+        if intelligence_info.get("showed_tokens")
+    }
+    token_ids = list(showed_tokens_by_id)
 
+    cached_values = await request.context.slavecache.mget(
+        [ws_services.author_info_cache_key(intelligence_id) for intelligence_id in intelligence_ids] +
+        [showed_tokens_cache_key(intelligence_id) for intelligence_id in token_ids]
+    )
+    cached_authors = dict(zip(intelligence_ids, cached_values[:len(intelligence_ids)]))
+    cached_entities = dict(zip(token_ids, cached_values[len(intelligence_ids):]))
+
+    authors_by_id = {
+        intelligence_id: json.loads(cached.decode("utf-8"))
+        for intelligence_id, cached in cached_authors.items() if cached
+    }
+    entities_by_id = {
+        intelligence_id: json.loads(cached.decode("utf-8"))
+        for intelligence_id, cached in cached_entities.items() if cached
+    }
+
+    missing_author_ids = [intelligence_id for intelligence_id in intelligence_ids if intelligence_id not in authors_by_id]
+    missing_token_ids = [intelligence_id for intelligence_id in token_ids if intelligence_id not in entities_by_id]
+    missing_token_keys = {
+        token_key
+        for intelligence_id in missing_token_ids
+        for token_key in _showed_token_keys(showed_tokens_by_id[intelligence_id])
+    }
+
+    new_authors = {}
+    if missing_author_ids or missing_token_keys:
+        async with request.context.database.dogex() as session:
+            token_dict = await _query_tokens(session, missing_token_keys)
+            if missing_author_ids:
+                new_authors = await _query_author_infos(session, intelligence_infos, missing_author_ids)
+
+        for intelligence_id in missing_token_ids:
+            if not _showed_token_keys(showed_tokens_by_id[intelligence_id]):
+                entities_by_id[intelligence_id] = []
+                continue
+            entities_by_id[intelligence_id] = _render_showed_tokens(
+                showed_tokens_by_id[intelligence_id], token_dict, chain_infos, intelligence_id
+            )
+        authors_by_id.update(new_authors)
+
+    master_cache = request.context.mastercache
+    pipe = master_cache.backend.pipeline(transaction=False)
+    written = []
+    for intelligence_id in authors_by_id:
+        key = ws_services.author_info_cache_key(intelligence_id)
+        if intelligence_id in new_authors:
+            pipe.set(key, master_cache.encode(key, json.dumps(new_authors[intelligence_id], ensure_ascii=False, cls=JsonResponseEncoder)), ex=settings.EXPIRES_FOR_AUTHOR_INFO)
+            written.append(key)
+        else:
+            await master_cache.touch(key, settings.EXPIRES_FOR_AUTHOR_INFO)
+    for intelligence_id in missing_token_ids:
+        if _showed_token_keys(showed_tokens_by_id[intelligence_id]):
+            key = showed_tokens_cache_key(intelligence_id)
+            pipe.set(
+                key,
+                master_cache.encode(key, json.dumps(entities_by_id[intelligence_id], ensure_ascii=False, cls=JsonResponseEncoder)),
+                ex=settings.EXPIRES_FOR_SHOWED_TOKENS
+            )
+            written.append(key)
+    master_cache.queue_invalidation(pipe, *written)
+    await pipe.execute()
+
+    return entities_by_id, authors_by_id
+
+
+async def _query_author_infos(session: Any, intelligence_infos: List[Dict[str, Any]], intelligence_ids: List[str]) -> Dict[str, Dict]:
+    """Author info of several intelligence with one query over their author links and accounts"""
+    rows = (await session.execute(
+        select(EntityIntelligenceModel, models.AccountModel).join(
+            models.AccountModel, models.AccountModel.id == EntityIntelligenceModel.master_id
+        ).where(
+            EntityIntelligenceModel.intelligence_id.in_(intelligence_ids),
+            EntityIntelligenceModel.type == "author",
+            EntityIntelligenceModel.master_id.is_not(None)
+        )
+    )).all()
+
+    infos = {str(intelligence_info["id"]): intelligence_info for intelligence_info in intelligence_infos}
+    authors = {}
+    for author_ei, account in rows:
+        intelligence_id = str(author_ei.intelligence_id)
+        if intelligence_id in authors:
+            continue
+        intelligence_info = infos[intelligence_id]
+        authors[intelligence_id] = ws_services.build_author_info(
+            intelligence_info.get("type"), intelligence_info.get("subtype"), author_ei, account
+        )
+    return authors
+
+
+async def _query_entity_networks(request: Request, intelligence_ids: List[Any]) -> set:
+    """Networks of the token chain data linked to the entities of several intelligence"""
+    async with request.context.database.dogex() as session:
+        sql = select(
+            TokenChainDataModel.network
+        ).join(
+            EntityModel, EntityModel.id == TokenChainDataModel.entity_id
+        ).join(
+            EntityIntelligenceModel, EntityIntelligenceModel.entity_id == EntityModel.id
+        ).where(
+            EntityIntelligenceModel.intelligence_id.in_(intelligence_ids),
+            TokenChainDataModel.network.is_not(None)
+        ).distinct()
+
+        return set((await session.execute(sql)).scalars().all())
 
 
 async def get_chain_infos(request: Request, intelligences: List) -> Dict[str, Any]:
@@ -246,26 +707,30 @@ async def get_chain_infos(request: Request, intelligences: List) -> Dict[str, An
                     networks.add(showed_token["slug"])
     
     # Fallback to entity tokendata if no showed_tokens
-    if not networks:
-        for intelligence in intelligences:
-            for ei in intelligence.entity_intelligences:
-                if ei.entity and ei.entity.tokendata_entity:
-                    for project_chain_data in ei.entity.tokendata_entity:
-                        if project_chain_data.network:
-                            networks.add(project_chain_data.network)
+    if not networks and intelligences:
+        if all(isinstance(intelligence, IntelligenceModel) for intelligence in intelligences):
+            for intelligence in intelligences:
+                for ei in intelligence.entity_intelligences:
+                    if ei.entity and ei.entity.tokendata_entity:
+                        for project_chain_data in ei.entity.tokendata_entity:
+                            if project_chain_data.network:
+                                networks.add(project_chain_data.network)
+        else:
+            # List rows carry no relationships, their entity networks are queried only in this case
+            networks = await _query_entity_networks(request, [intelligence.id for intelligence in intelligences])
     
     if not networks:
         return {}
     
-    networks_list = list(networks)
-    slave_cache = request.context.slavecache.backend
+    networks_list = sorted(networks)
+    slave_cache = request.context.slavecache
     master_cache = request.context.mastercache.backend
     
-    cache_key = f"dogex:intelligence:chain_infos:networks:{networks_list}"
+    cache_key = await CHAIN_INFOS_KEYS.key(slave_cache, networks_list)
     cached_data = await slave_cache.get(cache_key)
     
     if cached_data is not None:
-        await master_cache.expire(name=cache_key, time=settings.EXPIRES_FOR_CHAIN_INFOS)
+        await request.context.mastercache.touch(cache_key, settings.EXPIRES_FOR_CHAIN_INFOS)
         return json.loads(cached_data.decode("utf-8"))
 
     async with request.context.database.dogex() as session:
@@ -279,63 +744,51 @@ async def get_chain_infos(request: Request, intelligences: List) -> Dict[str, An
 
         await master_cache.set(
             name=cache_key, 
-            value=json.dumps(data, ensure_ascii=False, cls=JsonResponseEncoder), 
+            value=request.context.mastercache.encode(cache_key, json.dumps(data, ensure_ascii=False, cls=JsonResponseEncoder)), 
             ex=settings.EXPIRES_FOR_CHAIN_INFOS
         )
+        await request.context.mastercache.invalidate(cache_key)
         return data
 
 
 
-async def get_showed_tokens_info(request: Request, showed_tokens: Optional[List], chain_infos: Dict, intelligence) -> List[Dict]:
-    """Get token information for showed tokens with caching"""
-    if not showed_tokens:
-        return []
-    
-    master_cache = request.context.mastercache.backend
-    slave_cache = request.context.slavecache.backend
-    
-    # Check cache first
-    cache_key = f"dogex:intelligence:latest_entities:intelligence_id:{intelligence.id}"
-    cached_entities = await slave_cache.get(cache_key)
-    if cached_entities:
-        return json.loads(cached_entities.decode("utf-8"))
-    
-    # Default chain info
-    default_chain_info = {
-        "id": None, "network_id": None, "name": None, 
-        "symbol": None, "logo": None
-    }
-    
-    # Collect token keys for batch query
-    token_keys = [
+def showed_tokens_cache_key(intelligence_id: Any) -> str:
+    return f"{LATEST_ENTITIES_PREFIX}:intelligence_id:{intelligence_id}"
+
+
+def _showed_token_keys(showed_tokens: List) -> List[tuple]:
+    """(network, contract_address) pairs of the showed tokens"""
+    return [
         (showed_token["slug"], showed_token["contract_address"]) 
         for showed_token in showed_tokens
         if "slug" in showed_token and "contract_address" in showed_token
     ]
-    
+
+
+async def _query_tokens(session: Any, token_keys: Any) -> Dict[tuple, Any]:
+    """Token chain data of several (network, contract_address) pairs with one query"""
     if not token_keys:
-        return []
-    
-    # Batch query tokens
-    async with request.context.database.dogex() as session:
-        conditions = [
-            and_(
-                TokenChainDataModel.network == network,
-                TokenChainDataModel.contract_address == contract_address
-            )
-            for network, contract_address in token_keys
-        ]
-        
-        sql = select(TokenChainDataModel).where(or_(*conditions))
-        tokens = (await session.execute(sql)).scalars().all()
-        
-        # Build lookup dictionary
-        token_dict = {
-            (token.network, token.contract_address): token
-            for token in tokens
-        }
-    
-    # Process tokens
+        return {}
+
+    sql = select(TokenChainDataModel).where(
+        tuple_(TokenChainDataModel.network, TokenChainDataModel.contract_address).in_(list(token_keys))
+    )
+    tokens = (await session.execute(sql)).scalars().all()
+
+    return {
+        (token.network, token.contract_address): token
+        for token in tokens
+    }
+
+
+def _render_showed_tokens(showed_tokens: List, token_dict: Dict[tuple, Any], chain_infos: Dict, intelligence_id: Any) -> List[Dict]:
+    """Render the showed tokens of an intelligence from the queried token chain data"""
+    # Default chain info
+    default_chain_info = {
+        "id": None, "network_id": None, "name": None, 
+        "symbol": None, "logo": None
+    }
+
     entities = []
     for showed_token in showed_tokens:
         try:
@@ -346,7 +799,7 @@ async def get_showed_tokens_info(request: Request, showed_tokens: Optional[List]
             
             token = token_dict.get((network, contract_address))
             if not token:
-                logger.error(f"Token not found - intelligence_id: {intelligence.id}, token: {showed_token}")
+                logger.error(f"Token not found - intelligence_id: {intelligence_id}, token: {showed_token}")
                 continue
             
             token_data = {
@@ -375,44 +828,77 @@ async def get_showed_tokens_info(request: Request, showed_tokens: Optional[List]
         except Exception as e:
             logger.error(f"Error processing token {showed_token}: {e}")
             continue
+
+    return entities
+
+
+async def get_showed_tokens_info(request: Request, showed_tokens: Optional[List], chain_infos: Dict, intelligence) -> List[Dict]:
+    """Get token information for showed tokens with caching"""
+    if not showed_tokens:
+        return []
+    
+    master_cache = request.context.mastercache.backend
+    slave_cache = request.context.slavecache
+    
+    # Check cache first
+    cache_key = showed_tokens_cache_key(intelligence.id)
+    cached_entities = await slave_cache.get(cache_key)
+    if cached_entities:
+        return json.loads(cached_entities.decode("utf-8"))
+    
+    # Collect token keys for batch query
+    token_keys = _showed_token_keys(showed_tokens)
+    
+    if not token_keys:
+        return []
+    
+    # Batch query tokens
+    async with request.context.database.dogex() as session:
+        token_dict = await _query_tokens(session, token_keys)
+    
+    # Process tokens
+    entities = _render_showed_tokens(showed_tokens, token_dict, chain_infos, intelligence.id)
     
     # Cache results
     await master_cache.set(
         name=cache_key, 
-        value=json.dumps(entities, ensure_ascii=False, cls=JsonResponseEncoder), 
+        value=slave_cache.encode(cache_key, json.dumps(entities, ensure_ascii=False, cls=JsonResponseEncoder)), 
         ex=settings.EXPIRES_FOR_SHOWED_TOKENS
     )
+    await request.context.mastercache.invalidate(cache_key)
     return entities
 
 
-async def get_intelligence_latest_entities_v2(request: Request, intelligence_id_list: List[str]) -> Dict[str, Any]:
-    """
-    Get real-time token data for intelligence
-    """
-    master_cache = request.context.mastercache.backend
-    slave_cache = request.context.slavecache.backend
+def unique_ids(ids: List[Any], limit: int) -> List[str]:
+    """Ids in request order without blanks and duplicates, capped at limit"""
+    return list(dict.fromkeys(str(value).strip() for value in ids if str(value).strip()))[:limit]
 
-    data_dict = {}
-    for intelligence_id in intelligence_id_list:
-        key = f"dogex:intelligence:latest_entities:intelligence_id:{str(intelligence_id)}"
 
-        cache_data  = await slave_cache.get(key)
+def token_data_cache_key(network: str, address: str) -> str:
+    """Real-time market data of a token, written by the market data service"""
+    return f"token:network:{network}:address:{address}"
 
 
-        data_dict[key] = cache_data
+async def get_intelligence_latest_entities_v2(request: Request, intelligence_id_list: List[str]) -> Dict[str, Any]:
+    """
+    Get real-time token data for intelligence, the cached entities of every intelligence are read with one MGET
+    """
+    intelligence_ids = unique_ids(intelligence_id_list, settings.INTELLIGENCE_ENTITIES_MAX_IDS)
+    if not intelligence_ids:
+        return {}
 
-    result = data_dict
+    cached = await request.context.slavecache.mget([showed_tokens_cache_key(intelligence_id) for intelligence_id in intelligence_ids])
 
     data = {}
     showed_token_intelligence_id_list = []  # Intelligence that needs to be checked back through showed_token
-
-    for key, val in result.items():
-        intel_id = key.strip().rsplit(":", maxsplit=1)[-1]
-        if not val:
-            showed_token_intelligence_id_list.append(intel_id)
+    for intelligence_id, value in zip(intelligence_ids, cached):
+        if not value:
+            showed_token_intelligence_id_list.append(intelligence_id)
             continue
-        # val = json.loads(val.decode("utf-8"))
-        data[intel_id] = val
+        data[intelligence_id] = json.loads(value.decode("utf-8"))
+
+    if not showed_token_intelligence_id_list:
+        return await refresh_token_data_from_cache_v2(request, data)
 
     # Check back the showed_token field of the intelligence list
     async with request.context.database.dogex() as session:
@@ -426,59 +912,48 @@ async def get_intelligence_latest_entities_v2(request: Request, intelligence_id_
 
         # Batch get showed_token
         result = (await session.execute(sql)).mappings().all()
-        if not result:
-            return await refresh_token_data_from_cache_v2(request, data)
-
-        # Convert to serializable types
-        result = [dict(item) for item in result]
 
-        for intel_data in result:
-            intel_id = intel_data["id"]
-            showed_tokens = intel_data["showed_tokens"]
-            adjusted_tokens = intel_data["adjusted_tokens"]
+    for intel_data in result:
+        showed_tokens = intel_data["showed_tokens"]
+        adjusted_tokens = intel_data["adjusted_tokens"]
 
-            if adjusted_tokens is not None:
-                showed_tokens = adjusted_tokens[-1]
+        if adjusted_tokens is not None:
+            showed_tokens = adjusted_tokens[-1]
 
-            showed_token_infos = await get_showed_token_without_chain_infos(request, showed_tokens, intel_id)
+        data[str(intel_data["id"])] = await get_showed_token_without_chain_infos(request, showed_tokens, intel_data["id"])
 
-            data[intel_id] = showed_token_infos
-
-        return await refresh_token_data_from_cache_v2(request, data)
+    return await refresh_token_data_from_cache_v2(request, data)
 
 
 async def refresh_token_data_from_cache_v2(request: Request, data: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Only perform real-time queries for tokens within the visible screen
+    Only perform real-time queries for tokens within the visible screen, from the token snapshots of the worker
+    (the distinct tokens it does not hold yet are read with one MGET)
     """
-    master_cache = request.context.mastercache.backend
-    slave_cache = request.context.slavecache.backend
+    token_keys = list(dict.fromkeys(
+        token_data_cache_key(token.get("chain", {}).get("slug", ""), token.get("contract_address", ""))
+        for token_list in data.values()
+        for token in token_list
+    ))
+    if not token_keys:
+        return data
 
-    for key, token_list in data.items():
+    # Snapshots held by this worker are current, only tokens it has not served yet are read from the replica
+    token_datas = await token_snapshots.snapshots.get_many(request.context.slavecache.backend, token_keys)
 
-        refreshed_token_list = []
-        # Get each token data from cache
+    for token_list in data.values():
         for token in token_list:
-            network = token.get("chain", {}).get("slug", "")
-            address = token.get("contract_address", "")
-
-            # Get cached token data
-            token_cache_key = f"token:network:{network}:address:{address}"
-
-            token_data = await slave_cache.get(token_cache_key)
-            if token_data:
-                token_data = json.loads(token_data.decode("utf-8"), parse_float=decimal.Decimal)
-
-                # Update token data
-                token["stats"]["current_price_usd"] = token_data.get("price_usd") if token_data.get("price_usd") else token["stats"]["current_price_usd"]
-                token["stats"]["current_market_cap"] = token_data.get("market_cap") if token_data.get("market_cap") else token["stats"]["current_market_cap"]
-                token["stats"]["liquidity"] = token_data.get("liquidity") if token_data.get("liquidity") else token["stats"]["liquidity"]
-                token["stats"]["volume_24h"] = token_data.get("volume_24h") if token_data.get("volume_24h") else token["stats"]["volume_24h"]
-
-
-            refreshed_token_list.append(token)
+            token_data = token_datas.get(
+                token_data_cache_key(token.get("chain", {}).get("slug", ""), token.get("contract_address", ""))
+            )
+            if not token_data:
+                continue
 
-        data[key] = refreshed_token_list
+            # Update token data
+            token["stats"]["current_price_usd"] = token_data.get("price_usd") if token_data.get("price_usd") else token["stats"]["current_price_usd"]
+            token["stats"]["current_market_cap"] = token_data.get("market_cap") if token_data.get("market_cap") else token["stats"]["current_market_cap"]
+            token["stats"]["liquidity"] = token_data.get("liquidity") if token_data.get("liquidity") else token["stats"]["liquidity"]
+            token["stats"]["volume_24h"] = token_data.get("volume_24h") if token_data.get("volume_24h") else token["stats"]["volume_24h"]
 
     return data
 
@@ -488,10 +963,10 @@ async def get_showed_token_without_chain_infos(request: Request, showed_tokens:
     showed token data
     """
     master_cache = request.context.mastercache.backend
-    slave_cache = request.context.slavecache.backend
+    slave_cache = request.context.slavecache
 
     # First get hot data from cache
-    key = f"dogex:intelligence:latest_entities:intelligence_id:{str(intelligence_id)}"
+    key = showed_tokens_cache_key(intelligence_id)
     entities = await slave_cache.get(key)
     if entities:
         return json.loads(entities.decode("utf-8"))
@@ -583,7 +1058,8 @@ async def get_showed_token_without_chain_infos(request: Request, showed_tokens:
             entities.append(token_data)
 
         # cold to hot
-        await master_cache.set(name=key, value=json.dumps(entities, ensure_ascii=False, cls=JsonResponseEncoder), ex=settings.EXPIRES_FOR_SHOWED_TOKENS)
+        await master_cache.set(name=key, value=slave_cache.encode(key, json.dumps(entities, ensure_ascii=False, cls=JsonResponseEncoder)), ex=settings.EXPIRES_FOR_SHOWED_TOKENS)
+        await request.context.mastercache.invalidate(key)
         return entities
 
 
@@ -603,7 +1079,7 @@ async def cache_intelligence_next_pages(request: Request, query_params: schemas.
 
     # Cache data for the next 'page_to_cache' pages
     for next_page in range(page + 1, page + page_to_cache + 1):
-        cache_key = f"aigun:intelligence:next_pages_data:query_params:{query_params.model_dump_json()}:page:{next_page}:page_size:{page_size}"
+        cache_key = await NEXT_PAGES_KEYS.key(request.context.slavecache, query_params, page=next_page, page_size=page_size)
 
         # Skip if already cached
         if await master_cache.exists(cache_key):
@@ -622,6 +1098,7 @@ async def cache_intelligence_next_pages(request: Request, query_params: schemas.
         await master_cache.expire(cache_key, settings.EXPIRES_FOR_INTELLIGENCE)
 
 
+@coalesce(request_flight, lambda request, network, address: (network, address))
 async def retrieve_token(request: Request, network: str, address: str) -> Dict[str, Any]:
     async with request.context.database.dogex() as session:
         sql = select(models.TokenChainDataModel).where(
@@ -639,9 +1116,95 @@ async def retrieve_token(request: Request, network: str, address: str) -> Dict[s
         return token_info
 
 
+def highest_increase_rate_cache_key(network: str, address: str) -> str:
+    return f"dogex:intelligence:highest_increase_rate:network:{network}:address:{address}"
+
+
+def parse_token_pairs(tokens: str, limit: int) -> List[tuple]:
+    """(network, address) pairs of a 'network:address,...' list in request order without duplicates, capped at limit"""
+    pairs = []
+    for token in tokens.split(","):
+        network, _, address = token.strip().partition(":")
+        if not network or not address:
+            raise HTTPException(code=code.CODE_ERROR, message=f"Invalid token {token.strip()!r}, expected network:address", status_code=400)
+        pairs.append((network, address))
+    return list(dict.fromkeys(pairs))[:limit]
+
+
+async def increase_rates_from_table(request: Request) -> bool:
+    """Read the precomputed table, once its first full build completed"""
+    return settings.INCREASE_RATE_FROM_TABLE and await increase_rates.table_ready(request.context.slavecache.backend)
+
+
+async def _query_increase_rates(session: Any, tokens: List[tuple], from_table: bool) -> Dict[tuple, float]:
+    """Highest increase rate of several tokens in one grouped query, tokens without intelligence are left out"""
+    if from_table:
+        return await increase_rates.get_increase_rates(session, tokens)
+
+    sql = select(
+        models.TokenChainDataModel.network,
+        models.TokenChainDataModel.contract_address,
+        func.max(models.EntityIntelligenceModel.highest_increase_rate)
+    ).join(
+        models.EntityIntelligenceModel.entity
+    ).join(
+        models.EntityModel.tokendata_entity
+    ).where(
+        tuple_(models.TokenChainDataModel.network, models.TokenChainDataModel.contract_address).in_(tokens),
+        models.EntityIntelligenceModel.is_deleted == False
+    ).group_by(
+        models.TokenChainDataModel.network, models.TokenChainDataModel.contract_address
+    )
+    return {(network, address): rate or 0.0 for network, address, rate in (await session.execute(sql)).all()}
+
+
+async def retrieve_tokens(request: Request, tokens: List[tuple]) -> List[Dict[str, Any]]:
+    """
+    Token details of several (network, address) pairs in request order, shaped like retrieve_token
+
+    One query reads the tokens, one MGET their cached highest increase rates and one grouped query the rates
+    missing from the cache.
+    """
+    if not tokens:
+        return []
+
+    rate_keys = [highest_increase_rate_cache_key(network, address) for network, address in tokens]
+    cached_rates = await request.context.slavecache.backend.mget(rate_keys)
+    rates = {token: float(rate.decode("utf-8")) for token, rate in zip(tokens, cached_rates) if rate}
+
+    async with request.context.database.dogex() as session:
+        sql = select(models.TokenChainDataModel).where(
+            tuple_(models.TokenChainDataModel.network, models.TokenChainDataModel.contract_address).in_(tokens)
+        )
+        found = {(token.network, token.contract_address): token for token in (await session.execute(sql)).scalars().all()}
+
+        missing = [token for token in tokens if token in found and token not in rates]
+        if missing:
+            from_table = await increase_rates_from_table(request)
+            queried = await _query_increase_rates(session, missing, from_table)
+            pipe = request.context.mastercache.backend.pipeline(transaction=False)
+            for token in missing:
+                rates[token] = queried.get(token, 0.0)
+                # A token without a row in the table may not be computed yet, it is read again next time
+                if token in queried or not from_table:
+                    pipe.set(highest_increase_rate_cache_key(*token), rates[token], ex=settings.EXPIRES_FOR_HIGHEST_INCREASE_RATE)
+            await pipe.execute()
+
+    token_infos = []
+    for token in tokens:
+        if token not in found:
+            logger.warning(f"Token not found: {token[0]}:{token[1]}")
+            token_infos.append({})
+            continue
+        token_info = schemas.TokenInfoOutSchema.model_validate(found[token]).model_dump()
+        token_info["highest_increase_rate"] = rates[token]
+        token_infos.append(token_info)
+    return token_infos
+
+
 async def get_highest_increase_rate_v2(request: Request, network: str, address: str) -> float:
     """Get highest increase rate with caching"""
-    cache_key = f"dogex:intelligence:highest_increase_rate:network:{network}:address:{address}"
+    cache_key = highest_increase_rate_cache_key(network, address)
     
     # Try cache first
     cached_rate = await request.context.slavecache.backend.get(cache_key)
@@ -650,19 +1213,26 @@ async def get_highest_increase_rate_v2(request: Request, network: str, address:
     
     try:
         async with request.context.database.dogex() as session:
-            sql = select(
-                func.max(models.EntityIntelligenceModel.highest_increase_rate)
-            ).join(
-                models.EntityIntelligenceModel.entity
-            ).join(
-                models.EntityModel.tokendata_entity
-            ).where(
-                models.TokenChainDataModel.contract_address == address,
-                models.TokenChainDataModel.network == network,
-                models.EntityIntelligenceModel.is_deleted == False
-            )
-            
-            max_rate = (await session.execute(sql)).scalars().first() or 0.0
+            if await increase_rates_from_table(request):
+                # One indexed lookup in the table the increase rate job maintains
+                max_rate = await increase_rates.get_increase_rate(session, network, address)
+                if max_rate is None:
+                    # Not computed yet or no intelligence, not cached so the row is read once the job writes it
+                    return 0.0
+            else:
+                sql = select(
+                    func.max(models.EntityIntelligenceModel.highest_increase_rate)
+                ).join(
+                    models.EntityIntelligenceModel.entity
+                ).join(
+                    models.EntityModel.tokendata_entity
+                ).where(
+                    models.TokenChainDataModel.contract_address == address,
+                    models.TokenChainDataModel.network == network,
+                    models.EntityIntelligenceModel.is_deleted == False
+                )
+
+                max_rate = (await session.execute(sql)).scalars().first() or 0.0
             
             # Cache result
             await request.context.mastercache.backend.set(
@@ -678,6 +1248,7 @@ async def get_highest_increase_rate_v2(request: Request, network: str, address:
         return 0.0
 
 
+@coalesce(request_flight, lambda request, intelligence_id: str(intelligence_id))
 async def retrieve_intelligence(request: Request, intelligence_id: str) -> Dict[str, Any]:
     async with request.context.database.dogex() as session:
         entity_load_options = selectinload(
@@ -737,42 +1308,59 @@ async def get_intelligence_info(intelligence: Any, request: Request, chain_infos
     return intelligence_info
 
 
+async def refresh_latest_tokens_data(request: Request, tokens: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Live market data of the tokens of a latest tokens page, from the token snapshots of the worker"""
+    token_keys = list(dict.fromkeys(token_data_cache_key(token["network"], token["contract_address"]) for token in tokens))
+    if not token_keys:
+        return tokens
+
+    token_datas = await token_snapshots.snapshots.get_many(request.context.slavecache.backend, token_keys)
+    for token in tokens:
+        token_data = token_datas.get(token_data_cache_key(token["network"], token["contract_address"]))
+        if not token_data:
+            continue
+        for field in ("price_usd", "market_cap", "liquidity", "volume_24h"):
+            if token_data.get(field):
+                token[field] = token_data[field]
+
+    return tokens
+
+
+def latest_appear_tokens_cache_key(last_query_time: Optional[datetime]) -> str:
+    return f"aigun:intelligence:latest_appear_tokens:last_query_time:{last_query_time}"
+
+
+def display_time_cursor(time_str: Any) -> datetime:
+    """Cursor of the page after a token, as the client sends it back"""
+    return datetime.fromisoformat(time_str.replace('Z', '+00:00')) if isinstance(time_str, str) else time_str
+
+
+@coalesce(request_flight, lambda request, last_query_time: last_query_time)
 async def get_latest_entities(request: Request, last_query_time: Optional[datetime]):
     """
-    Retrieve the latest tokens with caching support
+    Retrieve the latest tokens, a slice of the latest tokens feed when it reaches the cursor, with caching support
     """
+    tokens = latest_tokens.feed.page(last_query_time)
+    if tokens is not None:
+        return await refresh_latest_tokens_data(request, tokens)
+
     # Initialize cache backends
     master_cache = await request.context.mastercache.backend
     slave_cache = await request.context.slavecache.backend
 
     # Generate cache key
-    cache_key = f"aigun:intelligence:latest_appear_tokens:last_query_time:{last_query_time}"
+    cache_key = latest_appear_tokens_cache_key(last_query_time)
 
     # Try to get from cache first
     cached_data = await slave_cache.get(cache_key)
     if cached_data:
         return json.loads(cached_data.decode("utf-8"))
 
-    # Build query conditions
-    conditions = [
-        models.TokenChainDataModel.display_time.is_not(None)
-    ]
-
-    if last_query_time:
-        # Handle timezone-aware datetime
-        naive_last_query_time = last_query_time.replace(tzinfo=None) if last_query_time.tzinfo else last_query_time
-        conditions.append(models.TokenChainDataModel.display_time < naive_last_query_time)
-
-    # Execute database query
+    # Execute database query, served by idx_token_display_time
     async with request.context.database.dogex() as session:
-        query = select(models.TokenChainDataModel).where(
-            *conditions
-        ).options(
-            selectinload(models.TokenChainDataModel.chain)
-        ).order_by(
-            models.TokenChainDataModel.display_time.desc(),
-            models.TokenChainDataModel.market_cap.desc()
-        ).limit(20).distinct()
+        query = latest_tokens.latest_tokens_query(
+            before=latest_tokens.cursor_time(last_query_time)
+        ).limit(latest_tokens.LATEST_TOKENS_PAGE_SIZE).distinct()
 
         tokens = (await session.execute(query)).scalars().all()
 
@@ -793,34 +1381,46 @@ async def get_latest_entities(request: Request, last_query_time: Optional[dateti
 
 
 async def cache_follow_latest_appear_tokens(request: Request, last_query_time: Optional[datetime]):
-    """Pre-cache latest appear tokens"""
+    """Pre-cache the latest appear tokens pages after a cursor, read with one query and written in one pipeline"""
 
-    slave_cache = request.context.slavecache.backend
+    if latest_tokens.feed.page(last_query_time) is not None:
+        # The next pages are slices of the feed
+        return
 
-    for _ in range(5):
-        cache_key = f"aigun:intelligence:latest_appear_tokens:last_query_time:{last_query_time}"
-        cached_data = await slave_cache.get(cache_key)
+    if await request.context.slavecache.backend.exists(latest_appear_tokens_cache_key(last_query_time)):
+        return
 
-        if cached_data:
-            result = json.loads(cached_data.decode("utf-8"))
-        else:
-            result = await get_latest_entities(request, last_query_time)
+    page_size = latest_tokens.LATEST_TOKENS_PAGE_SIZE
+    async with request.context.database.dogex() as session:
+        query = latest_tokens.latest_tokens_query(
+            before=latest_tokens.cursor_time(last_query_time)
+        ).limit(page_size * settings.LATEST_APPEAR_TOKEN_FOLLOW_PAGES + 1).distinct()
+        tokens = (await session.execute(query)).scalars().all()
+        rows = [schemas.TokenChainDataOutSchema.model_validate(token).model_dump() for token in tokens]
 
-        if not result:
-            break
+    pages = split_pages(rows, page_size, settings.LATEST_APPEAR_TOKEN_FOLLOW_PAGES, lambda token: token["display_time"])
+    if not pages:
+        return
 
-        # Parse last display time
-        time_str = result[-1]["display_time"]
-        last_query_time = (
-            datetime.fromisoformat(time_str.replace('Z', '+00:00'))
-            if isinstance(time_str, str)
-            else time_str
+    pipe = request.context.mastercache.backend.pipeline(transaction=False)
+    for result in pages:
+        pipe.set(
+            latest_appear_tokens_cache_key(last_query_time),
+            json.dumps(result, ensure_ascii=False, cls=JsonResponseEncoder),
+            ex=settings.EXPIRES_FOR_LATEST_APPEAR_TOKEN
         )
+        last_query_time = display_time_cursor(result[-1]["display_time"])
+    await pipe.execute()
+
 
 async def list_token_urls(request: Request,  network: str, address: str):
 
+    if social_links.index.loaded:
+        # Held by this worker, no cache or database round trip
+        return social_links.index.urls(network, address)
+
     master_cache = request.context.mastercache.backend
-    slave_cache = request.context.slavecache.backend
+    slave_cache = request.context.slavecache
     token_urls_key = f"aigun:intelligence:token_urls:network:{network}:address:{address}"
 
     data = await slave_cache.get(token_urls_key)
@@ -830,10 +1430,12 @@ async def list_token_urls(request: Request,  network: str, address: str):
     data = await get_token_urls(request, network, address)
 
     await master_cache.set(name=token_urls_key, value=json.dumps(data, ensure_ascii=False), ex=settings.EXPIRES_FOR_TOKEN_URLS)
+    await request.context.mastercache.invalidate(token_urls_key)
 
     return data
 
 
+@coalesce(request_flight, lambda request, network, address: (network, address))
 async def get_token_urls(request: Request, network: str, address: str):
     """
     Get Token Community Link
@@ -875,7 +1477,7 @@ async def get_all_link_types(request: Request):
     """
 
     master_cache = request.context.mastercache.backend
-    slave_cache = request.context.slavecache.backend
+    slave_cache = request.context.slavecache
     link_types_key = "aigun:intelligence:token_social_link_types"
 
     data = await slave_cache.get(link_types_key)
@@ -892,6 +1494,7 @@ async def get_all_link_types(request: Request):
         data = (await session.execute(sql)).scalars().all()
 
     await master_cache.set(name=link_types_key, value=json.dumps(data, ensure_ascii=False), ex=settings.EXPIRES_FOR_TOKEN_SOCIAL_LINK_TYPES)
+    await request.context.mastercache.invalidate(link_types_key)
 
     return data
 
@@ -912,39 +1515,31 @@ async def process_token_social_links(token_social_links: List[Dict], result: Dic
 
 
 async def retrieve_token_related_intel_count(request: Request, query_params):
-    master_cache = request.context.mastercache.backend
-    slave_cache = request.context.slavecache.backend
+    """Number of valuable intelligence related to a token, served from its Redis counter"""
+    return await counters.get_token_count(request, query_params.network, query_params.address)
 
-    # First try to get the total number of items from the cache
-    total = await slave_cache.get(f"aigun:intelligence:intelligence_list:count:query_params:{query_params.model_dump_json()}")
-    if total is not None:
-        return int(total.decode("utf-8")) if total.decode("utf-8") else 0
 
-    # Cache miss, query from the database
-    async with request.context.database.dogex() as session:
-        sql = select(IntelligenceModel)
+async def warm_list_page(request: Request, query_params: schemas.IntelligenceQueryParams, page: int, page_size: int) -> None:
+    """Fill what serving a list page reads: feed index items, or the page cache when the index cannot answer"""
+    if await feed_index.get_feed_index_page(request, query_params, page, page_size) is None:
+        await cache_page(request, query_params, page, page_size)
 
-        entity_load_options = selectinload(
-            IntelligenceModel.entity_intelligences
-        ).selectinload(
-            EntityIntelligenceModel.entity
-        ).options(
-            selectinload(EntityModel.tokendata_entity)
-        )
 
-        if query_params.address is not None and query_params.network is not None:
-            sql = sql.join(IntelligenceModel.entity_intelligences).join(EntityIntelligenceModel.entity).join(
-                EntityModel.tokendata_entity)
-            sql = sql.where(and_(
-                TokenChainDataModel.contract_address == query_params.address,
-                TokenChainDataModel.network == query_params.network
-            ))
+@on_warmup("intelligence_pages")
+def warm_intelligence_pages(request: Request) -> List[Awaitable]:
+    """Default list pages, their chain infos, showed tokens and authors are cached on the way"""
+    page_size = int(settings.PAGE_SIZE)
+    return [
+        warm_list_page(request, schemas.IntelligenceQueryParams(), page, page_size)
+        for page in range(1, settings.CACHE_WARMUP_PAGES + 1)
+    ]
 
-        distinct_query = sql.where(IntelligenceModel.is_valuable == True).options(defer(IntelligenceModel.extra_datas), entity_load_options).distinct()
-        total_count_sql = select(func.count()).select_from(distinct_query.subquery())
 
-        total: int = (await session.execute(total_count_sql)).scalar()
+@on_warmup("link_types")
+def warm_link_types(request: Request) -> List[Awaitable]:
+    return [get_all_link_types(request)]
 
-        await master_cache.set(name=f"aigun:intelligence:intelligence_list:count:query_params:{query_params.model_dump_json()}", value=total, ex=3600 * 6)
 
-        return total
\ No newline at end of file
+@on_warmup("latest_entities")
+def warm_latest_entities(request: Request) -> List[Awaitable]:
+    return [get_latest_entities(request, None)]
@@ -0,0 +1,150 @@
+"""
+Worker-resident index of the token social links
+
+token_social_links is small and changes rarely, so every worker holds all of it by (network, contract address)
+and answers /token/urls from memory. The index is loaded at startup, then refreshed every
+SOCIAL_LINK_REFRESH_INTERVAL seconds from the rows updated since the last load (the tokens they belong to are
+reloaded whole, so soft deletes apply), and reloaded in full every SOCIAL_LINK_RELOAD_INTERVAL seconds to
+drop rows deleted from the table.
+"""
+import sys
+import time
+import asyncio
+from datetime import datetime
+from typing import Dict, List, Tuple, Optional, Any
+
+from fastapi import FastAPI
+from sqlalchemy import select, func, tuple_
+
+from apps.intelligence.models import TokenSocialLinksModel
+from data import Context, create_logger
+from middleware.lifespan import on_startup, WATERMARK_OVERLAP
+import settings
+
+
+logger = create_logger("dogex-intelligence-social-links")
+
+
+def _deep_size(value: Any) -> int:
+    """Approximate memory held by nested dicts / tuples / lists of strings and numbers"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_deep_size(key) + _deep_size(item) for key, item in value.items())
+    elif isinstance(value, (tuple, list, set)):
+        size += sum(_deep_size(item) for item in value)
+    return size
+
+
+def _link_columns():
+    return select(
+        TokenSocialLinksModel.network,
+        TokenSocialLinksModel.contract_address,
+        TokenSocialLinksModel.link_type,
+        TokenSocialLinksModel.url,
+        TokenSocialLinksModel.updated_at
+    ).where(
+        TokenSocialLinksModel.is_deleted == False
+    ).order_by(
+        # The first ranked link of a type wins
+        TokenSocialLinksModel.rank.desc().nulls_first()
+    )
+
+
+class SocialLinkIndex:
+    """
+    Links of every token by (network, contract address), and every link type in use
+    """
+
+    def __init__(self) -> None:
+        self.loaded = False
+        self.loaded_at = 0.0
+        self.refreshed_at = 0.0
+        self._links: Dict[Tuple[str, str], Dict[str, str]] = {}
+        self._link_types: List[str] = []
+        self._watermark: Optional[datetime] = None
+
+    def urls(self, network: str, address: str) -> Dict[str, str]:
+        """Link of every type for a token, an empty string for the types it has no link of"""
+        return {**dict.fromkeys(self._link_types, ""), **self._links.get((network, address), {})}
+
+    def _apply(self, rows: List[Any], tokens: Optional[List[Tuple[str, str]]] = None) -> None:
+        """Replace the links of the tokens (all tokens when None) with the rows read for them"""
+        links = {} if tokens is None else {**self._links, **{token: {} for token in tokens}}
+        for network, address, link_type, url, updated_at in rows:
+            links.setdefault((network, address), {})[link_type] = url
+            if updated_at is not None and (self._watermark is None or updated_at > self._watermark):
+                self._watermark = updated_at
+
+        self._links = {token: token_links for token, token_links in links.items() if token_links}
+        self._link_types = sorted({link_type for token_links in self._links.values() for link_type in token_links})
+
+    async def load(self, context: Context) -> int:
+        """Read the whole table, returns the number of tokens"""
+        async with context.database.dogex() as session:
+            rows = (await session.execute(_link_columns())).all()
+
+        self._watermark = None
+        self._apply(rows)
+        self.loaded = True
+        self.loaded_at = self.refreshed_at = time.time()
+        return len(self._links)
+
+    async def refresh(self, context: Context) -> int:
+        """Reload the tokens with rows updated since the last load or refresh, returns the number of tokens"""
+        if self._watermark is None:
+            return await self.load(context)
+
+        async with context.database.dogex() as session:
+            # Deleted rows included, their tokens lose the links
+            changed = (await session.execute(
+                select(
+                    TokenSocialLinksModel.network, TokenSocialLinksModel.contract_address, func.max(TokenSocialLinksModel.updated_at)
+                ).where(
+                    TokenSocialLinksModel.updated_at > self._watermark - WATERMARK_OVERLAP
+                ).group_by(
+                    TokenSocialLinksModel.network, TokenSocialLinksModel.contract_address
+                )
+            )).all()
+            tokens = [(network, address) for network, address, _ in changed]
+            rows = (await session.execute(_link_columns().where(
+                tuple_(TokenSocialLinksModel.network, TokenSocialLinksModel.contract_address).in_(tokens)
+            ))).all() if tokens else []
+
+        if tokens:
+            self._apply(rows, tokens)
+            self._watermark = max([self._watermark] + [updated_at for *_, updated_at in changed if updated_at is not None])
+        self.refreshed_at = time.time()
+        return len(tokens)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "loaded": self.loaded,
+            "tokens": len(self._links),
+            "links": sum(len(token_links) for token_links in self._links.values()),
+            "link_types": len(self._link_types),
+            "memory_bytes": _deep_size(self._links) + _deep_size(self._link_types),
+            "loaded_at": self.loaded_at,
+            "refreshed_at": self.refreshed_at,
+        }
+
+
+index = SocialLinkIndex()
+
+
+@on_startup
+async def maintain_social_link_index(app: FastAPI):
+    """Load the index on every worker, then refresh it by delta and reload it periodically"""
+    if not isinstance(app, FastAPI) or not settings.SOCIAL_LINK_INDEX:
+        return
+
+    context: Context = app.state.context
+    while True:
+        try:
+            if time.time() - index.loaded_at >= settings.SOCIAL_LINK_RELOAD_INTERVAL:
+                tokens = await index.load(context)
+                logger.info(f"Loaded the social links of {tokens} tokens")
+            else:
+                await index.refresh(context)
+        except Exception as e:
+            logger.error(f"Social link index refresh error: {e}")
+        await asyncio.sleep(settings.SOCIAL_LINK_REFRESH_INTERVAL)
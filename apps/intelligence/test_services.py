@@ -0,0 +1,902 @@
+import json
+import decimal
+import uuid
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+from datetime import datetime, timezone
+
+
+class TestIntelligenceCursor(unittest.TestCase):
+
+    def test_cursor_round_trip(self):
+        from apps.intelligence.services import encode_cursor, decode_cursor
+
+        published_at = datetime(2025, 1, 2, 3, 4, 5, 678000, tzinfo=timezone.utc)
+        intelligence_id = uuid.uuid4()
+
+        cursor = encode_cursor(published_at, intelligence_id)
+
+        self.assertNotIn("=", cursor)
+        self.assertEqual(decode_cursor(cursor), (published_at, intelligence_id))
+
+    def test_empty_cursor_is_head(self):
+        from apps.intelligence.services import decode_cursor
+
+        self.assertIsNone(decode_cursor(""))
+        self.assertIsNone(decode_cursor(None))
+
+    def test_invalid_cursor(self):
+        from apps.intelligence.services import decode_cursor
+        from views.render import HTTPException
+
+        with self.assertRaises(HTTPException):
+            decode_cursor("not-a-cursor")
+
+
+class TestFeedIndexKeys(unittest.TestCase):
+
+    def test_social_intelligence_matches_social_group(self):
+        from apps.intelligence.feed_index import matching_index_keys, feed_index_key
+
+        keys = matching_index_keys("twitter", "tweet", True)
+
+        self.assertEqual(len(keys), 12)
+        self.assertIn(feed_index_key("social", None, True), keys)
+        self.assertIn(feed_index_key(None, None, None), keys)
+        self.assertNotIn(feed_index_key("news", None, None), keys)
+
+    def test_unindexed_filter_falls_back(self):
+        from apps.intelligence.feed_index import index_key_for_query, feed_index_key
+        from apps.intelligence.schemas import IntelligenceQueryParams
+
+        query_params = IntelligenceQueryParams(type="news", subtype=None, is_valuable=True, address=None, chain_name=None)
+        self.assertEqual(index_key_for_query(query_params), feed_index_key("news", None, True))
+
+        query_params.address = "0x123"
+        self.assertIsNone(index_key_for_query(query_params))
+
+
+class TestFeedIndexPages(unittest.IsolatedAsyncioTestCase):
+
+    async def test_page_etag_is_checked_before_fetching_items(self):
+        from apps.intelligence.views import feed_index_response
+        from views.render import NotModified, make_etag
+
+        items = [json.dumps({"id": "a"}).encode(), json.dumps({"id": "b"}).encode()]
+        request = MagicMock()
+        request.headers = {}
+        request.context.slavecache.mget = AsyncMock(return_value=items)
+        page_query = MagicMock(page=1, page_size=2)
+
+        response = await feed_index_response(request, ["a", "b"], 7, page_query)
+        etag = response.headers["etag"]
+        self.assertEqual(json.loads(response.body)["data"], [{"id": "a"}, {"id": "b"}])
+
+        # The client sends the ETag back, only the item versions are read
+        versions = [make_etag(item).encode() for item in items]
+        request.headers = {"if-none-match": etag}
+        request.context.slavecache.mget = AsyncMock(return_value=versions)
+        response = await feed_index_response(request, ["a", "b"], 7, page_query)
+
+        self.assertIsInstance(response, NotModified)
+        request.context.slavecache.mget.assert_awaited_once_with([
+            "aigun:intelligence:feed:item:a:version", "aigun:intelligence:feed:item:b:version"
+        ])
+
+        # A new total changes the ETag
+        request.context.slavecache.mget = AsyncMock(side_effect=[versions, items])
+        response = await feed_index_response(request, ["a", "b"], 8, page_query)
+        self.assertNotIsInstance(response, NotModified)
+        self.assertNotEqual(response.headers["etag"], etag)
+
+
+    async def test_messages_without_visibility_are_looked_up(self):
+        from types import SimpleNamespace
+        from apps.intelligence import feed_index
+
+        context = MagicMock()
+        session = context.database.dogex.return_value.__aenter__.return_value
+        session.execute = AsyncMock(return_value=MagicMock(first=MagicMock(
+            return_value=SimpleNamespace(is_visible=False, is_deleted=False)
+        )))
+
+        intelligence = await feed_index.with_visibility(context, {"id": "a", "type": "news"})
+        self.assertFalse(feed_index.is_listed(intelligence))
+        self.assertFalse(feed_index.is_listed({"id": "a", "type": "news"}))
+
+        # Messages carrying is_visible are taken as is
+        self.assertTrue(feed_index.is_listed(await feed_index.with_visibility(context, {"id": "b", "is_visible": True})))
+        session.execute.assert_awaited_once()
+
+
+class TestIntelligenceCounters(unittest.TestCase):
+
+    def test_valuable_intelligence_counts_for_its_tokens(self):
+        from apps.intelligence.counters import matching_counter_keys, filter_counter_key, token_counter_key
+
+        keys = matching_counter_keys({
+            "type": "twitter",
+            "is_valuable": True,
+            "entities": [
+                {"network": "ethereum", "contractAddress": "0x123"},
+                {"network": "ethereum", "contractAddress": "0x123"},
+                {"network": "ethereum"},
+            ],
+        })
+
+        self.assertIn(filter_counter_key("social", None, True), keys)
+        self.assertEqual(keys.count(token_counter_key("ethereum", "0x123")), 1)
+
+    def test_non_valuable_intelligence_skips_token_counters(self):
+        from apps.intelligence.counters import matching_counter_keys
+
+        keys = matching_counter_keys({
+            "type": "news",
+            "is_valuable": False,
+            "entities": [{"network": "ethereum", "contractAddress": "0x123"}],
+        })
+
+        self.assertFalse(any(":token:" in key for key in keys))
+
+
+class TestCounterUpkeep(unittest.IsolatedAsyncioTestCase):
+
+    async def test_reads_extend_the_ttl_and_reconcile_keeps_it(self):
+        from apps.intelligence import counters
+
+        request = MagicMock()
+        request.context.slavecache.backend.get = AsyncMock(return_value=b"12")
+        request.context.mastercache.touch = AsyncMock()
+        key = counters.filter_counter_key(None, None, True)
+
+        self.assertEqual(await counters._get_count(request, key, {}), 12)
+        request.context.mastercache.touch.assert_awaited_once_with(key, counters.settings.EXPIRES_FOR_INTELLIGENCE_COUNTER)
+
+        context = MagicMock()
+        backend = context.mastercache.backend
+        backend.hgetall = AsyncMock(return_value={key.encode(): b"{}", b"unread": b"{}"})
+        backend.exists = AsyncMock(side_effect=[1, 0])
+        backend.set = AsyncMock()
+        backend.hdel = AsyncMock()
+        with patch.object(counters, "_count_from_database", AsyncMock(return_value=13)):
+            self.assertEqual(await counters.reconcile_counters(context), 1)
+
+        backend.set.assert_awaited_once_with(key, 13, xx=True, keepttl=True)
+        backend.hdel.assert_awaited_once_with(counters.COUNTER_REGISTRY_KEY, "unread")
+
+
+    async def test_count_without_token_covers_every_valuable_intelligence(self):
+        from apps.intelligence import counters
+
+        master_cache = MagicMock()
+        master_cache.eval = AsyncMock()
+        await counters.count_intelligence(master_cache, {"id": "a", "is_valuable": True, "is_visible": False})
+
+        master_cache.eval.assert_awaited_with(
+            counters.COUNT_SCRIPT, 2, counters.valuable_marker_key("a"), counters.VALUABLE_COUNTER_KEY, 1,
+            counters.COUNTED_MARKER_TTL
+        )
+
+        session = MagicMock()
+        session.execute = AsyncMock(return_value=MagicMock(scalar=MagicMock(return_value=3)))
+        self.assertEqual(await counters._count_from_database(session, {"kind": "valuable"}), 3)
+        sql = str(session.execute.await_args.args[0])
+        self.assertIn("is_valuable", sql)
+        self.assertNotIn("is_visible", sql)
+
+
+class TestPageEnrichment(unittest.IsolatedAsyncioTestCase):
+
+    async def test_cached_page_uses_one_mget_and_no_database(self):
+        from apps.intelligence.services import _enrich_intelligence_page
+
+        author = {"slug": "author"}
+        entities = [{"symbol": "PEPE"}]
+        mock_request = MagicMock()
+        mock_request.context.slavecache.mget = AsyncMock(return_value=[
+            json.dumps(author).encode(), json.dumps(author).encode(), json.dumps(entities).encode()
+        ])
+        mock_request.context.mastercache.touch = AsyncMock()
+        pipe = mock_request.context.mastercache.backend.pipeline.return_value
+        pipe.execute = AsyncMock()
+
+        intelligence_infos = [
+            {"id": uuid.uuid4(), "showed_tokens": [{"slug": "ethereum", "contract_address": "0x123"}]},
+            {"id": uuid.uuid4(), "showed_tokens": None},
+        ]
+        entities_by_id, authors_by_id = await _enrich_intelligence_page(mock_request, intelligence_infos, {})
+
+        mock_request.context.slavecache.mget.assert_awaited_once()
+        mock_request.context.database.dogex.assert_not_called()
+        self.assertEqual(entities_by_id, {str(intelligence_infos[0]["id"]): entities})
+        self.assertEqual(len(authors_by_id), 2)
+        self.assertEqual(mock_request.context.mastercache.touch.await_count, 2)
+        pipe.expire.assert_not_called()
+
+
+class TestListProjection(unittest.TestCase):
+
+    def test_list_query_selects_only_response_columns(self):
+        from sqlalchemy.dialects import postgresql
+        from apps.intelligence.services import _build_list_query
+        from apps.intelligence.schemas import IntelligenceListOutSchema
+
+        query_params = type("QueryParams", (), {"type": None, "subtype": None, "is_valuable": True, "influence_level": "S"})()
+        base_query, filters = _build_list_query(query_params)
+
+        self.assertEqual(
+            [column.name for column in base_query.selected_columns],
+            list(IntelligenceListOutSchema.model_fields)
+        )
+        sql = str(base_query.where(*filters).compile(dialect=postgresql.dialect()))
+        self.assertNotIn("JOIN", sql)
+        self.assertIn("EXISTS", sql)
+
+
+class TestKeywordSearch(unittest.TestCase):
+
+    def test_postgres_uses_indexed_columns(self):
+        from sqlalchemy.dialects import postgresql
+        from apps.intelligence.services import _keyword_filter
+
+        compiled = _keyword_filter("100%_pepe", True).compile(dialect=postgresql.dialect())
+
+        self.assertIn("intelligence.search_vector @@ websearch_to_tsquery", str(compiled))
+        self.assertIn("intelligence.search_text ILIKE", str(compiled))
+        self.assertIn("%100/%/_pepe%", compiled.params.values())
+
+    def test_fallback_without_full_text(self):
+        from sqlalchemy.dialects import sqlite
+        from apps.intelligence.services import _keyword_filter, _keyword_rank
+
+        sql = str(_keyword_filter("pepe", False).compile(dialect=sqlite.dialect()))
+
+        self.assertNotIn("search_", sql)
+        self.assertIn("intelligence.content", sql)
+        self.assertIsNone(_keyword_rank(type("QueryParams", (), {"key_word": "pepe"})(), False))
+
+
+class TestDemandPrefetch(unittest.IsolatedAsyncioTestCase):
+
+    def test_prefetch_stops_at_first_unlikely_page(self):
+        from apps.intelligence.prefetch import pages_to_prefetch
+
+        self.assertEqual(pages_to_prefetch(2, [b"100", b"60", b"10", b"40"]), [3])
+        self.assertEqual(pages_to_prefetch(2, [b"100", b"60", b"35", None]), [3, 4])
+        # Too few views of the current page to estimate anything
+        self.assertEqual(pages_to_prefetch(2, [b"5", b"5", b"5", b"5"]), [])
+
+    async def test_pages_answered_by_the_feed_index_are_not_prefetched(self):
+        from apps.intelligence import prefetch, schemas
+
+        request = MagicMock()
+        pipe = request.context.mastercache.backend.pipeline.return_value
+        pipe.execute = AsyncMock(return_value=[1, True, [b"100", b"90", b"80", b"70"]])
+        query_params = schemas.IntelligenceQueryParams()
+
+        with patch.object(prefetch.settings, "FEED_INDEX_MAX_LENGTH", 80), \
+                patch.object(prefetch.settings, "PREFETCH_MAX_DEPTH", 3), \
+                patch.object(prefetch.scheduler, "submit", AsyncMock()) as submit:
+            # Pages 2 to 4 are all in the index
+            await prefetch.record_and_prefetch(request, query_params, 1, 20)
+            submit.assert_not_called()
+
+            # Past the indexed head only the pages the index cannot answer are cached
+            await prefetch.record_and_prefetch(request, query_params, 2, 20)
+            with patch.object(prefetch.services, "cache_pages", AsyncMock()) as cache_pages:
+                await submit.await_args.args[2]()
+            cache_pages.assert_awaited_once_with(request, query_params, [5], 20)
+
+    async def test_job_claimed_by_another_worker_is_skipped(self):
+        from apps.intelligence.prefetch import PrefetchScheduler
+
+        scheduler = PrefetchScheduler()
+        master_cache = MagicMock()
+        master_cache.set = AsyncMock(side_effect=[True, False])
+        job = AsyncMock()
+
+        self.assertTrue(await scheduler.submit(master_cache, "job:1", job))
+        self.assertFalse(await scheduler.submit(master_cache, "job:1", job))
+        self.assertFalse(await scheduler.submit(master_cache, "job:2", job))
+        await scheduler._queue.join()
+
+        job.assert_awaited_once()
+        self.assertEqual(scheduler.stats(), {"scheduled": 1, "dropped": 0, "pending": 0})
+
+
+class TestRenderedPageCache(unittest.IsolatedAsyncioTestCase):
+
+    async def test_stored_body_is_returned_as_is(self):
+        from apps.intelligence.services import get_body_from_cache, render_page_body
+
+        data = json.dumps([{"id": "1", "title": "pepe"}])
+        body = render_page_body(data, 2, 10, 25)
+        slave_cache = MagicMock()
+        slave_cache.hgetall = AsyncMock(return_value={b"data": data.encode(), b"total": b"25", b"body": body})
+        master_cache = MagicMock()
+        master_cache.touch = AsyncMock()
+
+        cached, etag, _, stale = await get_body_from_cache("page", slave_cache, master_cache, 2, 10)
+
+        self.assertIs(cached, body)
+        self.assertTrue(etag.startswith('"'))
+        self.assertTrue(stale)
+        envelope = json.loads(cached)
+        self.assertEqual(envelope["data"], [{"id": "1", "title": "pepe"}])
+        self.assertEqual(envelope["pagination"]["total_page"], 3)
+
+    async def test_page_without_body_is_rendered_from_data(self):
+        from apps.intelligence.services import get_body_from_cache, render_page_body
+
+        data = json.dumps([{"id": "1"}]).encode()
+        slave_cache = MagicMock()
+        slave_cache.hgetall = AsyncMock(return_value={b"data": data, b"total": b"1", b"refreshed_at": b"9e99"})
+        master_cache = MagicMock()
+        master_cache.touch = AsyncMock()
+
+        cached, _, _, stale = await get_body_from_cache("page", slave_cache, master_cache, 1, 10)
+
+        self.assertEqual(cached, render_page_body(data, 1, 10, 1))
+        self.assertFalse(stale)
+
+    def test_small_body_clears_previous_variants(self):
+        from apps.intelligence.services import variant_fields, cached_variants
+
+        with patch("settings.RESPONSE_COMPRESSION", ["br", "gzip"]):
+            large = variant_fields(b"x" * 4096)
+            small = variant_fields(b"{}")
+
+            self.assertEqual(set(cached_variants({key.encode(): value for key, value in large.items()})), {"br", "gzip"})
+            self.assertEqual(small, {"body_br": b"", "body_gzip": b""})
+            self.assertEqual(cached_variants({key.encode(): value for key, value in small.items()}), {})
+
+
+class TestHeadPages(unittest.IsolatedAsyncioTestCase):
+
+    def test_new_item_is_inserted_by_time_and_page_trimmed(self):
+        from apps.intelligence.head_pages import patch_page
+
+        items = [{"id": "b", "published_at": "2025-01-02"}, {"id": "a", "published_at": "2025-01-01"}]
+
+        patched, total = patch_page(items, 2, {"id": "c", "published_at": "2025-01-03"}, "c", 2)
+        self.assertEqual([item["id"] for item in patched], ["c", "b"])
+        self.assertEqual(total, 3)
+
+        # Already on the page (e.g. a refresh ran after it was published)
+        self.assertIsNone(patch_page(items, 2, {"id": "a", "published_at": "2025-01-01"}, "a", 2))
+
+    def test_hidden_item_is_removed(self):
+        from apps.intelligence.head_pages import patch_page
+
+        items = [{"id": "b", "published_at": "2025-01-02"}, {"id": "a", "published_at": "2025-01-01"}]
+
+        patched, total = patch_page(items, 5, None, "b", 2)
+        self.assertEqual([item["id"] for item in patched], ["a"])
+        self.assertEqual(total, 4)
+        self.assertIsNone(patch_page(items, 5, None, "z", 2))
+
+    def test_item_pushed_off_a_cursor_head_page_starts_the_next_page(self):
+        from apps.intelligence.head_pages import patch_cursor_page
+        from apps.intelligence.services import decode_cursor
+
+        items = [
+            {"id": str(uuid.UUID(int=2)), "published_at": "2025-01-02T00:00:00.000000Z"},
+            {"id": str(uuid.UUID(int=1)), "published_at": "2025-01-01T00:00:00.000000Z"},
+        ]
+        item = {"id": str(uuid.UUID(int=3)), "published_at": "2025-01-03T00:00:00.000000Z"}
+
+        patched, next_cursor = patch_cursor_page(items, "old", item, item["id"], 2)
+        self.assertEqual([entry["id"] for entry in patched], [item["id"], items[0]["id"]])
+        self.assertEqual(decode_cursor(next_cursor), (datetime(2025, 1, 2), uuid.UUID(int=2)))
+        # Room left on the page, the next page is unchanged
+        self.assertEqual(patch_cursor_page(items, None, item, item["id"], 3)[1], None)
+
+    async def test_cursor_head_page_is_not_kept_alive_by_reads(self):
+        from apps.intelligence.services import get_cursor_page_from_cache
+
+        slave_cache = MagicMock()
+        slave_cache.hgetall = AsyncMock(return_value={b"data": b"[]", b"next_cursor": b"", b"refreshed_at": b"0"})
+        master_cache = MagicMock()
+        master_cache.touch = AsyncMock()
+
+        self.assertEqual(await get_cursor_page_from_cache("head", slave_cache, master_cache, head=True), ([], None, True))
+        master_cache.touch.assert_not_called()
+        self.assertEqual(await get_cursor_page_from_cache("next", slave_cache, master_cache), ([], None, False))
+        master_cache.touch.assert_awaited_once()
+
+    async def test_pages_with_unevaluable_filters_are_dropped(self):
+        from apps.intelligence import head_pages
+
+        entry = json.dumps({"query_params": {"type": None, "subtype": None, "is_valuable": True, "key_word": "pepe"}, "page_size": 20})
+        pipe = MagicMock()
+        pipe.execute = AsyncMock(return_value=[{b"page:kw": entry.encode()}] + [{}] * 5)
+        request = MagicMock()
+        master_cache = request.context.mastercache
+        master_cache.backend.pipeline.return_value = pipe
+        master_cache.backend.hdel = AsyncMock()
+        master_cache.delete = AsyncMock()
+
+        changed = await head_pages.apply_intelligence(request, {"id": "1", "type": "twitter", "subtype": "kol", "is_valuable": True, "is_visible": True})
+
+        self.assertEqual(changed, 1)
+        master_cache.delete.assert_awaited_once_with("page:kw")
+
+
+class TestConditionalResponses(unittest.IsolatedAsyncioTestCase):
+
+    def test_if_none_match_comparison(self):
+        from views.render import etag_matches
+
+        self.assertTrue(etag_matches('"a", W/"b"', '"b"'))
+        self.assertTrue(etag_matches("*", '"b"'))
+        self.assertFalse(etag_matches('"a"', '"b"'))
+        self.assertFalse(etag_matches(None, '"b"'))
+
+    async def test_cached_response_short_circuits_to_304(self):
+        from apps.intelligence import views
+
+        request = MagicMock()
+        request.headers = {"if-none-match": '"tag"'}
+        build = AsyncMock()
+
+        with patch.object(views, "get_response_from_cache", AsyncMock(return_value=("key", b"{}", '"tag"', {}))):
+            response = await views.cached_api_response(request, "token_info", build, network="solana", address="x")
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers["etag"], '"tag"')
+        build.assert_not_awaited()
+
+    async def test_api_response_is_answered_with_304_when_tag_matches(self):
+        from views.render import APIResponse
+
+        response = APIResponse(data={"symbol": "PEPE"}, is_pagination=False)
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "headers": [(b"if-none-match", response.headers["etag"].encode())]}
+        await response(scope, AsyncMock(), send)
+
+        self.assertEqual(sent[0]["status"], 304)
+        self.assertEqual(sent[1]["body"], b"")
+
+
+class TestLatestEntities(unittest.IsolatedAsyncioTestCase):
+
+    async def test_entities_and_tokens_are_read_with_one_mget_each(self):
+        from apps.intelligence import services
+
+        def entity(address):
+            return {"contract_address": address, "chain": {"slug": "solana"}, "stats": {
+                "current_price_usd": 1, "current_market_cap": 1, "liquidity": 1, "volume_24h": 1
+            }}
+
+        request = MagicMock()
+        request.context.slavecache.mget = AsyncMock(return_value=[
+            json.dumps([entity("a"), entity("b")]).encode(), json.dumps([entity("a")]).encode()
+        ])
+        request.context.slavecache.backend.mget = AsyncMock(return_value=[json.dumps({"price_usd": 2.5}).encode(), None])
+
+        with patch.object(services.settings, "INTELLIGENCE_ENTITIES_MAX_IDS", 2), \
+                patch.object(services.token_snapshots, "snapshots", services.token_snapshots.TokenSnapshots(16, 60, 0)):
+            data = await services.get_intelligence_latest_entities_v2(request, ["1", "1", " ", "2", "3"])
+
+        request.context.slavecache.mget.assert_awaited_once_with([
+            services.showed_tokens_cache_key("1"), services.showed_tokens_cache_key("2")
+        ])
+        request.context.slavecache.backend.mget.assert_awaited_once_with([
+            services.token_data_cache_key("solana", "a"), services.token_data_cache_key("solana", "b")
+        ])
+        request.context.database.dogex.assert_not_called()
+        self.assertEqual(data["1"][0]["stats"]["current_price_usd"], decimal.Decimal("2.5"))
+        self.assertEqual(data["1"][1]["stats"]["current_price_usd"], 1)
+        self.assertEqual(data["2"][0]["stats"]["current_price_usd"], decimal.Decimal("2.5"))
+
+
+class TestTokenSnapshots(unittest.IsolatedAsyncioTestCase):
+
+    async def test_only_tokens_not_held_are_read(self):
+        from apps.intelligence.token_snapshots import TokenSnapshots
+
+        snapshots = TokenSnapshots(16, 60, 0)
+        snapshots.following = True
+        backend = MagicMock()
+        backend.mget = AsyncMock(return_value=[json.dumps({"price_usd": 1.5}).encode(), None])
+
+        first = await snapshots.get_many(backend, ["a", "b"])
+        second = await snapshots.get_many(backend, ["a", "b"])
+
+        backend.mget.assert_awaited_once_with(["a", "b"])
+        self.assertEqual(first, second)
+        self.assertEqual(second, {"a": {"price_usd": decimal.Decimal("1.5")}, "b": {}})
+
+    async def test_snapshots_are_off_without_keyspace_notifications(self):
+        from apps.intelligence.token_snapshots import TokenSnapshots
+
+        snapshots = TokenSnapshots(16, 60, 0)
+        cache = MagicMock()
+        cache.backend.config_get = AsyncMock(return_value={b"notify-keyspace-events": b""})
+        cache.backend.mget = AsyncMock(return_value=[b"{}"])
+
+        self.assertFalse(await snapshots.attach(cache))
+        cache.psubscribe.assert_not_called()
+        await snapshots.get_many(cache.backend, ["a"])
+        await snapshots.get_many(cache.backend, ["a"])
+        # Read on every request, as nothing would keep a held snapshot current
+        self.assertEqual(cache.backend.mget.await_count, 2)
+        self.assertEqual(len(snapshots), 0)
+
+        cache.backend.config_get = AsyncMock(return_value={"notify-keyspace-events": "AK"})
+        self.assertTrue(await snapshots.attach(cache))
+        cache.psubscribe.assert_called_once()
+
+    async def test_keyspace_updates_are_read_in_one_batch(self):
+        from apps.intelligence.token_snapshots import TokenSnapshots
+
+        snapshots = TokenSnapshots(16, 60, 0)
+        snapshots._local.set("token:a", {"price_usd": 1})
+        snapshots._local.set("token:b", {"price_usd": 1})
+        snapshots._local.set("token:c", {"price_usd": 1})
+        snapshots._cache = MagicMock()
+        snapshots._cache.backend.mget = AsyncMock(return_value=[json.dumps({"price_usd": 2}).encode()] * 2)
+
+        snapshots.on_keyspace(b"__keyspace@0__:token:a", b"set")
+        snapshots.on_keyspace(b"__keyspace@0__:token:b", b"set")
+        snapshots.on_keyspace(b"__keyspace@0__:token:c", b"del")
+        snapshots.on_keyspace(b"__keyspace@0__:token:unheld", b"set")
+        await snapshots._refresher
+
+        self.assertEqual(sorted(snapshots._cache.backend.mget.await_args.args[0]), ["token:a", "token:b"])
+        self.assertEqual(snapshots._local.get("token:a"), {"price_usd": 2})
+        self.assertNotIn("token:c", snapshots._local)
+        self.assertNotIn("token:unheld", snapshots._local)
+
+
+class TestIncreaseRates(unittest.IsolatedAsyncioTestCase):
+
+    async def test_refresh_recomputes_changed_tokens_since_watermark(self):
+        from apps.intelligence import increase_rates
+
+        latest = datetime(2026, 1, 2, 3, 4, 5)
+        tokens = [("solana", f"address{index}") for index in range(3)]
+        context = MagicMock()
+        context.mastercache.backend.get = AsyncMock(return_value=b"2026-01-01T00:00:00")
+        context.mastercache.backend.set = AsyncMock()
+        session = context.database.dogex.return_value.__aenter__.return_value
+        session.commit = AsyncMock()
+
+        with patch.object(increase_rates, "_changed_tokens", AsyncMock(return_value=(tokens, latest))) as changed, \
+                patch.object(increase_rates, "_recompute", AsyncMock()) as recompute, \
+                patch.object(increase_rates, "REFRESH_BATCH_SIZE", 2):
+            refreshed = await increase_rates.refresh_increase_rates(context)
+
+        self.assertEqual(refreshed, 3)
+        self.assertEqual(changed.await_args.args[1], datetime(2026, 1, 1) - increase_rates.WATERMARK_OVERLAP)
+        self.assertEqual([call.args[1] for call in recompute.await_args_list], [tokens[:2], tokens[2:]])
+        session.commit.assert_awaited_once()
+        context.mastercache.backend.set.assert_awaited_once_with(increase_rates.INCREASE_RATE_WATERMARK_KEY, latest.isoformat())
+
+    async def test_token_detail_reads_the_table(self):
+        from sqlalchemy.dialects import postgresql
+        from apps.intelligence import services
+
+        request = MagicMock()
+        request.context.slavecache.backend.get = AsyncMock(return_value=None)
+        request.context.mastercache.backend.set = AsyncMock()
+        session = request.context.database.dogex.return_value.__aenter__.return_value
+        request.context.slavecache.backend.exists = AsyncMock(return_value=1)
+        session.execute = AsyncMock(return_value=MagicMock(scalar=MagicMock(return_value=2.5)))
+
+        with patch.object(services.settings, "INCREASE_RATE_FROM_TABLE", True), \
+                patch.object(services.increase_rates, "_table_ready", False):
+            rate = await services.get_highest_increase_rate_v2(request, "solana", "address")
+
+        self.assertEqual(rate, 2.5)
+        sql = str(session.execute.await_args.args[0].compile(dialect=postgresql.dialect()))
+        self.assertIn("FROM token_increase_rate", sql)
+        self.assertNotIn("JOIN", sql)
+
+    async def test_token_detail_aggregates_until_the_table_is_built_and_skips_caching_misses(self):
+        from sqlalchemy.dialects import postgresql
+        from apps.intelligence import services
+
+        request = MagicMock()
+        request.context.slavecache.backend.get = AsyncMock(return_value=None)
+        request.context.mastercache.backend.set = AsyncMock()
+        session = request.context.database.dogex.return_value.__aenter__.return_value
+        session.execute = AsyncMock(return_value=MagicMock(scalars=MagicMock(return_value=MagicMock(first=MagicMock(return_value=1.5)))))
+
+        with patch.object(services.settings, "INCREASE_RATE_FROM_TABLE", True), \
+                patch.object(services.increase_rates, "_table_ready", False):
+            # No watermark yet: the rebuild has not completed
+            request.context.slavecache.backend.exists = AsyncMock(return_value=0)
+            self.assertEqual(await services.get_highest_increase_rate_v2(request, "solana", "address"), 1.5)
+            self.assertIn("JOIN", str(session.execute.await_args.args[0].compile(dialect=postgresql.dialect())))
+            request.context.mastercache.backend.set.assert_awaited_once()
+
+            request.context.slavecache.backend.exists = AsyncMock(return_value=1)
+            session.execute = AsyncMock(return_value=MagicMock(scalar=MagicMock(return_value=None)))
+            self.assertEqual(await services.get_highest_increase_rate_v2(request, "solana", "address"), 0.0)
+            request.context.mastercache.backend.set.assert_awaited_once()
+
+
+class TestBatchTokenInfo(unittest.IsolatedAsyncioTestCase):
+
+    def test_token_pairs_are_deduplicated_and_capped(self):
+        from apps.intelligence.services import parse_token_pairs
+        from views.render import HTTPException
+
+        self.assertEqual(
+            parse_token_pairs("solana:a, solana:a,ethereum:0x1,base:b", 2),
+            [("solana", "a"), ("ethereum", "0x1")]
+        )
+        with self.assertRaises(HTTPException):
+            parse_token_pairs("solana", 2)
+
+    async def test_tokens_and_missing_rates_are_read_in_one_query_each(self):
+        from apps.intelligence import services
+
+        def token(network, address):
+            return MagicMock(
+                network=network, contract_address=address, price_usd=1.0, market_cap=2.0, liquidity=3.0,
+                volume_24h=4.0, holders=5, price_change_24h=0.1, is_native=False, is_mainstream=False, narrative=""
+            )
+
+        request = MagicMock()
+        request.context.slavecache.backend.mget = AsyncMock(return_value=[b"1.5", None, None])
+        pipe = request.context.mastercache.backend.pipeline.return_value
+        pipe.execute = AsyncMock()
+        session = request.context.database.dogex.return_value.__aenter__.return_value
+        session.execute = AsyncMock(return_value=MagicMock(scalars=MagicMock(return_value=MagicMock(
+            all=MagicMock(return_value=[token("solana", "a"), token("solana", "b")])
+        ))))
+
+        tokens = [("solana", "a"), ("solana", "b"), ("solana", "unknown")]
+        with patch.object(services, "_query_increase_rates", AsyncMock(return_value={("solana", "b"): 3.0})) as rates, \
+                patch.object(services, "increase_rates_from_table", AsyncMock(return_value=True)):
+            infos = await services.retrieve_tokens(request, tokens)
+
+        session.execute.assert_awaited_once()
+        rates.assert_awaited_once_with(session, [("solana", "b")], True)
+        pipe.set.assert_called_once_with(
+            services.highest_increase_rate_cache_key("solana", "b"), 3.0, ex=services.settings.EXPIRES_FOR_HIGHEST_INCREASE_RATE
+        )
+        self.assertEqual([info.get("highest_increase_rate") for info in infos], [1.5, 3.0, None])
+        self.assertEqual(infos[0]["holders"], 5)
+        self.assertEqual(infos[2], {})
+
+
+class TestSocialLinkIndex(unittest.IsolatedAsyncioTestCase):
+
+    async def test_load_then_delta_refresh(self):
+        from apps.intelligence.social_links import SocialLinkIndex
+
+        loaded, updated = datetime(2026, 1, 1), datetime(2026, 1, 2)
+        context = MagicMock()
+        session = context.database.dogex.return_value.__aenter__.return_value
+        session.execute = AsyncMock(return_value=MagicMock(all=MagicMock(return_value=[
+            ("solana", "a", "twitter", "https://x.com/a", loaded),
+            ("solana", "b", "website", "https://b.io", loaded),
+        ])))
+
+        index = SocialLinkIndex()
+        self.assertEqual(await index.load(context), 2)
+        self.assertTrue(index.loaded)
+        self.assertEqual(index.urls("solana", "a"), {"twitter": "https://x.com/a", "website": ""})
+        self.assertEqual(index.urls("solana", "unknown"), {"twitter": "", "website": ""})
+
+        # b lost its links (soft deleted), a got a telegram link
+        session.execute = AsyncMock(side_effect=[
+            MagicMock(all=MagicMock(return_value=[("solana", "a", updated), ("solana", "b", updated)])),
+            MagicMock(all=MagicMock(return_value=[
+                ("solana", "a", "twitter", "https://x.com/a", loaded),
+                ("solana", "a", "telegram", "https://t.me/a", updated),
+            ])),
+        ])
+        self.assertEqual(await index.refresh(context), 2)
+        self.assertEqual(index.urls("solana", "a"), {"telegram": "https://t.me/a", "twitter": "https://x.com/a"})
+        self.assertEqual(index.urls("solana", "b"), {"telegram": "", "twitter": ""})
+        self.assertEqual(index._watermark, updated)
+
+        stats = index.stats()
+        self.assertEqual((stats["tokens"], stats["links"], stats["link_types"]), (1, 2, 2))
+        self.assertGreater(stats["memory_bytes"], 0)
+
+    async def test_token_urls_are_served_from_the_index(self):
+        from apps.intelligence import services, social_links
+
+        index = social_links.SocialLinkIndex()
+        index._apply([("solana", "a", "twitter", "https://x.com/a", None)])
+        index.loaded = True
+        request = MagicMock()
+
+        with patch.object(social_links, "index", index):
+            urls = await services.list_token_urls(request, "solana", "a")
+
+        self.assertEqual(urls, {"twitter": "https://x.com/a"})
+        request.context.slavecache.get.assert_not_called()
+        request.context.database.dogex.assert_not_called()
+
+
+class TestLatestTokens(unittest.IsolatedAsyncioTestCase):
+
+    async def test_pages_are_slices_of_the_synced_feed(self):
+        from apps.intelligence.latest_tokens import LatestTokens
+
+        items = {
+            f"id{index}".encode(): json.dumps({
+                "id": f"id{index}", "display_time": f"2026-01-01T00:00:{index:02d}.000000Z", "market_cap": index
+            }).encode()
+            for index in range(5)
+        }
+        backend = MagicMock()
+        backend.get = AsyncMock(return_value=b"3")
+        backend.hgetall = AsyncMock(return_value=items)
+
+        feed = LatestTokens(5)
+        self.assertIsNone(feed.page(None))
+        self.assertTrue(await feed.sync(backend))
+        self.assertFalse(await feed.sync(backend))
+        backend.hgetall.assert_awaited_once()
+
+        self.assertEqual([item["id"] for item in feed.page(None, 2)], ["id4", "id3"])
+        cursor = datetime.fromisoformat("2026-01-01T00:00:03+00:00")
+        self.assertEqual([item["id"] for item in feed.page(cursor, 2)], ["id2", "id1"])
+        # The feed is full, the tokens past its oldest one are read from the table
+        self.assertIsNone(feed.page(cursor, 4))
+
+    async def test_publish_adds_tokens_since_watermark_and_trims(self):
+        from types import SimpleNamespace
+        from apps.intelligence import latest_tokens
+
+        displayed = datetime(2026, 1, 2, 3, 4, 5)
+        token = SimpleNamespace(
+            id=uuid.uuid4(), network="solana", contract_address="a", name="A", symbol="A", logo=None, decimals=9,
+            price_usd=1.0, market_cap=2.0, liquidity=3.0, volume_24h=4.0, price_change_24h=0.1, is_native=False,
+            is_mainstream=False, display_time=displayed, chain=None, updated_at=displayed
+        )
+        context = MagicMock()
+        backend = context.mastercache.backend
+        backend.get = AsyncMock(return_value=b"2026-01-01T00:00:00")
+        backend.zrange = AsyncMock(side_effect=[[], [b"old"]])
+        pipe = backend.pipeline.return_value
+        pipe.execute = AsyncMock()
+        session = context.database.dogex.return_value.__aenter__.return_value
+        session.execute = AsyncMock(return_value=MagicMock(scalars=MagicMock(return_value=MagicMock(
+            all=MagicMock(return_value=[token])
+        ))))
+
+        self.assertEqual(await latest_tokens.publish_latest_tokens(context), 1)
+
+        pipe.zadd.assert_called_once_with(latest_tokens.LATEST_TOKENS_FEED_KEY, {
+            str(token.id): displayed.replace(tzinfo=timezone.utc).timestamp()
+        })
+        pipe.hdel.assert_called_once_with(latest_tokens.LATEST_TOKENS_ITEMS_KEY, b"old")
+        pipe.set.assert_any_call(latest_tokens.LATEST_TOKENS_WATERMARK_KEY, displayed.isoformat())
+        pipe.set.assert_any_call(latest_tokens.LATEST_TOKENS_UPDATED_WATERMARK_KEY, displayed.isoformat())
+        self.assertIn("display_time > ", str(session.execute.await_args.args[0]))
+
+    async def test_publish_republishes_changed_held_tokens(self):
+        from types import SimpleNamespace
+        from apps.intelligence import latest_tokens, schemas
+        from views.render import JsonResponseEncoder
+
+        updated = datetime(2026, 1, 2, 3, 4, 5)
+
+        def token(price_change_24h):
+            return SimpleNamespace(
+                id=uuid.uuid4(), network="solana", contract_address="a", name="A", symbol="A", logo=None, decimals=9,
+                price_usd=1.0, market_cap=2.0, liquidity=3.0, volume_24h=4.0, price_change_24h=price_change_24h,
+                is_native=False, is_mainstream=False, display_time=datetime(2026, 1, 1), chain=None, updated_at=updated
+            )
+
+        changed, unchanged = token(0.5), token(0.1)
+        context = MagicMock()
+        backend = context.mastercache.backend
+        backend.get = AsyncMock(return_value=b"2026-01-01T00:00:00")
+        backend.zrange = AsyncMock(side_effect=[[str(changed.id).encode(), str(unchanged.id).encode()], []])
+        # As published before the price change of the first token
+        backend.hmget = AsyncMock(return_value=[
+            json.dumps(schemas.TokenChainDataOutSchema.model_validate(item).model_dump(), ensure_ascii=False,
+                       cls=JsonResponseEncoder).encode()
+            for item in (SimpleNamespace(**{**vars(changed), "price_change_24h": 0.1}), unchanged)
+        ])
+        pipe = backend.pipeline.return_value
+        pipe.execute = AsyncMock()
+        session = context.database.dogex.return_value.__aenter__.return_value
+        session.execute = AsyncMock(side_effect=[
+            MagicMock(scalars=MagicMock(return_value=MagicMock(all=MagicMock(return_value=rows))))
+            for rows in ([], [changed, unchanged])
+        ])
+
+        self.assertEqual(await latest_tokens.publish_latest_tokens(context), 1)
+
+        self.assertEqual(list(pipe.hset.call_args.kwargs["mapping"]), [str(changed.id)])
+        self.assertIn("updated_at > ", str(session.execute.await_args.args[0]))
+        pipe.incr.assert_called_once_with(latest_tokens.LATEST_TOKENS_VERSION_KEY)
+        pipe.set.assert_called_once_with(latest_tokens.LATEST_TOKENS_UPDATED_WATERMARK_KEY, updated.isoformat())
+
+
+class TestMultiPageFetch(unittest.TestCase):
+
+    def test_offset_pages_keep_a_short_page_only_at_the_end(self):
+        from apps.intelligence.services import split_pages
+
+        self.assertEqual(split_pages(list(range(7)), 3, 2), [[0, 1, 2], [3, 4, 5]])
+        self.assertEqual(split_pages(list(range(5)), 3, 2), [[0, 1, 2], [3, 4]])
+        self.assertEqual(split_pages([], 3, 2), [])
+
+    def test_keyset_pages_skip_ties_of_the_previous_cursor(self):
+        from apps.intelligence.services import split_pages
+
+        # Positions descending, the cursor of a page excludes the rows sharing its last position
+        rows = [9, 8, 8, 8, 7, 6, 5]
+        self.assertEqual(split_pages(rows, 2, 4, lambda row: row), [[9, 8], [7, 6], [5]])
+        # Not the end of the results, the pages the rows cannot fill are left out
+        self.assertEqual(split_pages(rows, 2, 3, lambda row: row), [[9, 8], [7, 6]])
+
+
+class TestFollowLatestTokens(unittest.IsolatedAsyncioTestCase):
+
+    async def test_follow_pages_are_read_once_and_written_in_one_pipeline(self):
+        from types import SimpleNamespace
+        from apps.intelligence import services, latest_tokens
+
+        def token(second):
+            return SimpleNamespace(
+                id=uuid.uuid4(), network="solana", contract_address=f"a{second}", name="A", symbol="A", logo=None,
+                decimals=9, price_usd=1.0, market_cap=2.0, liquidity=3.0, volume_24h=4.0, price_change_24h=0.1,
+                is_native=False, is_mainstream=False, display_time=datetime(2026, 1, 1, 0, 0, second), chain=None
+            )
+
+        request = MagicMock()
+        request.context.slavecache.backend.exists = AsyncMock(return_value=0)
+        pipe = request.context.mastercache.backend.pipeline.return_value
+        pipe.execute = AsyncMock()
+        session = request.context.database.dogex.return_value.__aenter__.return_value
+        session.execute = AsyncMock(return_value=MagicMock(scalars=MagicMock(return_value=MagicMock(
+            all=MagicMock(return_value=[token(second) for second in range(50, 45, -1)])
+        ))))
+
+        with patch.object(latest_tokens, "LATEST_TOKENS_PAGE_SIZE", 2), \
+                patch.object(latest_tokens, "feed", latest_tokens.LatestTokens(10)):
+            await services.cache_follow_latest_appear_tokens(request, None)
+
+        session.execute.assert_awaited_once()
+        self.assertIn("LIMIT", str(session.execute.await_args.args[0]))
+        keys = [call.args[0] for call in pipe.set.call_args_list]
+        self.assertEqual(keys, [
+            services.latest_appear_tokens_cache_key(None),
+            services.latest_appear_tokens_cache_key(datetime(2026, 1, 1, 0, 0, 49, tzinfo=timezone.utc)),
+            services.latest_appear_tokens_cache_key(datetime(2026, 1, 1, 0, 0, 47, tzinfo=timezone.utc)),
+        ])
+        pipe.execute.assert_awaited_once()
+
+    async def test_prefetched_list_pages_share_one_query(self):
+        from apps.intelligence import services
+
+        request = MagicMock()
+        slave_pipe = request.context.slavecache.backend.pipeline.return_value
+        slave_pipe.execute = AsyncMock(return_value=[1, 0, 0])
+        master_pipe = request.context.mastercache.backend.pipeline.return_value
+        master_pipe.execute = AsyncMock(return_value=[True, True])
+        request.context.mastercache.backend.delete = AsyncMock()
+
+        rows = [{"id": index} for index in range(4)]
+        with patch.object(services, "page_cache_key", AsyncMock(side_effect=lambda request, query, page, size: f"page:{page}")), \
+                patch.object(services, "_list_intelligence_rows", AsyncMock(return_value=(rows, 10))) as list_rows, \
+                patch.object(services, "write_page", AsyncMock()) as write_page:
+            await services.cache_pages(request, services.schemas.IntelligenceQueryParams(), [3, 4, 5], 2)
+
+        list_rows.assert_awaited_once()
+        self.assertEqual(list_rows.await_args.args[2:], (6, 4))
+        self.assertEqual(
+            [(call.args[2], call.args[3], call.args[5]) for call in write_page.await_args_list],
+            [("page:4", rows[:2], 4), ("page:5", rows[2:], 5)]
+        )
+        request.context.mastercache.backend.delete.assert_awaited_once_with("page:4:lock", "page:5:lock")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+"""
+In-process snapshots of the live token market data
+
+The token:network:{network}:address:{address} keys are written by the market data service. Each worker keeps
+the parsed values of the tokens it served in a bounded LRU store, so refreshing the prices of visible tokens
+needs no Redis call. The store follows the keys through keyspace notifications (the master needs
+notify-keyspace-events to include K$gx): an update of a held token is re-read in a batched MGET shortly after,
+a deleted or expired one is dropped. TOKEN_SNAPSHOT_TTL bounds the staleness when notifications are missed. When
+the master does not send them, nothing is held and token data is read on every request.
+"""
+import json
+import asyncio
+import decimal
+from typing import Dict, List, Any
+
+from fastapi import FastAPI
+
+from data import Cache, create_logger
+from data.cache import LocalCache
+from middleware.lifespan import on_startup
+import settings
+
+
+logger = create_logger("dogex-intelligence-token-snapshots")
+
+# Keyspace events removing a key, anything else (set, expire...) is a write
+REMOVAL_EVENTS = {b"del", b"expired", b"evicted"}
+
+# notify-keyspace-events flags the snapshots need: keyspace channel, generic, string and expired events.
+# A stands for all the event classes
+KEYSPACE_FLAGS = set("K$gx")
+ALL_EVENT_FLAGS = "g$lshzxetd"
+
+
+def _parse(value: bytes | None) -> Dict[str, Any]:
+    # A missing token is kept as an empty snapshot, so it is not read again until it appears
+    return json.loads(value.decode("utf-8"), parse_float=decimal.Decimal) if value else {}
+
+
+class TokenSnapshots:
+    """
+    Bounded LRU store of parsed token market data, kept current by keyspace notifications
+    """
+
+    def __init__(self, size: int, ttl: float, refresh_interval: float) -> None:
+        self.refresh_interval = refresh_interval
+        self.following = False
+        self.updates = 0
+        self.reads = 0
+        self._local = LocalCache(size, ttl)
+        self._cache: Cache | None = None
+        self._changed: set[str] = set()
+        self._refresher: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return len(self._local)
+
+    async def attach(self, cache: Cache) -> bool:
+        """
+        Follow the token keys of the cache they are written to, when it sends the keyspace notifications
+
+        :return: Whether the snapshots are followed, token data is read on every request otherwise
+        """
+        try:
+            config = await cache.backend.config_get("notify-keyspace-events")
+            flags = next(iter(config.values()), b"")
+            flags = flags.decode("utf-8") if isinstance(flags, bytes) else flags
+        except Exception as e:
+            # CONFIG can be disabled on managed Redis, the notifications cannot be verified
+            logger.warning(f"Reading notify-keyspace-events failed, token snapshots are off: {e}")
+            return False
+
+        if not KEYSPACE_FLAGS <= set(flags.replace("A", ALL_EVENT_FLAGS)):
+            logger.warning(f"notify-keyspace-events is '{flags}', without {''.join(sorted(KEYSPACE_FLAGS))} token snapshots are off")
+            return False
+
+        self._cache = cache
+        cache.psubscribe(settings.TOKEN_SNAPSHOT_PATTERN, self.on_keyspace)
+        self.following = True
+        return True
+
+    async def get_many(self, backend: Any, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Snapshots of token keys, the ones not held are read with one MGET and kept
+
+        :param backend: Redis to read missing snapshots from
+        :param keys: Token data keys
+        :return: Parsed token data by key, empty for tokens without data
+        """
+        if not self.following:
+            # Nothing would keep them current
+            self.reads += 1
+            return {key: _parse(value) for key, value in zip(keys, await backend.mget(keys))}
+
+        snapshots = {key: self._local.get(key) for key in keys}
+        missing = [key for key, snapshot in snapshots.items() if snapshot is None]
+        if missing:
+            self.reads += 1
+            for key, value in zip(missing, await backend.mget(missing)):
+                snapshots[key] = _parse(value)
+                self._local.set(key, snapshots[key])
+        return snapshots
+
+    def on_keyspace(self, channel: bytes, event: bytes) -> None:
+        """
+        Keyspace notification handler, the channel is __keyspace@<db>__:<key>
+        """
+        key = channel.decode("utf-8").split(":", 1)[1]
+        if key not in self._local:
+            # Not held by this worker, read when it is first requested
+            return
+        if event in REMOVAL_EVENTS:
+            self._local.delete(key)
+            return
+        self._changed.add(key)
+        if self._refresher is None or self._refresher.done():
+            self._refresher = asyncio.create_task(self._refresh(), name="token-snapshots")
+
+    async def _refresh(self) -> None:
+        # Updates of one interval are read together, the ones arriving during the read in the next round
+        while self._changed:
+            await asyncio.sleep(self.refresh_interval)
+            keys, self._changed = list(self._changed), set()
+            try:
+                values = await self._cache.backend.mget(keys)
+            except Exception:
+                # Dropped, the next request reads them again
+                self._local.delete(*keys)
+                logger.exception("Refreshing token snapshots failed")
+                continue
+            for key, value in zip(keys, values):
+                self._local.set(key, _parse(value))
+            self.updates += len(keys)
+
+    def stats(self) -> Dict[str, int]:
+        return {**self._local.stats(), "following": self.following, "reads": self.reads, "updates": self.updates}
+
+
+snapshots = TokenSnapshots(settings.TOKEN_SNAPSHOT_SIZE, settings.TOKEN_SNAPSHOT_TTL, settings.TOKEN_SNAPSHOT_REFRESH_INTERVAL)
+
+
+@on_startup
+async def follow_token_snapshots(app: FastAPI):
+    """Follow the token keys on the master, where the market data service writes them"""
+    if not isinstance(app, FastAPI) or settings.TOKEN_SNAPSHOT_SIZE <= 0:
+        return
+    await snapshots.attach(app.state.context.mastercache)
@@ -1,18 +1,22 @@
 import json
 import asyncio
 from datetime import datetime
-from typing import Tuple, Optional, List, Dict, Any
+from typing import Tuple, Optional, List, Dict, Any, Callable, Awaitable
 from fastapi import Depends, APIRouter, BackgroundTasks
 import settings
-from views.render import APIResponse
+from views.render import APIResponse, RawAPIResponse, NotModified, etag_matches
 from data import code, msg
 from app.dependencies import request_init
 from apps.intelligence.schemas import IntelligenceQueryParams
 from apps.intelligence.services import (
-    list_intelligence, get_intelligence_latest_entities_v2,
-    retrieve_token, retrieve_intelligence,
-    get_from_cache, prefetch_pages
+    list_intelligence, get_intelligence_latest_entities_v2, unique_ids,
+    retrieve_token, retrieve_tokens, parse_token_pairs, retrieve_intelligence,
+    get_from_cache, get_body_from_cache, get_response_from_cache, write_response, page_cache_key, page_waiters, write_page, cache_page,
+    list_intelligence_by_cursor, get_cursor_page_from_cache,
+    cursor_page_cache_key, write_cursor_page, cache_cursor_page, display_time_cursor
 )
+from apps.intelligence.feed_index import get_feed_index_ids, get_feed_page_etag, get_versioned_feed_items, feed_page_etag
+from apps.intelligence import prefetch
 from app.dependencies import PaginationQueryParams
 from data.logger import create_logger
 from views.render import JsonResponseEncoder
@@ -34,39 +38,144 @@ async def get_intelligences_list(
     """
     Query intelligence list with pre-caching and cache breakdown prevention
     """
-    cache_key = f"aigun:intelligence:page:{query_params.model_dump_json()}:{page_query.page}:{page_query.page_size}"
-    slave_cache = request.context.slavecache.backend
+    if page_query.cursor is not None:
+        return await get_intelligences_by_cursor(query_params, page_query, background_tasks, request)
+
+    # Head pages of plain filters are answered by the Redis feed index without SQL or page cache
+    feed_ids = await get_feed_index_ids(request, query_params, page_query.page, page_query.page_size)
+    if feed_ids is not None:
+        background_tasks.add_task(prefetch.record_and_prefetch, request, query_params, page_query.page, page_query.page_size)
+        return await feed_index_response(request, *feed_ids, page_query)
+
+    cache_key = await page_cache_key(request, query_params, page_query.page, page_query.page_size)
+    slave_cache = request.context.slavecache
     master_cache = request.context.mastercache.backend
     
-    # Try cache first
-    result, total = await get_from_cache(cache_key, slave_cache, master_cache)
-    if result:
-        background_tasks.add_task(prefetch_pages, request, query_params, page_query.page, page_query.page_size)
-        return APIResponse(data=result, page=page_query.page, page_size=page_query.page_size, total=total)
+    # Try cache first, a stale page is served at once and refreshed in the background by one worker
+    response, stale = await cached_page_response(request, cache_key, slave_cache, request.context.mastercache, page_query)
+    if response is not None:
+        if stale:
+            background_tasks.add_task(cache_page, request, query_params, page_query.page, page_query.page_size, True)
+        background_tasks.add_task(prefetch.record_and_prefetch, request, query_params, page_query.page, page_query.page_size)
+        return response
     
     # Cache breakdown prevention
     lock_key = f"{cache_key}:lock"
     lock_acquired = await master_cache.set(lock_key, "1", ex=10, nx=True)
     
     if not lock_acquired:
-        for _ in range(20):
-            await asyncio.sleep(0.1)
-            result, total = await get_from_cache(cache_key, slave_cache, master_cache)
-            if result:
-                background_tasks.add_task(prefetch_pages, request, query_params, page_query.page, page_query.page_size)
-                return APIResponse(data=result, page=page_query.page, page_size=page_query.page_size, total=total)
+        # Woken by the lock holder (any worker) as soon as the page is written
+        async def page_cached() -> bool:
+            return bool(await slave_cache.hgetall(cache_key))
+
+        if await page_waiters.wait(cache_key, settings.INTELLIGENCE_PAGE_WAIT_TIMEOUT, page_cached):
+            response, _ = await cached_page_response(request, cache_key, slave_cache, request.context.mastercache, page_query)
+            if response is not None:
+                background_tasks.add_task(prefetch.record_and_prefetch, request, query_params, page_query.page, page_query.page_size)
+                return response
     
     try:
         result, total = await list_intelligence(request, query_params, page_query.page, page_query.page_size)
-        await master_cache.hset(cache_key, mapping={"data": json.dumps(result, cls=JsonResponseEncoder), "total": total})
-        await master_cache.expire(cache_key, settings.EXPIRES_FOR_INTELLIGENCE)
-        background_tasks.add_task(prefetch_pages, request, query_params, page_query.page, page_query.page_size)
+        await write_page(request, query_params, cache_key, result, total, page_query.page, page_query.page_size)
+        background_tasks.add_task(prefetch.record_and_prefetch, request, query_params, page_query.page, page_query.page_size)
         return APIResponse(data=result, page=page_query.page, page_size=page_query.page_size, total=total)
     finally:
         if lock_acquired:
             await master_cache.delete(lock_key)
 
 
+async def cached_page_response(
+        request: Request,
+        cache_key: str,
+        slave_cache: Any,
+        master_cache: Any,
+        page_query: PaginationQueryParams
+) -> tuple[Optional[APIResponse | RawAPIResponse | NotModified], bool]:
+    """
+    Response of a cached page and whether it is stale, the stored response bytes are returned as is when
+    INTELLIGENCE_PAGE_CACHE_BODY is on (pre-compressed when the client accepts it), or 304 when the client already has them
+    """
+    if settings.INTELLIGENCE_PAGE_CACHE_BODY:
+        body, etag, variants, stale = await get_body_from_cache(cache_key, slave_cache, master_cache, page_query.page, page_query.page_size)
+        if not body:
+            return None, stale
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return NotModified(etag), stale
+        return RawAPIResponse(body, etag=etag, variants=variants), stale
+
+    result, total, stale = await get_from_cache(cache_key, slave_cache, master_cache)
+    if not result:
+        return None, stale
+    return APIResponse(data=result, page=page_query.page, page_size=page_query.page_size, total=total), stale
+
+
+async def feed_index_response(
+        request: Request,
+        intelligence_ids: List[str],
+        total: int,
+        page_query: PaginationQueryParams
+) -> APIResponse | NotModified:
+    """
+    Response of a feed index page, its ETag comes from the item versions so a client that already has the page
+    gets 304 before the items are fetched or anything is serialized
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        etag = await get_feed_page_etag(request, intelligence_ids, total, page_query.page, page_query.page_size)
+        if etag is not None and etag_matches(if_none_match, etag):
+            return NotModified(etag)
+
+    result, versions = await get_versioned_feed_items(request, intelligence_ids)
+    response = APIResponse(data=result, page=page_query.page, page_size=page_query.page_size, total=total)
+    response.headers["ETag"] = feed_page_etag(versions, total, page_query.page, page_query.page_size)
+    return response
+
+
+async def cached_api_response(
+        request: Request,
+        name: str,
+        build: Callable[[], Awaitable[APIResponse]],
+        **params: Any
+) -> APIResponse | RawAPIResponse | NotModified:
+    """
+    Endpoint response cached with its ETag for EXPIRES_FOR_RESPONSE_CACHE seconds, a client that already has
+    it gets 304 before anything is queried, enriched or serialized
+    """
+    cache_key, body, etag, variants = await get_response_from_cache(request, name, **params)
+    if body is None:
+        response = await build()
+        await write_response(request, cache_key, response.body, response.headers["etag"])
+        return response
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return NotModified(etag)
+    return RawAPIResponse(body, etag=etag, variants=variants)
+
+
+async def get_intelligences_by_cursor(
+        query_params: IntelligenceQueryParams,
+        page_query: PaginationQueryParams,
+        background_tasks: BackgroundTasks,
+        request: Request
+) -> APIResponse:
+    """
+    Keyset pagination branch of the intelligence list, pages are cached by cursor
+    """
+    cache_key = await cursor_page_cache_key(request, query_params, page_query.cursor, page_query.page_size)
+    slave_cache = request.context.slavecache
+    master_cache = request.context.mastercache
+
+    # The head page is refreshed past its soft TTL by one worker, pages after a cursor never change
+    result, next_cursor, stale = await get_cursor_page_from_cache(cache_key, slave_cache, master_cache, not page_query.cursor)
+    if result is None:
+        result, next_cursor = await list_intelligence_by_cursor(request, query_params, page_query.cursor, page_query.page_size)
+        await write_cursor_page(request, query_params, cache_key, result, next_cursor, page_query.cursor, page_query.page_size)
+    elif stale:
+        background_tasks.add_task(cache_cursor_page, request, query_params, page_query.cursor, page_query.page_size, True)
+
+    background_tasks.add_task(prefetch.record_and_prefetch_cursor, request, query_params, page_query.cursor, next_cursor, page_query.page_size)
+    return APIResponse(data=result, page_size=page_query.page_size, cursor=page_query.cursor, next_cursor=next_cursor)
+
+
 @router.get("/entities")
 async def list_intelligence_latest_entity(
         intelligence_ids: str,
@@ -75,10 +184,14 @@ async def list_intelligence_latest_entity(
     """
     Get the latest associated token data
     """
-    intelligence_ids = intelligence_ids.strip().split(",")
+    # Deduplicated and capped before the response cache key is derived from them
+    intelligence_ids = unique_ids(intelligence_ids.strip().split(","), settings.INTELLIGENCE_ENTITIES_MAX_IDS)
 
-    entity_list = await get_intelligence_latest_entities_v2(request, intelligence_ids)
-    return APIResponse(data=entity_list)
+    async def build() -> APIResponse:
+        entity_list = await get_intelligence_latest_entities_v2(request, intelligence_ids)
+        return APIResponse(data=entity_list)
+
+    return await cached_api_response(request, "entities", build, intelligence_ids=intelligence_ids)
 
 
 
@@ -92,8 +205,28 @@ async def get_token_info(
     Get token details
     """
 
-    token = await retrieve_token(request, network, address)
-    return APIResponse(data=token, is_pagination=False)
+    async def build() -> APIResponse:
+        token = await retrieve_token(request, network, address)
+        return APIResponse(data=token, is_pagination=False)
+
+    return await cached_api_response(request, "token_info", build, network=network, address=address)
+
+
+@router.get("/token/info/batch")
+async def get_token_infos(
+        tokens: str,
+        request = Depends(request_init(verify=False, limiter=False))
+) -> APIResponse:
+    """
+    Get the details of several tokens, tokens is a comma separated list of network:address
+    (up to TOKEN_INFO_BATCH_MAX), the data is in request order with an empty object for unknown tokens
+    """
+    pairs = parse_token_pairs(tokens, settings.TOKEN_INFO_BATCH_MAX)
+
+    async def build() -> APIResponse:
+        return APIResponse(data=await retrieve_tokens(request, pairs), is_pagination=False)
+
+    return await cached_api_response(request, "token_infos", build, tokens=[f"{network}:{address}" for network, address in pairs])
 
 
 
@@ -106,11 +239,13 @@ async def get_intelligence_info(
     intelligence detail
     """
 
-    result = await retrieve_intelligence(request, intelligence_id)
+    async def build() -> APIResponse:
+        result = await retrieve_intelligence(request, intelligence_id)
+        return APIResponse(
+            code=code.CODE_OK, msg=msg.SUCCESS, data=result, is_pagination=False
+        )
 
-    return APIResponse(
-        code=code.CODE_OK, msg=msg.SUCCESS, data=result, is_pagination=False
-    )
+    return await cached_api_response(request, "intelligence", build, intelligence_id=intelligence_id)
 
 
 
@@ -123,8 +258,9 @@ async def list_latest_entity(background_tasks: BackgroundTasks, last_query_time:
     token_list = await get_latest_entities(request, last_query_time)
 
     # Pre-cache next page
-    last_query_time = datetime.fromisoformat(token_list[-1]["display_time"].replace('Z', '+00:00'))
-    background_tasks.add_task(cache_follow_latest_appear_tokens, request, last_query_time)
+    if token_list:
+        last_query_time = display_time_cursor(token_list[-1]["display_time"])
+        background_tasks.add_task(cache_follow_latest_appear_tokens, request, last_query_time)
 
     return APIResponse(data=token_list, is_pagination=False)
 
@@ -1,13 +1,14 @@
 import json
 import settings
 
-from typing import List, Optional
+from typing import List, Optional, Awaitable
 from sqlalchemy import select
 from sqlalchemy.orm import joinedload
 
 from apps.user import models
 from apps.user import schemas
 from middleware import Request
+from middleware.lifespan import on_warmup
 from views.render import JsonResponseEncoder
 
 
@@ -54,4 +55,9 @@ class AiAgentFollowServices:
 
 
 
-ai_agent_follow_services = AiAgentFollowServices()
\ No newline at end of file
+ai_agent_follow_services = AiAgentFollowServices()
+
+
+@on_warmup("ai_agents")
+def warm_ai_agent_list(request: Request) -> List[Awaitable]:
+    return [ai_agent_follow_services.get_ai_agent_list(request)]
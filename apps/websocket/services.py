@@ -5,6 +5,7 @@ from apps.intelligence import models
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 from data.logger import create_logger
+from data import codec
 from typing import List, Dict, Any, Optional, Union
 from datetime import datetime
 from views.render import JsonResponseEncoder
@@ -30,14 +31,54 @@ DEFAULT_AUTHOR_INFO = {
 X_LOGO_URL = "https://upload.wikimedia.org/wikipedia/commons/thumb/b/b7/X_logo.jpg/960px-X_logo.jpg?20230724061250"
 
 
+AUTHOR_INFO_PREFIX = "aigun:intelligence:author_info"
+codec.register(AUTHOR_INFO_PREFIX, settings.CACHE_CODEC, settings.CACHE_CODEC_MIN_SIZE)
+
+
+def author_info_cache_key(intelligence_id: Any) -> str:
+    return f"{AUTHOR_INFO_PREFIX}:intelligence_id:{intelligence_id}"
+
+
+def find_author_entity_intelligence(entity_intelligences: List[Any]) -> Optional[Any]:
+    """The author link of an intelligence, if any"""
+    return next(
+        (ei for ei in entity_intelligences if ei.type == "author" and ei.master_id),
+        None
+    )
+
+
+def build_author_info(intelligence_type: Optional[str], subtype: Optional[str], author_ei: Any, account: Any) -> Dict[str, Any]:
+    """Render the author block of an intelligence from its author link and account"""
+    platform_name = (
+        author_ei.master_type.strip().split(",", 1)[0][1:]
+        if author_ei.master_type else "twitter"
+    )
+
+    data = {
+        "platform": {"id": account.id, "name": platform_name, "logo": X_LOGO_URL},
+        "slug": account.screen_name,
+        "avatar": account.avatar,
+        "prompt": None
+    }
+
+    # Add prompt for twitter
+    if intelligence_type == "twitter":
+        description = ws_schemas.twitter_action_prompt_mapping.get(
+            subtype, "'s new release on X has sparked investment opportunities."
+        )
+        data["prompt"] = account.name + description
+
+    return data
+
+
 async def get_author_info(intelligence: Union[Dict[str, Any], Any], context: Any) -> Dict[str, Any]:
     """Get author information with caching"""
     intelligence_id = intelligence["id"] if isinstance(intelligence, dict) else intelligence.id
-    cache_key = f"aigun:intelligence:author_info:intelligence_id:{intelligence_id}"
+    cache_key = author_info_cache_key(intelligence_id)
 
-    cached_info = await context.slavecache.backend.get(cache_key)
+    cached_info = await context.slavecache.get(cache_key)
     if cached_info:
-        await context.mastercache.backend.expire(cache_key, settings.EXPIRES_FOR_AUTHOR_INFO)
+        await context.mastercache.touch(cache_key, settings.EXPIRES_FOR_AUTHOR_INFO)
         return json.loads(cached_info.decode("utf-8"))
 
     async with context.database.dogex() as session:
@@ -51,10 +92,7 @@ async def get_author_info(intelligence: Union[Dict[str, Any], Any], context: Any
             return DEFAULT_AUTHOR_INFO
 
         # Find author entity_intelligence
-        author_ei = next(
-            (ei for ei in intel.entity_intelligences if ei.type == "author" and ei.master_id),
-            None
-        )
+        author_ei = find_author_entity_intelligence(intel.entity_intelligences)
         
         if not author_ei:
             return DEFAULT_AUTHOR_INFO
@@ -67,31 +105,15 @@ async def get_author_info(intelligence: Union[Dict[str, Any], Any], context: Any
             logger.error(f"Account not found: {author_ei.master_id} for intelligence {intelligence_id}")
             return DEFAULT_AUTHOR_INFO
 
-        platform_name = (
-            author_ei.master_type.strip().split(",", 1)[0][1:]
-            if author_ei.master_type else "twitter"
-        )
-
-        data = {
-            "platform": {"id": account.id, "name": platform_name, "logo": X_LOGO_URL},
-            "slug": account.screen_name,
-            "avatar": account.avatar,
-            "prompt": None
-        }
-
-        # Add prompt for twitter
-        if intel.type == "twitter":
-            subtype = intelligence.get("subtype") if isinstance(intelligence, dict) else intel.subtype
-            description = ws_schemas.twitter_action_prompt_mapping.get(
-                subtype, "'s new release on X has sparked investment opportunities."
-            )
-            data["prompt"] = account.name + description
+        subtype = intelligence.get("subtype") if isinstance(intelligence, dict) else intel.subtype
+        data = build_author_info(intel.type, subtype, author_ei, account)
 
         await context.mastercache.backend.set(
             cache_key,
-            json.dumps(data, ensure_ascii=False, cls=JsonResponseEncoder),
+            context.mastercache.encode(cache_key, json.dumps(data, ensure_ascii=False, cls=JsonResponseEncoder)),
             ex=settings.EXPIRES_FOR_AUTHOR_INFO
         )
+        await context.mastercache.invalidate(cache_key)
         return data
 
 
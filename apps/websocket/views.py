@@ -10,6 +10,7 @@ from fastapi import APIRouter, FastAPI
 from pydantic import BaseModel, ValidationError
 
 from data import Context
+from middleware import Request
 from uuid import UUID
 from uuid6 import uuid7
 from apps.websocket import models
@@ -18,6 +19,7 @@ from apps.websocket.models import WebSocketRequest, WebSocketMessage
 from apps.websocket import services
 from apps.user import schemas as user_schemas
 from apps.user import services as user_services
+from apps.intelligence import feed_index, counters, head_pages
 from views.render import JsonResponseEncoder
 
 from data.logger import create_logger
@@ -491,6 +493,7 @@ async def websocket_send_message(app: FastAPI):
         return
 
     context: Context = app.state.context
+    request = Request.for_app(app)
     await context.amqp.ensure_connection()
     await context.amqp._channel.declare_queue(name=settings.INTELLIGENCE_QUEUE, durable=True)
 
@@ -503,6 +506,25 @@ async def websocket_send_message(app: FastAPI):
 
             intelligence = json.loads(message.body.decode())
 
+            # Keep the feed index and counters current for every published intelligence, valuable or not
+            try:
+                listed = await feed_index.with_visibility(context, intelligence)
+            except Exception as e:
+                logger.error(f"Failed to read the visibility of intelligence {intelligence.get('id')}: {e}")
+                listed = intelligence
+            try:
+                await feed_index.index_intelligence(context.mastercache, listed)
+            except Exception as e:
+                logger.error(f"Failed to index intelligence {intelligence.get('id')}: {e}")
+            try:
+                await counters.count_intelligence(context.mastercache.backend, listed)
+            except Exception as e:
+                logger.error(f"Failed to count intelligence {intelligence.get('id')}: {e}")
+            try:
+                await head_pages.apply_intelligence(request, listed)
+            except Exception as e:
+                logger.error(f"Failed to patch head pages for intelligence {intelligence.get('id')}: {e}")
+
             if not intelligence.get("is_valuable"):
                 logger.info(f"Filtered non-valuable intelligence: {intelligence.get('id')}")
                 continue
@@ -0,0 +1,64 @@
+"""
+Cache codec benchmark: Redis memory saved against CPU spent per codec on intelligence pages
+
+For each page size a synthetic intelligence page is built and stored the way write_page stores it (data and
+rendered body fields). Each codec reports the bytes written to Redis, the compression ratio and the CPU time
+to encode the page on write and to decode it on a cache read.
+
+Usage: python -m benchmarks.bench_cache_codec [--sizes 20,50,100] [--runs 500]
+"""
+import time
+import json
+import argparse
+
+from apps.intelligence import services
+from benchmarks.bench_cached_response import synthetic_item
+from data import codec
+from views.render import JsonResponseEncoder
+
+
+def page_fields(page_size: int) -> list[bytes]:
+    data = json.dumps([synthetic_item(index) for index in range(page_size)], cls=JsonResponseEncoder)
+    return [data.encode("utf-8"), services.render_page_body(data, 1, page_size, 1000)]
+
+
+def measure(name: str, fields: list[bytes], runs: int) -> tuple[int, float, float]:
+    """Stored bytes, encode and decode CPU microseconds per page"""
+    key = f"bench:codec:{name}:page"
+    codec.register(f"bench:codec:{name}", name, min_size=0)
+
+    encoded = [codec.encode(key, field) for field in fields]
+
+    start = time.process_time()
+    for _ in range(runs):
+        for field in fields:
+            codec.encode(key, field)
+    encode_time = (time.process_time() - start) / runs * 1e6
+
+    start = time.process_time()
+    for _ in range(runs):
+        for field in encoded:
+            codec.decode(key, field)
+    decode_time = (time.process_time() - start) / runs * 1e6
+
+    return sum(len(field) for field in encoded), encode_time, decode_time
+
+
+def main(sizes: list[int], runs: int) -> None:
+    print(f"{'page size':>10} {'codec':>6} {'bytes':>9} {'ratio':>6} {'encode us':>10} {'decode us':>10}")
+    for page_size in sizes:
+        fields = page_fields(page_size)
+        raw = sum(len(field) for field in fields)
+        print(f"{page_size:>10} {'none':>6} {raw:>9} {1:>6.2f} {0:>10.1f} {0:>10.1f}")
+        for name in codec.CODECS:
+            stored, encode_time, decode_time = measure(name, fields, runs)
+            print(f"{page_size:>10} {name:>6} {stored:>9} {raw / stored:>6.2f} {encode_time:>10.1f} {decode_time:>10.1f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="20,50,100")
+    parser.add_argument("--runs", type=int, default=500)
+    args = parser.parse_args()
+
+    main([int(size) for size in args.sizes.split(",")], args.runs)
@@ -0,0 +1,93 @@
+"""
+Cached page response benchmark: decoding and re-encoding the cached page vs returning the stored response bytes
+
+For each page size a synthetic page shaped like the intelligence list is cached the way write_page stores it,
+then the CPU time of building the response of a cache hit is measured for both paths: json.loads of the data
+plus APIResponse (jsonable_encoder + ORJSON), and RawAPIResponse of the stored body. Redis is left out so only
+the per-request serialization work is compared.
+
+Usage: python -m benchmarks.bench_cached_response [--sizes 20,50,100] [--runs 2000]
+"""
+import time
+import uuid
+import json
+import random
+import string
+import argparse
+from datetime import datetime, timezone
+
+from apps.intelligence import services
+from views.render import APIResponse, RawAPIResponse, JsonResponseEncoder
+
+
+def _words(rng: random.Random, count: int) -> str:
+    return " ".join("".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 9))) for _ in range(count))
+
+
+def _address(rng: random.Random) -> str:
+    return "".join(rng.choices(string.ascii_letters + string.digits, k=44))
+
+
+def synthetic_item(index: int) -> dict:
+    """Intelligence list item with varied text and addresses, so it compresses like real pages"""
+    rng = random.Random(index)
+    now = datetime.now(timezone.utc)
+    return {
+        "id": uuid.uuid4(),
+        "is_valuable": True,
+        "analyzed_time": 1.25,
+        "analyzed": {"summary": _words(rng, 40), "sentiment": "positive", "score": rng.random()},
+        "created_at": now,
+        "updated_at": now,
+        "type": "twitter",
+        "title": _words(rng, 6),
+        "extra_datas": {"lang": "en", "retweets": index},
+        "content": _words(rng, 80),
+        "source_url": f"https://x.com/status/{index}",
+        "tags": ["meme", "launch"],
+        "score": rng.random(),
+        "medias": [{"type": "image", "url": f"https://cdn.example/{index}.png"}],
+        "subtype": "kol",
+        "published_at": now,
+        "showed_tokens": [
+            {"network": "solana", "contract_address": _address(rng), "symbol": "PEPE", "price_usd": rng.random()}
+            for token in range(3)
+        ],
+        "spider_time": now,
+        "author": {"name": "author", "avatar": "https://cdn.example/a.png", "followers_count": 12000},
+        "chain_infos": [{"network": "solana", "name": "Solana"}],
+    }
+
+
+def measure(page_size: int, runs: int) -> tuple[float, float, int]:
+    """CPU microseconds per hit for the decode / re-encode path and the raw body path, and the body size"""
+    data = json.dumps([synthetic_item(index) for index in range(page_size)], cls=JsonResponseEncoder)
+    body = services.render_page_body(data, 1, page_size, 1000)
+
+    start = time.process_time()
+    for _ in range(runs):
+        APIResponse(data=json.loads(data), page=1, page_size=page_size, total=1000)
+    legacy = (time.process_time() - start) / runs * 1e6
+
+    start = time.process_time()
+    for _ in range(runs):
+        RawAPIResponse(body)
+    raw = (time.process_time() - start) / runs * 1e6
+
+    return legacy, raw, len(body)
+
+
+def main(sizes: list[int], runs: int) -> None:
+    print(f"{'page size':>10} {'body bytes':>11} {'decode+encode us':>17} {'raw body us':>12} {'speedup':>8}")
+    for page_size in sizes:
+        legacy, raw, size = measure(page_size, runs)
+        print(f"{page_size:>10} {size:>11} {legacy:>17.1f} {raw:>12.1f} {legacy / raw:>7.0f}x")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="20,50,100")
+    parser.add_argument("--runs", type=int, default=2000)
+    args = parser.parse_args()
+
+    main([int(size) for size in args.sizes.split(",")], args.runs)
@@ -0,0 +1,105 @@
+"""
+Keyword search benchmark: ILIKE scan vs the tsvector / trigram indexed search of the intelligence list
+
+A scratch schema holds a copy of the intelligence table (generated search columns and indexes included),
+it is grown step by step with synthetic rows and both query modes are timed at every size.
+
+Usage: python -m benchmarks.bench_keyword_search [--sizes 10000,100000,500000] [--runs 20] [--keep]
+Requires DATABASE_URL_DOGEX pointing at a Postgres with init.sql applied.
+"""
+import time
+import asyncio
+import argparse
+import statistics
+
+from sqlalchemy import select, text
+
+from data.db import declare_database
+from apps.intelligence import services
+from apps.intelligence.models import IntelligenceModel
+import settings
+
+
+BENCH_SCHEMA = "intelligence_bench"
+KEYWORDS = ("bitcoin", "pepe", "airdrop", "比特币", "nonexistentkeyword")
+
+WORDS = (
+    "bitcoin", "ethereum", "solana", "pepe", "doge", "airdrop", "listing", "binance", "whale", "pump",
+    "launch", "market", "token", "wallet", "bridge", "staking", "比特币", "以太坊", "空投", "上线",
+)
+
+
+async def prepare_schema(session_factory) -> None:
+    async with session_factory() as session:
+        await session.execute(text(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE"))
+        await session.execute(text(f"CREATE SCHEMA {BENCH_SCHEMA}"))
+        await session.execute(text(f"CREATE TABLE {BENCH_SCHEMA}.intelligence (LIKE public.intelligence INCLUDING ALL)"))
+        await session.commit()
+
+
+async def grow_table(session_factory, size: int) -> None:
+    """Insert synthetic rows until the scratch table holds size rows"""
+    words = "ARRAY[" + ", ".join(f"'{word}'" for word in WORDS) + "]"
+    async with session_factory() as session:
+        current = (await session.execute(text(f"SELECT count(*) FROM {BENCH_SCHEMA}.intelligence"))).scalar()
+        if current >= size:
+            return
+        await session.execute(text(f"""
+            INSERT INTO {BENCH_SCHEMA}.intelligence (published_at, type, content, analyzed, is_valuable)
+            SELECT
+                now() - (g || ' seconds')::interval,
+                (ARRAY['twitter', 'news', 'telegram'])[1 + g % 3],
+                {words}[1 + g % 20] || ' ' || {words}[1 + (g / 20) % 20] || ' ' || md5(g::text),
+                jsonb_build_object('zh', {words}[1 + (g / 7) % 20] || ' ' || md5((g + 1)::text), 'en', {words}[1 + (g / 3) % 20]),
+                g % 2 = 0
+            FROM generate_series(:start, :stop) AS g
+        """), {"start": current + 1, "stop": size})
+        await session.execute(text(f"ANALYZE {BENCH_SCHEMA}.intelligence"))
+        await session.commit()
+
+
+async def time_query(session_factory, key_word: str, full_text: bool, runs: int) -> float:
+    """Median latency in milliseconds of the first list page for one keyword"""
+    query_params = type("QueryParams", (), {"type": None, "subtype": None, "is_valuable": None, "key_word": key_word})()
+    filters = services._build_filters(query_params, full_text)
+    rank = services._keyword_rank(query_params, full_text)
+    order_by = [IntelligenceModel.published_at.desc()] if rank is None else [rank.desc(), IntelligenceModel.published_at.desc()]
+    sql = select(IntelligenceModel.id).where(*filters).order_by(*order_by).limit(20)
+
+    samples = []
+    async with session_factory() as session:
+        for _ in range(runs):
+            start = time.perf_counter()
+            await session.execute(sql)
+            samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+async def main(sizes: list[int], runs: int, keep: bool) -> None:
+    url = settings.DATABASE_DICT["dogex"].split("?schema=", 1)[0]
+    session_factory = declare_database(url=f"{url}?schema={BENCH_SCHEMA}")
+
+    await prepare_schema(session_factory)
+    print(f"{'rows':>10} {'keyword':>20} {'ilike ms':>10} {'indexed ms':>11}")
+    try:
+        for size in sizes:
+            await grow_table(session_factory, size)
+            for key_word in KEYWORDS:
+                ilike = await time_query(session_factory, key_word, False, runs)
+                indexed = await time_query(session_factory, key_word, True, runs)
+                print(f"{size:>10} {key_word:>20} {ilike:>10.2f} {indexed:>11.2f}")
+    finally:
+        if not keep:
+            async with session_factory() as session:
+                await session.execute(text(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE"))
+                await session.commit()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="10000,100000,500000")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch schema after the run")
+    args = parser.parse_args()
+
+    asyncio.run(main([int(size) for size in args.sizes.split(",")], args.runs, args.keep))
@@ -0,0 +1,110 @@
+"""
+Latest entities benchmark: one GET per intelligence and per token vs the batched MGET reads
+
+A fake Redis answers every command after a fixed latency (one network round trip), so the benchmark shows how
+the round trips of /intelligence/entities add up. The legacy path awaits one GET per intelligence and then
+one GET per token of every intelligence, the batched path is get_intelligence_latest_entities_v2 itself.
+
+Usage: python -m benchmarks.bench_latest_entities [--items 20,50] [--tokens 3] [--latency 0.5] [--runs 20]
+"""
+import json
+import time
+import asyncio
+import argparse
+import statistics
+from types import SimpleNamespace
+
+from apps.intelligence import services, token_snapshots
+from data.cache import Cache, RedisConfig
+
+
+class FakeRedis:
+    """In-memory Redis whose commands each take one round trip of latency seconds"""
+
+    def __init__(self, values: dict[str, bytes], latency: float) -> None:
+        self.values = values
+        self.latency = latency
+        self.round_trips = 0
+
+    async def _round_trip(self) -> None:
+        self.round_trips += 1
+        await asyncio.sleep(self.latency)
+
+    async def get(self, key: str) -> bytes | None:
+        await self._round_trip()
+        return self.values.get(key)
+
+    async def mget(self, keys: list[str]) -> list[bytes | None]:
+        await self._round_trip()
+        return [self.values.get(key) for key in keys]
+
+
+def synthetic_values(items: int, tokens: int) -> tuple[list[str], dict[str, bytes]]:
+    """Intelligence ids and the cached entities / token market data of a visible screen"""
+    values = {}
+    ids = [f"00000000-0000-0000-0000-{index:012d}" for index in range(items)]
+    for index, intelligence_id in enumerate(ids):
+        entities = [
+            {
+                "contract_address": f"address{(index + token) % (items * tokens // 2 or 1)}",
+                "chain": {"slug": "solana"},
+                "stats": {"current_price_usd": 1, "current_market_cap": 1, "liquidity": 1, "volume_24h": 1},
+            }
+            for token in range(tokens)
+        ]
+        values[services.showed_tokens_cache_key(intelligence_id)] = json.dumps(entities).encode()
+        for entity in entities:
+            values[services.token_data_cache_key("solana", entity["contract_address"])] = json.dumps(
+                {"price_usd": "2", "market_cap": "2", "liquidity": "2", "volume_24h": "2"}
+            ).encode()
+    return ids, values
+
+
+async def run_legacy(redis: FakeRedis, ids: list[str]) -> None:
+    data = {}
+    for intelligence_id in ids:
+        data[intelligence_id] = json.loads(await redis.get(services.showed_tokens_cache_key(intelligence_id)))
+    for token_list in data.values():
+        for token in token_list:
+            await redis.get(services.token_data_cache_key(token["chain"]["slug"], token["contract_address"]))
+
+
+async def run_batched(redis: FakeRedis, ids: list[str]) -> None:
+    cache = Cache(RedisConfig())
+    cache._redis = redis
+    request = SimpleNamespace(context=SimpleNamespace(slavecache=cache))
+    # A worker that holds no token snapshot yet, a warm one skips the token MGET as well
+    token_snapshots.snapshots = token_snapshots.TokenSnapshots(len(redis.values), 60, 1)
+    await services.get_intelligence_latest_entities_v2(request, ids)
+
+
+async def measure(items: int, tokens: int, latency: float, runs: int, batched: bool) -> tuple[float, int]:
+    """Median milliseconds and round trips per request"""
+    ids, values = synthetic_values(items, tokens)
+    samples, round_trips = [], 0
+    for _ in range(runs):
+        redis = FakeRedis(values, latency)
+        start = time.perf_counter()
+        await (run_batched if batched else run_legacy)(redis, ids)
+        samples.append((time.perf_counter() - start) * 1000)
+        round_trips = redis.round_trips
+    return statistics.median(samples), round_trips
+
+
+async def main(sizes: list[int], tokens: int, latency: float, runs: int) -> None:
+    print(f"{'items':>6} {'tokens':>7} {'legacy ms':>10} {'trips':>6} {'batched ms':>11} {'trips':>6}")
+    for items in sizes:
+        legacy, legacy_trips = await measure(items, tokens, latency, runs, batched=False)
+        batched, batched_trips = await measure(items, tokens, latency, runs, batched=True)
+        print(f"{items:>6} {tokens:>7} {legacy:>10.1f} {legacy_trips:>6} {batched:>11.1f} {batched_trips:>6}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", default="20,50")
+    parser.add_argument("--tokens", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.5, help="Round trip latency in milliseconds")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    asyncio.run(main([int(size) for size in args.items.split(",")], args.tokens, args.latency / 1000, args.runs))
@@ -0,0 +1,102 @@
+"""
+List query benchmark: deep selectinload tree vs the lean column projection of the intelligence list
+
+For each page size both query paths are run against the configured database and the median latency,
+the number of SQL statements and the number of ORM objects left in the session are reported.
+
+Usage: python -m benchmarks.bench_list_projection [--sizes 20,50,100] [--runs 20]
+Requires DATABASE_URL_DOGEX pointing at a populated database.
+"""
+import time
+import asyncio
+import argparse
+import statistics
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import selectinload
+
+from data.db import declare_database
+from apps.intelligence import services, schemas
+from apps.intelligence.models import (
+    IntelligenceModel, EntityIntelligenceModel, EntityModel, TokenChainDataModel, TokenModel
+)
+import settings
+
+
+def legacy_load_options():
+    """The entity preloading tree the list query used before the projection"""
+    return selectinload(
+        IntelligenceModel.entity_intelligences
+    ).selectinload(
+        EntityIntelligenceModel.entity
+    ).options(
+        selectinload(EntityModel.token_entity)
+        .selectinload(TokenModel.chain_datas)
+        .selectinload(TokenChainDataModel.chain),
+        selectinload(EntityModel.tokendata_entity)
+        .selectinload(TokenChainDataModel.chain),
+        selectinload(EntityModel.entity_tags)
+    )
+
+
+async def run_legacy(session, filters, page_size: int) -> int:
+    sql = select(IntelligenceModel).where(*filters).options(
+        legacy_load_options()
+    ).order_by(
+        IntelligenceModel.published_at.desc()
+    ).limit(page_size).distinct()
+    return len((await session.execute(sql)).scalars().all())
+
+
+async def run_lean(session, base_query, filters, page_size: int) -> int:
+    return len(await services._execute_intelligence_query(session, base_query, filters, 0, page_size))
+
+
+async def measure(session_factory, statements: list, page_size: int, runs: int, lean: bool) -> tuple[float, int, int]:
+    """Median latency in milliseconds, statements per page and ORM objects per page"""
+    query_params = schemas.IntelligenceQueryParams(type=None, subtype=None, is_valuable=True)
+    base_query, filters = services._build_list_query(query_params)
+
+    samples, statement_counts, object_counts = [], [], []
+    for _ in range(runs):
+        async with session_factory() as session:
+            statements.clear()
+            start = time.perf_counter()
+            if lean:
+                await run_lean(session, base_query, filters, page_size)
+            else:
+                await run_legacy(session, filters, page_size)
+            samples.append((time.perf_counter() - start) * 1000)
+            statement_counts.append(len(statements))
+            object_counts.append(len(session.identity_map))
+
+    return statistics.median(samples), max(statement_counts), max(object_counts)
+
+
+async def main(sizes: list[int], runs: int) -> None:
+    session_factory = declare_database(url=settings.DATABASE_DICT["dogex"])
+    engine = session_factory.kw["bind"]
+
+    statements = []
+    event.listen(
+        engine.sync_engine, "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement)
+    )
+
+    print(f"{'page size':>10} {'path':>8} {'median ms':>10} {'queries':>8} {'orm objects':>12}")
+    try:
+        for page_size in sizes:
+            for lean in (False, True):
+                latency, statement_count, object_count = await measure(session_factory, statements, page_size, runs, lean)
+                print(f"{page_size:>10} {'lean' if lean else 'legacy':>8} {latency:>10.2f} {statement_count:>8} {object_count:>12}")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="20,50,100")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    asyncio.run(main([int(size) for size in args.sizes.split(",")], args.runs))
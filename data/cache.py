@@ -1,18 +1,33 @@
 import redis.asyncio as aioredis
 from pydantic import BaseModel, Field, field_serializer, field_validator, computed_field, SerializationInfo
-from typing import TypeVar, TypeVarTuple, Unpack, Any, overload, AsyncGenerator, Generator, Type, Tuple
+from typing import TypeVar, TypeVarTuple, Unpack, Any, overload, AsyncGenerator, Generator, Type, Tuple, Callable, Awaitable
+from collections import OrderedDict
 import json as jsonlib
+import logging
 import asyncio
+import time
 import yarl
 import re
+from . import codec
 
 
 ModelType = TypeVar("ModelType", bound=BaseModel)
 _Type = TypeVar("_Type")
 _TypeGroup = TypeVarTuple("_TypeGroup")
 
-__all__ = ["RedisConfig", "Cache"]
+__all__ = ["RedisConfig", "Cache", "LocalCache", "TouchBuffer"]
 
+logger = logging.getLogger('cache')
+
+# Channel carrying the keys whose in-process copies have to be dropped on every worker
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+# Fields of RedisConfig that configure the in-process layers and are not passed to redis
+LOCAL_CONFIG_FIELDS = {"local_size", "local_ttl", "publish_invalidations", "touch_interval", "touch_min_remaining"}
+
+
+# Held by the in-process layer for keys known to be missing in redis
+MISSING = object()
 
 REDIS_URL_RE = re.compile(r'redis://(?::(?P<password>[^:@]+)@)?(?P<host>[^:@]+):(?P<port>\d+)/(?P<db>\d+)(?:\?(?P<query>.*))?')
 
@@ -23,6 +38,15 @@ class RedisConfig(BaseModel):
     password: str | None = None
     db: int = 0
     encoding: str | None = None
+    # In-process L1 layer, local_size 0 disables it
+    local_size: int = 0
+    local_ttl: float = 1.0
+    # Publish the invalidation of written keys, for the cache written to when the readers have an in-process layer
+    publish_invalidations: bool = False
+    # Sliding TTL touches buffered and flushed every touch_interval seconds (0 sends each EXPIRE at once),
+    # touch_min_remaining > 0 only refreshes keys with fewer seconds left
+    touch_interval: float = 0.0
+    touch_min_remaining: int = 0
 
     def __init__(self, url: str | yarl.URL | None = None, **kwargs):
         if url is not None:
@@ -52,6 +76,84 @@ class RedisConfig(BaseModel):
         return self.encoding is not None
 
 
+class LocalCache:
+    """
+    Bounded in-process cache with a per entry TTL and LRU eviction
+    """
+
+    def __init__(self, size: int, ttl: float) -> None:
+        self.size = size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        """Whether the key has an entry, expired or not, without counting a hit or a miss"""
+        return key in self._entries
+
+    def get(self, key: str) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: str, value: Any) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+class TouchBuffer:
+    """
+    Sliding TTL refreshes of cache hits, deduplicated in process until the next flush
+
+    A key touched many times between two flushes costs one EXPIRE with the longest requested TTL.
+    """
+
+    def __init__(self, interval: float, min_remaining: int = 0) -> None:
+        self.interval = interval
+        self.min_remaining = min_remaining
+        self.touches = 0
+        self.expires = 0
+        self.skipped = 0
+        self._pending: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self, key: str, ttl: int) -> None:
+        self.touches += 1
+        if ttl > self._pending.get(key, 0):
+            self._pending[key] = ttl
+
+    def drain(self) -> dict[str, int]:
+        pending, self._pending = self._pending, {}
+        return pending
+
+    def stats(self) -> dict[str, int]:
+        return {"pending": len(self._pending), "touches": self.touches, "expires": self.expires, "skipped": self.skipped}
+
+
 class Cache:
     def __init__(
         self,
@@ -63,7 +165,7 @@ class Cache:
         db: int | str = 0,
         loop: asyncio.AbstractEventLoop | None = None
     ) -> None:
-        params = config.model_dump() if config is not None else {}
+        params = config.model_dump(exclude=LOCAL_CONFIG_FIELDS) if config is not None else {}
         if host is not None:
             params['host'] = host
         if port != 6379:
@@ -75,6 +177,17 @@ class Cache:
         # Prohibit using decode_responses parameter and custom encoding
         self._redis = aioredis.Redis(**params)
         self._loop = loop or asyncio.get_event_loop()
+        self._local = LocalCache(config.local_size, config.local_ttl) if config is not None and config.local_size > 0 else None
+        self._publish_invalidations = self._local is not None or (config is not None and config.publish_invalidations)
+        self._handlers: dict[str, list[Callable[[bytes], Awaitable[None] | None]]] = {}
+        self._patterns: dict[str, list[Callable[[bytes, bytes], Awaitable[None] | None]]] = {}
+        self._listener: asyncio.Task | None = None
+        self._touches = TouchBuffer(config.touch_interval, config.touch_min_remaining) \
+            if config is not None and config.touch_interval > 0 else None
+        self._flusher: asyncio.Task | None = None
+        if self._local is not None:
+            # Listened to from the first read on
+            self._handlers[INVALIDATION_CHANNEL] = [self._on_invalidation]
 
     @property
     def backend(self) -> aioredis.Redis:
@@ -83,9 +196,80 @@ class Cache:
         """
         return self._redis
 
+    @property
+    def local(self) -> LocalCache | None:
+        """
+        Get the in-process layer (None when disabled)
+        """
+        return self._local
+
+    @property
+    def touches(self) -> TouchBuffer | None:
+        """
+        Get the buffer of pending TTL touches (None when touches are sent at once)
+        """
+        return self._touches
+
     async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self.flush_touches()
+            except Exception:
+                logger.exception("Flushing cache touches on close failed")
         await self._redis.close()
 
+    async def touch(self, key: str, ttl: int) -> None:
+        """
+        Extend the TTL of a key that was read, buffered and flushed in one pipeline with the other touched keys
+
+        :param key: Cache key
+        :param ttl: New TTL (seconds)
+        """
+        if self._touches is None:
+            await self._redis.expire(str(key), ttl)
+            return
+        self._touches.add(str(key), ttl)
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_loop(), name="cache-touch")
+
+    async def flush_touches(self) -> None:
+        """
+        Send the buffered touches, one EXPIRE per key (only for keys below touch_min_remaining when it is set)
+        """
+        pending = self._touches.drain() if self._touches is not None else {}
+        if not pending:
+            return
+        if self._touches.min_remaining > 0:
+            pipe = self._redis.pipeline(transaction=False)
+            for key in pending:
+                pipe.ttl(key)
+            # Missing (-2) and persistent (-1) keys are left alone as well
+            remaining = await pipe.execute()
+            due = {key: ttl for (key, ttl), left in zip(pending.items(), remaining) if 0 <= left < self._touches.min_remaining}
+            self._touches.skipped += len(pending) - len(due)
+            pending = due
+            if not pending:
+                return
+        pipe = self._redis.pipeline(transaction=False)
+        for key, ttl in pending.items():
+            pipe.expire(key, ttl)
+        await pipe.execute()
+        self._touches.expires += len(pending)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._touches.interval)
+            try:
+                await self.flush_touches()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Touches are best effort, a missed refresh only lets a key expire on time
+                logger.exception("Flushing cache touches failed")
+
     async def delete(self, key: str):
         """
         Delete data from cache
@@ -93,6 +277,220 @@ class Cache:
         :param key: Cache key
         """
         await self._redis.delete(str(key))
+        await self.invalidate(key)
+
+    def subscribe(self, channel: str, handler: Callable[[bytes], Awaitable[None] | None]) -> None:
+        """
+        Register a handler for a pub/sub channel, all channels share one connection listened to in the background
+
+        :param channel: Channel name
+        :param handler: Called with the raw message payload
+        """
+        self._handlers.setdefault(channel, []).append(handler)
+        self._restart_listener()
+
+    def psubscribe(self, pattern: str, handler: Callable[[bytes, bytes], Awaitable[None] | None]) -> None:
+        """
+        Register a handler for the pub/sub channels matching a pattern (e.g. keyspace notifications)
+
+        :param pattern: Channel pattern
+        :param handler: Called with the raw channel name and message payload
+        """
+        self._patterns.setdefault(pattern, []).append(handler)
+        self._restart_listener()
+
+    def _restart_listener(self) -> None:
+        if self._listener is not None:
+            # Restart so the new channel is subscribed as well
+            self._listener.cancel()
+            self._listener = None
+        self._ensure_listener()
+
+    async def publish(self, channel: str, message: str | bytes) -> None:
+        """
+        Publish a message on a pub/sub channel
+
+        :param channel: Channel name
+        :param message: Raw payload
+        """
+        await self._redis.publish(channel, message)
+
+    async def invalidate(self, *keys: str) -> None:
+        """
+        Drop in-process copies of keys on every worker, call on the cache the keys were written to
+
+        Nothing is published when neither this cache nor its configuration uses an in-process layer.
+
+        :param keys: Cache keys
+        """
+        if not keys:
+            return
+        keys = tuple(str(key) for key in keys)
+        if self._local is not None:
+            self._local.delete(*keys)
+        if self._publish_invalidations:
+            await self._redis.publish(INVALIDATION_CHANNEL, jsonlib.dumps(keys))
+
+    def queue_invalidation(self, pipe: Any, *keys: str) -> None:
+        """
+        Queue the invalidation of keys on the pipeline that writes them, after the writes so that no worker reads
+        the old value back in between
+
+        :param pipe: Pipeline of this cache's backend
+        :param keys: Cache keys
+        """
+        if not keys:
+            return
+        keys = tuple(str(key) for key in keys)
+        if self._local is not None:
+            self._local.delete(*keys)
+        if self._publish_invalidations:
+            pipe.publish(INVALIDATION_CHANNEL, jsonlib.dumps(keys))
+
+    def _on_invalidation(self, message: bytes) -> None:
+        self._local.delete(*jsonlib.loads(message))
+
+    def _ensure_listener(self) -> None:
+        if (self._handlers or self._patterns) and (self._listener is None or self._listener.done()):
+            self._listener = asyncio.create_task(self._listen(), name="cache-pubsub")
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with self._redis.pubsub() as pubsub:
+                    if self._handlers:
+                        await pubsub.subscribe(*self._handlers)
+                    if self._patterns:
+                        await pubsub.psubscribe(*self._patterns)
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            channel = message["channel"].decode() if isinstance(message["channel"], bytes) else message["channel"]
+                            calls = [(handler, (message["data"],)) for handler in self._handlers.get(channel, ())]
+                        elif message["type"] == "pmessage":
+                            channel = message["pattern"].decode() if isinstance(message["pattern"], bytes) else message["pattern"]
+                            calls = [(handler, (message["channel"], message["data"])) for handler in self._patterns.get(channel, ())]
+                        else:
+                            continue
+                        for handler, args in calls:
+                            try:
+                                result = handler(*args)
+                                if asyncio.iscoroutine(result):
+                                    await result
+                            except Exception:
+                                logger.exception(f"Pub/sub handler error on {channel}")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Entries may have been missed while disconnected
+                if self._local is not None:
+                    self._local.clear()
+                logger.exception("Pub/sub connection lost, reconnecting")
+                await asyncio.sleep(1)
+
+    def encode(self, key: str, value: str | bytes) -> str | bytes:
+        """
+        Encode a value with the codec of its key namespace, for writes that bypass Cache (pipelines)
+
+        :param key: Cache key
+        :param value: Raw value
+        """
+        return codec.encode(str(key), value)
+
+    async def _get_raw(self, key: str, keep_missing: bool = False) -> bytes | None:
+        if self._local is None:
+            return codec.decode(key, await self._redis.get(key))
+        self._ensure_listener()
+        data = self._local.get(key)
+        if data is MISSING:
+            return None
+        if data is None:
+            # The in-process layer keeps decoded values
+            data = codec.decode(key, await self._redis.get(key))
+            if data is not None:
+                self._local.set(key, data)
+            elif keep_missing:
+                self._local.set(key, MISSING)
+        return data
+
+    async def get_counter(self, key: str) -> int:
+        """
+        Get a counter written with INCR, 0 when missing
+
+        Unlike get, a missing counter is held by the in-process layer as well, until its key is invalidated.
+
+        :param key: Cache key
+        """
+        data = await self._get_raw(str(key), keep_missing=True)
+        return int(data) if data else 0
+
+    async def mget(self, keys: list[str]) -> list[bytes | None]:
+        """
+        Get several raw values, in-process hits skip redis and the rest is fetched with one MGET
+
+        :param keys: Cache keys
+        :return: Raw bytes data (None for missing keys) in key order
+        """
+        keys = [str(key) for key in keys]
+        if self._local is None:
+            return [codec.decode(key, value) for key, value in zip(keys, await self._redis.mget(keys))] if keys else []
+        self._ensure_listener()
+        values = [self._local.get(key) for key in keys]
+        missing = [index for index, value in enumerate(values) if value is None]
+        if missing:
+            fetched = await self._redis.mget([keys[index] for index in missing])
+            for index, value in zip(missing, fetched):
+                value = codec.decode(keys[index], value)
+                values[index] = value
+                if value is not None:
+                    self._local.set(keys[index], value)
+        return [None if value is MISSING else value for value in values]
+
+    async def hgetall(self, key: str) -> dict[bytes, bytes]:
+        """
+        Get all fields of a hash, served from the in-process layer when present
+
+        :param key: Cache key
+        :return: Raw field mapping (empty when the key is missing)
+        """
+        key = str(key)
+        if self._local is None:
+            return self._decode_fields(key, await self._redis.hgetall(key))
+        self._ensure_listener()
+        data = self._local.get(key)
+        if data is None:
+            data = self._decode_fields(key, await self._redis.hgetall(key))
+            if data:
+                self._local.set(key, data)
+        return data
+
+    async def hget(self, key: str, field: str) -> bytes | None:
+        """
+        Get one field of a hash
+
+        :param key: Cache key
+        :param field: Hash field
+        :return: Raw bytes data (None when missing)
+        """
+        key = str(key)
+        return codec.decode(key, await self._redis.hget(key, field))
+
+    async def hset(self, key: str, mapping: dict[str, Any]) -> None:
+        """
+        Set fields of a hash, str / bytes values are encoded with the codec of the key namespace
+
+        :param key: Cache key
+        :param mapping: Field values
+        """
+        key = str(key)
+        await self._redis.hset(key, mapping={
+            field: codec.encode(key, value) if isinstance(value, (str, bytes)) else value
+            for field, value in mapping.items()
+        })
+        await self.invalidate(key)
+
+    @staticmethod
+    def _decode_fields(key: str, data: dict[bytes, bytes]) -> dict[bytes, bytes]:
+        return {field: codec.decode(key, value) for field, value in data.items()}
 
     @overload
     async def get(self, key: str, model: Type[_Type], *,
@@ -139,7 +537,7 @@ class Cache:
     async def get(self, key: str, model: Type[_Type] | Type[Tuple[Unpack[_TypeGroup]]] | None = None, *,
                   strict: bool | None = None, context: dict[str, Any] | None = None):
         key = str(key)
-        data: bytes | None = await self._redis.get(key)
+        data: bytes | None = await self._get_raw(key)
         if data is None:
             return None
         elif model is None or model is bytes:
@@ -204,13 +602,14 @@ class Cache:
         if isinstance(expire, float):
             expire = int(expire * 1000)
         if isinstance(value, (str, bytes)):
-            await self._redis.set(key, value, px=expire)
+            await self._redis.set(key, codec.encode(key, value), px=expire)
         elif isinstance(value, int):
             await self._redis.set(key, value.to_bytes((value.bit_length() + 7) // 8, 'big'), px=expire)
         elif isinstance(value, BaseModel):
-            await self._redis.set(key, value.model_dump_json(**dump_kws), px=expire)
+            await self._redis.set(key, codec.encode(key, value.model_dump_json(**dump_kws)), px=expire)
         else:
-            await self._redis.set(key, jsonlib.dumps(value, **dump_kws), px=expire)
+            await self._redis.set(key, codec.encode(key, jsonlib.dumps(value, **dump_kws)), px=expire)
+        await self.invalidate(key)
 
     @overload
     async def smembers(self, key: str, model: Type[_Type], *,
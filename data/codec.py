@@ -0,0 +1,95 @@
+from typing import Callable
+import zstandard
+import lz4.frame
+
+
+__all__ = ["Codec", "CODECS", "register", "codec_for", "encode", "decode"]
+
+# Header of every encoded value, followed by one codec tag byte. Never the start of a JSON / UTF-8 value,
+# so values written before a namespace got a codec (or by other writers) are still read as they are.
+MAGIC = b"\xfe\xca"
+
+
+class Codec:
+    """
+    Compression codec of cache values
+    """
+
+    def __init__(self, name: str, tag: int, compress: Callable[[bytes], bytes], decompress: Callable[[bytes], bytes]) -> None:
+        self.name = name
+        self.tag = tag
+        self.header = MAGIC + bytes([tag])
+        self.compress = compress
+        self.decompress = decompress
+
+
+_zstd_compressor = zstandard.ZstdCompressor(level=3)
+_zstd_decompressor = zstandard.ZstdDecompressor()
+
+CODECS: dict[str, Codec] = {
+    "zstd": Codec("zstd", 1, _zstd_compressor.compress, _zstd_decompressor.decompress),
+    "lz4": Codec("lz4", 2, lz4.frame.compress, lz4.frame.decompress),
+}
+_CODECS_BY_TAG = {codec.tag: codec for codec in CODECS.values()}
+
+# Key prefix -> (codec, minimum value size to encode), a None codec stores values plain but still decodes them
+_namespaces: dict[str, tuple[Codec | None, int]] = {}
+
+
+def register(prefix: str, name: str | None, min_size: int = 512) -> None:
+    """
+    Set the codec of every key starting with the prefix
+
+    :param prefix: Key prefix of the namespace
+    :param name: Codec name ('zstd' / 'lz4'), None or 'none' to write plain values
+    :param min_size: Smaller values are written plain, compression does not pay off for them
+    """
+    if name in (None, "none"):
+        _namespaces[prefix] = (None, min_size)
+        return
+    if name not in CODECS:
+        raise ValueError(f"Unknown cache codec: {name}")
+    _namespaces[prefix] = (CODECS[name], min_size)
+
+
+def _namespace(key: str) -> tuple[Codec | None, int] | None:
+    match = None
+    for prefix in _namespaces:
+        if key.startswith(prefix) and (match is None or len(prefix) > len(match)):
+            match = prefix
+    return _namespaces[match] if match is not None else None
+
+
+def codec_for(key: str) -> Codec | None:
+    """
+    Codec values of the key are written with
+    """
+    namespace = _namespace(key)
+    return namespace[0] if namespace is not None else None
+
+
+def encode(key: str, value: str | bytes) -> str | bytes:
+    """
+    Compress a value of a namespace with a codec, other values are returned unchanged
+    """
+    namespace = _namespace(key)
+    if namespace is None or namespace[0] is None:
+        return value
+    codec, min_size = namespace
+    raw = value.encode("utf-8") if isinstance(value, str) else value
+    if len(raw) < min_size:
+        return value
+    compressed = codec.compress(raw)
+    return codec.header + compressed if len(compressed) + len(codec.header) < len(raw) else value
+
+
+def decode(key: str, value: bytes | None) -> bytes | None:
+    """
+    Decompress an encoded value of a namespace, plain values are returned unchanged
+    """
+    if value is None or not value.startswith(MAGIC) or _namespace(key) is None:
+        return value
+    codec = _CODECS_BY_TAG.get(value[len(MAGIC)])
+    if codec is None:
+        return value
+    return codec.decompress(value[len(MAGIC) + 1:])
@@ -0,0 +1,127 @@
+from typing import Callable, Awaitable, Any, Hashable
+from collections import Counter
+import functools
+import asyncio
+
+
+__all__ = ["Waiters", "SingleFlight", "coalesce", "flights"]
+
+# Every SingleFlight by name, for reporting
+flights: dict[str, 'SingleFlight'] = {}
+
+
+class Waiters:
+    """
+    In-process futures keyed by cache key, woken when the value of the key is ready
+
+    Used in place of sleep-polling: a request that cannot build a value itself waits here until the builder
+    (in this worker, or in another one via a pub/sub message passed to on_message) calls notify.
+    """
+
+    def __init__(self) -> None:
+        self._futures: dict[str, set[asyncio.Future]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(futures) for futures in self._futures.values())
+
+    async def wait(self, key: str, timeout: float, check: Callable[[], Awaitable[bool]] | None = None) -> bool:
+        """
+        Wait until the key is notified
+
+        :param key: Cache key
+        :param timeout: Maximum wait in seconds
+        :param check: Called once the waiter is registered, a truthy result returns at once
+            (closes the gap between a cache miss and the registration)
+        :return: Whether the key was notified (or check passed) before the timeout
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._futures.setdefault(key, set()).add(future)
+        try:
+            if check is not None and await check():
+                return True
+            await asyncio.wait_for(future, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            futures = self._futures.get(key)
+            if futures is not None:
+                futures.discard(future)
+                if not futures:
+                    del self._futures[key]
+
+    def notify(self, key: str) -> None:
+        """
+        Wake every waiter of the key
+        """
+        for future in self._futures.pop(key, ()):
+            if not future.done():
+                future.set_result(None)
+
+    def on_message(self, message: bytes) -> None:
+        """
+        Pub/sub handler, the message is the notified key
+        """
+        self.notify(message.decode() if isinstance(message, bytes) else message)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls within one worker into a single in-flight call
+
+    The first caller of a key starts the call as a task, callers arriving while it runs await the same
+    task. The task is shielded, so a cancelled (disconnected) caller does not cancel it for the others.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.calls = Counter()
+        self.collapsed = Counter()
+        self._tasks: dict[tuple[str, Hashable], asyncio.Task] = {}
+        flights[name] = self
+
+    async def do(self, name: str, key: Hashable, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """
+        Run func, or join the identical call already in flight
+
+        :param name: Call name (counters are kept per name)
+        :param key: Normalized arguments of the call
+        """
+        self.calls[name] += 1
+        task = self._tasks.get((name, key))
+        if task is not None:
+            self.collapsed[name] += 1
+            return await asyncio.shield(task)
+
+        task = asyncio.ensure_future(func(*args, **kwargs))
+        self._tasks[(name, key)] = task
+        task.add_done_callback(functools.partial(self._done, (name, key)))
+        return await asyncio.shield(task)
+
+    def _done(self, key: tuple[str, Hashable], task: asyncio.Task) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        # Mark the exception retrieved even when every caller went away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        return {
+            name: {"calls": self.calls[name], "collapsed": self.collapsed[name]}
+            for name in self.calls
+        }
+
+
+def coalesce(flight: SingleFlight, key: Callable[..., Hashable]):
+    """
+    Decorate a coroutine function so concurrent calls with the same key share one result
+
+    :param flight: SingleFlight the calls are tracked in
+    :param key: Receives the call arguments and returns the normalized key (leave out per-request objects)
+    """
+    def decorator(func: Callable[..., Awaitable[Any]]):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            return await flight.do(func.__name__, key(*args, **kwargs), func, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,70 @@
+from pydantic import BaseModel
+from typing import Any
+from .cache import Cache
+import json as jsonlib
+import xxhash
+
+
+__all__ = ["canonicalize", "digest", "KeyNamespace"]
+
+
+def canonicalize(value: Any) -> Any:
+    """
+    Convert parameters into a canonical JSON-able form
+
+    Models are dumped, mappings are key sorted on serialization and sets are sorted,
+    so equal parameters always produce the same key regardless of construction or iteration order.
+    """
+    if isinstance(value, BaseModel):
+        return canonicalize(value.model_dump(mode="json"))
+    if isinstance(value, dict):
+        return {str(key): canonicalize(item) for key, item in value.items()}
+    if isinstance(value, (set, frozenset)):
+        return sorted((canonicalize(item) for item in value), key=lambda item: jsonlib.dumps(item, sort_keys=True, default=str))
+    if isinstance(value, (list, tuple)):
+        return [canonicalize(item) for item in value]
+    return value
+
+
+def digest(*parts: Any, **params: Any) -> str:
+    """
+    64-bit xxhash of the canonical form of the parameters
+    """
+    raw = jsonlib.dumps([canonicalize(parts), canonicalize(params)], sort_keys=True, separators=(",", ":"), default=str)
+    return xxhash.xxh3_64_hexdigest(raw)
+
+
+class KeyNamespace:
+    """
+    Family of cache keys sharing a prefix and a generation number
+
+    Keys are '{prefix}:g{generation}:{digest}'. Bumping the generation makes every existing key of the
+    namespace unreachable at once, the orphaned entries then simply expire.
+    """
+
+    def __init__(self, prefix: str) -> None:
+        self.prefix = prefix
+        self.generation_key = f"{prefix}:generation"
+
+    async def generation(self, cache: Cache) -> int:
+        """
+        Current generation, 0 until the first bump
+
+        Read through the cache's in-process layer when enabled, which also holds the missing key, so building a key
+        does not cost a redis round trip until a bump invalidates it.
+        """
+        return await cache.get_counter(self.generation_key)
+
+    async def key(self, cache: Cache, *parts: Any, **params: Any) -> str:
+        """
+        Build the key of the given parameters in the current generation
+        """
+        return f"{self.prefix}:g{await self.generation(cache)}:{digest(*parts, **params)}"
+
+    async def bump(self, cache: Cache) -> int:
+        """
+        Invalidate the whole namespace, call on the master cache
+        """
+        generation = await cache.backend.incr(self.generation_key)
+        await cache.invalidate(self.generation_key)
+        return generation
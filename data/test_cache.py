@@ -0,0 +1,147 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch, call
+
+
+class TestLocalCache(unittest.TestCase):
+
+    def test_lru_eviction(self):
+        from data.cache import LocalCache
+
+        local = LocalCache(size=2, ttl=60)
+        local.set("a", b"1")
+        local.set("b", b"2")
+        local.get("a")
+        local.set("c", b"3")
+
+        self.assertEqual(local.get("a"), b"1")
+        self.assertIsNone(local.get("b"))
+        self.assertEqual(local.get("c"), b"3")
+
+    def test_expired_entry_is_a_miss(self):
+        from data.cache import LocalCache
+
+        local = LocalCache(size=2, ttl=60)
+        with patch("data.cache.time.monotonic", return_value=0):
+            local.set("a", b"1")
+        with patch("data.cache.time.monotonic", return_value=61):
+            self.assertIsNone(local.get("a"))
+        self.assertEqual(len(local), 0)
+
+
+class TestCacheLocalLayer(unittest.IsolatedAsyncioTestCase):
+
+    def _cache(self):
+        from data.cache import Cache, RedisConfig
+
+        cache = Cache(RedisConfig(local_size=16, local_ttl=60))
+        cache._redis = AsyncMock()
+        cache._ensure_listener = lambda: None
+        return cache
+
+    async def test_mget_only_fetches_local_misses(self):
+        cache = self._cache()
+        cache.local.set("a", b"1")
+        cache._redis.mget.return_value = [b"2", None]
+
+        values = await cache.mget(["a", "b", "c"])
+
+        self.assertEqual(values, [b"1", b"2", None])
+        cache._redis.mget.assert_awaited_once_with(["b", "c"])
+        self.assertEqual(cache.local.get("b"), b"2")
+
+    async def test_missing_counter_is_held_until_invalidated(self):
+        cache = self._cache()
+        cache._redis.get.return_value = None
+
+        self.assertEqual(await cache.get_counter("g"), 0)
+        self.assertEqual(await cache.get_counter("g"), 0)
+        self.assertIsNone(await cache.get("g"))
+        self.assertEqual(await cache.mget(["g"]), [None])
+        cache._redis.get.assert_awaited_once_with("g")
+
+        cache._on_invalidation(b'["g"]')
+        cache._redis.get.return_value = b"1"
+        self.assertEqual(await cache.get_counter("g"), 1)
+
+    async def test_writes_publish_invalidations_when_readers_hold_copies(self):
+        from data.cache import Cache, RedisConfig, INVALIDATION_CHANNEL
+
+        master = Cache(RedisConfig(publish_invalidations=True))
+        master._redis = AsyncMock()
+        await master.set("author", b"1")
+        await master.hset("page", {"data": b"[]"})
+        master._redis.publish.assert_has_awaits([
+            call(INVALIDATION_CHANNEL, '["author"]'), call(INVALIDATION_CHANNEL, '["page"]')
+        ])
+
+        pipe = MagicMock()
+        master.queue_invalidation(pipe, "a", "b")
+        pipe.publish.assert_called_once_with(INVALIDATION_CHANNEL, '["a", "b"]')
+
+        # Nobody holds copies, writes publish nothing
+        plain = Cache(RedisConfig())
+        plain._redis = AsyncMock()
+        await plain.set("author", b"1")
+        plain._redis.publish.assert_not_called()
+
+    async def test_invalidation_message_drops_keys(self):
+        cache = self._cache()
+        cache.local.set("a", b"1")
+
+        cache._on_invalidation(b'["a"]')
+
+        self.assertIsNone(cache.local.get("a"))
+
+
+class TestCacheTouches(unittest.IsolatedAsyncioTestCase):
+
+    def _cache(self, min_remaining: int = 0):
+        from data.cache import Cache, RedisConfig
+
+        cache = Cache(RedisConfig(touch_interval=60, touch_min_remaining=min_remaining))
+        cache._redis = MagicMock()
+        self.pipe = cache._redis.pipeline.return_value
+        self.pipe.execute = AsyncMock()
+        return cache
+
+    async def test_touches_are_deduplicated_into_one_pipeline(self):
+        cache = self._cache()
+        for _ in range(100):
+            await cache.touch("page", 180)
+        await cache.touch("author", 600)
+        await cache.touch("page", 60)
+
+        await cache.flush_touches()
+        cache._flusher.cancel()
+
+        self.assertEqual(self.pipe.expire.call_args_list, [call("page", 180), call("author", 600)])
+        self.pipe.execute.assert_awaited_once()
+        self.assertEqual(cache.touches.stats(), {"pending": 0, "touches": 102, "expires": 2, "skipped": 0})
+
+    async def test_only_keys_below_min_remaining_are_refreshed(self):
+        cache = self._cache(min_remaining=30)
+        await cache.touch("fresh", 180)
+        await cache.touch("due", 180)
+        await cache.touch("missing", 180)
+        self.pipe.execute.side_effect = [[150, 10, -2], [True]]
+
+        await cache.flush_touches()
+        cache._flusher.cancel()
+
+        self.pipe.expire.assert_called_once_with("due", 180)
+        self.assertEqual(cache.touches.skipped, 2)
+
+    async def test_unbuffered_touch_expires_at_once(self):
+        from data.cache import Cache, RedisConfig
+
+        cache = Cache(RedisConfig())
+        cache._redis = AsyncMock()
+
+        await cache.touch("page", 180)
+
+        cache._redis.expire.assert_awaited_once_with("page", 180)
+        self.assertIsNone(cache.touches)
+
+
+if __name__ == '__main__':
+    unittest.main()
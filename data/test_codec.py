@@ -0,0 +1,63 @@
+import json
+import unittest
+from unittest.mock import AsyncMock
+
+
+class TestCodec(unittest.TestCase):
+
+    def setUp(self):
+        from data import codec
+
+        codec.register("test:zstd", "zstd", min_size=64)
+        codec.register("test:lz4", "lz4", min_size=64)
+        codec.register("test:plain", None)
+        self.value = json.dumps([{"title": "pepe launch", "content": "token " * 50}] * 5).encode()
+
+    def test_round_trip(self):
+        from data import codec
+
+        for key in ("test:zstd:1", "test:lz4:1"):
+            encoded = codec.encode(key, self.value)
+            self.assertTrue(encoded.startswith(codec.MAGIC))
+            self.assertLess(len(encoded), len(self.value))
+            self.assertEqual(codec.decode(key, encoded), self.value)
+
+    def test_plain_values_stay_readable(self):
+        from data import codec
+
+        # Written before the namespace had a codec, small, or in a namespace switched back to plain
+        self.assertEqual(codec.decode("test:zstd:1", self.value), self.value)
+        self.assertEqual(codec.encode("test:zstd:1", "short"), "short")
+        self.assertEqual(codec.encode("test:plain:1", self.value), self.value)
+        self.assertEqual(codec.decode("test:plain:1", codec.encode("test:zstd:1", self.value)), self.value)
+
+    def test_unregistered_keys_are_untouched(self):
+        from data import codec
+
+        raw = codec.MAGIC + b"\x01 big-endian int"
+        self.assertEqual(codec.encode("other:1", self.value), self.value)
+        self.assertEqual(codec.decode("other:1", raw), raw)
+
+
+class TestCacheCodec(unittest.IsolatedAsyncioTestCase):
+
+    async def test_hash_fields_are_encoded_and_decoded(self):
+        from data import codec
+        from data.cache import Cache, RedisConfig
+
+        codec.register("test:page", "zstd", min_size=64)
+        cache = Cache(RedisConfig())
+        cache._redis = AsyncMock()
+        data = json.dumps([{"content": "token " * 50}])
+
+        await cache.hset("test:page:1", {"data": data, "total": 3})
+        stored = cache._redis.hset.await_args.kwargs["mapping"]
+        self.assertTrue(stored["data"].startswith(codec.MAGIC))
+        self.assertEqual(stored["total"], 3)
+
+        cache._redis.hgetall.return_value = {b"data": stored["data"], b"total": b"3"}
+        self.assertEqual(await cache.hgetall("test:page:1"), {b"data": data.encode(), b"total": b"3"})
+
+
+if __name__ == '__main__':
+    unittest.main()
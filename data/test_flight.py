@@ -0,0 +1,72 @@
+import asyncio
+import unittest
+
+
+class TestWaiters(unittest.IsolatedAsyncioTestCase):
+
+    async def test_notify_wakes_waiter(self):
+        from data.flight import Waiters
+
+        waiters = Waiters()
+        task = asyncio.create_task(waiters.wait("page", timeout=5))
+        await asyncio.sleep(0)
+
+        waiters.on_message(b"page")
+
+        self.assertTrue(await task)
+        self.assertEqual(len(waiters), 0)
+
+    async def test_timeout_without_notification(self):
+        from data.flight import Waiters
+
+        waiters = Waiters()
+
+        self.assertFalse(await waiters.wait("page", timeout=0.01))
+        self.assertEqual(len(waiters), 0)
+
+    async def test_check_short_circuits(self):
+        from data.flight import Waiters
+
+        async def ready():
+            return True
+
+        self.assertTrue(await Waiters().wait("page", timeout=5, check=ready))
+
+
+class TestSingleFlight(unittest.IsolatedAsyncioTestCase):
+
+    async def test_concurrent_identical_calls_share_one_call(self):
+        from data.flight import SingleFlight, coalesce
+
+        flight = SingleFlight("test")
+        executions = []
+
+        @coalesce(flight, lambda request, key: key)
+        async def lookup(request, key):
+            executions.append(key)
+            await asyncio.sleep(0.01)
+            return {"key": key}
+
+        results = await asyncio.gather(lookup(object(), "a"), lookup(object(), "a"), lookup(object(), "b"))
+
+        self.assertEqual(executions, ["a", "b"])
+        self.assertIs(results[0], results[1])
+        self.assertEqual(flight.stats(), {"lookup": {"calls": 3, "collapsed": 1}})
+
+    async def test_exception_reaches_every_caller(self):
+        from data.flight import SingleFlight
+
+        flight = SingleFlight("test-error")
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(flight.do("fail", 1, fail), flight.do("fail", 1, fail), return_exceptions=True)
+
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+        self.assertEqual(flight.collapsed["fail"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
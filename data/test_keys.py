@@ -0,0 +1,41 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+
+class TestKeyNamespace(unittest.IsolatedAsyncioTestCase):
+
+    def test_digest_is_order_independent(self):
+        from data.keys import digest
+
+        self.assertEqual(digest({"b", "a", "c"}), digest({"c", "b", "a"}))
+        self.assertEqual(digest(page=1, size=20), digest(size=20, page=1))
+        self.assertNotEqual(digest(["a", "b"]), digest(["b", "a"]))
+
+    def test_models_are_canonicalized(self):
+        from pydantic import BaseModel
+        from data.keys import digest
+
+        class Params(BaseModel):
+            type: str | None = None
+            subtype: str | None = None
+
+        self.assertEqual(digest(Params(type="news", subtype="x")), digest(Params(subtype="x", type="news")))
+
+    async def test_bump_moves_keys_to_a_new_generation(self):
+        from data.keys import KeyNamespace
+
+        cache = MagicMock()
+        cache.get_counter = AsyncMock(return_value=0)
+        namespace = KeyNamespace("test:page")
+
+        first = await namespace.key(cache, 1, size=20)
+        cache.get_counter.return_value = 1
+        second = await namespace.key(cache, 1, size=20)
+
+        self.assertTrue(first.startswith("test:page:g0:"))
+        self.assertTrue(second.startswith("test:page:g1:"))
+        self.assertEqual(first.rsplit(":", 1)[1], second.rsplit(":", 1)[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
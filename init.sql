@@ -8,6 +8,9 @@ CREATE SCHEMA IF NOT EXISTS public;
 -- Enable UUID extension
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 
+-- Enable trigram matching (keyword search on intelligence)
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- =====================================================
 -- TABLE DEFINITIONS
 -- =====================================================
@@ -576,7 +579,31 @@ INSERT INTO token_social_links (id, network, contract_address, link_type, url, r
 
 -- Create indexes for better query performance
 CREATE INDEX IF NOT EXISTS idx_intelligence_published_at ON intelligence(published_at);
+CREATE INDEX IF NOT EXISTS idx_intelligence_published_at_id ON intelligence(published_at DESC, id DESC);
 CREATE INDEX IF NOT EXISTS idx_intelligence_type ON intelligence(type);
+
+-- Keyword search: content plus analyzed zh/en text, word matches via tsvector, substring matches via trigrams
+ALTER TABLE intelligence ADD COLUMN IF NOT EXISTS search_text TEXT GENERATED ALWAYS AS (
+    coalesce(content, '') || ' ' || coalesce(analyzed->>'zh', '') || ' ' || coalesce(analyzed->>'en', '')
+) STORED;
+ALTER TABLE intelligence ADD COLUMN IF NOT EXISTS search_vector TSVECTOR GENERATED ALWAYS AS (
+    to_tsvector('simple'::regconfig, coalesce(content, '') || ' ' || coalesce(analyzed->>'zh', '') || ' ' || coalesce(analyzed->>'en', ''))
+) STORED;
+CREATE INDEX IF NOT EXISTS idx_intelligence_search_vector ON intelligence USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_intelligence_search_text_trgm ON intelligence USING GIN (search_text gin_trgm_ops);
+-- Highest increase rate per token, refreshed incrementally from entity_intelligence by the API workers
+CREATE TABLE IF NOT EXISTS token_increase_rate (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    is_deleted BOOLEAN DEFAULT FALSE,
+    created_at TIMESTAMP DEFAULT (NOW() AT TIME ZONE 'UTC'),
+    updated_at TIMESTAMP DEFAULT (NOW() AT TIME ZONE 'UTC'),
+    network TEXT NOT NULL,
+    contract_address TEXT NOT NULL,
+    highest_increase_rate FLOAT NOT NULL DEFAULT 0
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_token_increase_rate_token ON token_increase_rate(network, contract_address);
+CREATE INDEX IF NOT EXISTS idx_entity_intelligence_updated_at ON entity_intelligence(updated_at);
+CREATE INDEX IF NOT EXISTS idx_token_display_time ON token(display_time DESC, market_cap DESC) WHERE display_time IS NOT NULL;
 CREATE INDEX IF NOT EXISTS idx_token_symbol ON token(symbol);
 CREATE INDEX IF NOT EXISTS idx_token_chain_id ON token(chain_id);
 CREATE INDEX IF NOT EXISTS idx_entity_type ON entity(type);
@@ -1,5 +1,6 @@
 from .request import Request, RequestMiddleware
 from .security import SecurityData, SecurityStatus
+from .compression import CompressionMiddleware
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import settings
@@ -8,6 +9,10 @@ import settings
 
 # Register middleware
 def register_middleware(app: FastAPI):
+    # Innermost, so it sees whole response bodies before RequestMiddleware streams them
+    if settings.RESPONSE_COMPRESSION:
+        app.add_middleware(CompressionMiddleware)
+
     # Add custom middleware
     app.add_middleware(RequestMiddleware, public_key=settings.JWT_PUBLIC_KEY)
 
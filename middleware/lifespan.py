@@ -1,8 +1,10 @@
 from contextlib import asynccontextmanager
-from typing import Any, Callable, NoReturn, Awaitable
+from datetime import timedelta
+from typing import Any, Callable, NoReturn, Awaitable, Iterable
 from fastapi import FastAPI
 from data import Context, rabbit, cache, db
 from .security import RS256Checker
+from .request import Request
 import logging
 import asyncio
 import settings
@@ -13,9 +15,20 @@ logger = logging.getLogger('app')
 
 LifespanCallable = Callable[..., Awaitable[None]] | Callable[..., Awaitable[NoReturn]]
 
+# Receives a Request bound to the app, returns the cache filling jobs to run
+WarmupCallable = Callable[[Any], Iterable[Awaitable[Any]]]
+
 # Public list area
 startup_list: list[LifespanCallable] = []
 shutdown_list: list[LifespanCallable] = []
+warmup_dict: dict[str, WarmupCallable] = {}
+
+WARMUP_LOCK_KEY = "aigun:warmup:lock"
+WARMUP_DONE_KEY = "aigun:warmup:done"
+
+# Incremental jobs re-read this much before their watermark, rows committed late with an older timestamp are
+# picked up by the next run
+WATERMARK_OVERLAP = timedelta(minutes=1)
 
 
 def _startup_done(task: asyncio.Task[None]):
@@ -42,8 +55,14 @@ async def lifespan_context(app: FastAPI):
     # Startup
     app.state.context = Context(
         rabbit=rabbit.RabbitConfig(settings.RABBIT_URL) if settings.RABBIT_URL else None,
-        mastercache=cache.RedisConfig(settings.CACHE_URL) if settings.CACHE_URL else None,
-        slavecache=cache.RedisConfig(settings.SLAVE_CACHE_URL) if settings.SLAVE_CACHE_URL else None,
+        mastercache=cache.RedisConfig(
+            settings.CACHE_URL,
+            touch_interval=settings.CACHE_TOUCH_INTERVAL, touch_min_remaining=settings.CACHE_TOUCH_MIN_REMAINING,
+            publish_invalidations=settings.CACHE_LOCAL_SIZE > 0
+        ) if settings.CACHE_URL else None,
+        slavecache=cache.RedisConfig(
+            settings.SLAVE_CACHE_URL, local_size=settings.CACHE_LOCAL_SIZE, local_ttl=settings.CACHE_LOCAL_TTL
+        ) if settings.SLAVE_CACHE_URL else None,
         databases={
             key: db.DatabaseConfig(url)
             for key, url in settings.DATABASE_DICT.items()
@@ -52,7 +71,12 @@ async def lifespan_context(app: FastAPI):
 
     app.state.checker = RS256Checker(settings.JWT_PUBLIC_KEY)
 
+    app.state.ready = False
+
     async with app.state.context:
+        warmup_task = asyncio.create_task(warm_up(app), name=warm_up.__name__)
+        warmup_task.add_done_callback(_startup_done)
+
         for startup_coro_func in startup_list:
             task = asyncio.create_task(
                 startup_coro_func(app), name=startup_coro_func.__name__
@@ -72,6 +96,55 @@ async def lifespan_context(app: FastAPI):
         await asyncio.gather(*tasks)
 
 
+async def _run_warmers(app: FastAPI) -> int:
+    request = Request.for_app(app)
+    semaphore = asyncio.Semaphore(settings.CACHE_WARMUP_CONCURRENCY)
+
+    async def run(job: Awaitable[Any]) -> None:
+        async with semaphore:
+            await job
+
+    jobs = []
+    for name in settings.CACHE_WARMUP:
+        warmer = warmup_dict.get(name)
+        if warmer is None:
+            logger.warning(f"Unknown cache warmer {name}")
+            continue
+        jobs.extend(warmer(request))
+
+    results = await asyncio.gather(*[run(job) for job in jobs], return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception):
+            logger.error(f"Cache warm-up job failed: {result!r}")
+    return len(jobs)
+
+
+async def warm_up(app: FastAPI):
+    """
+    Fill the hot cache keys before reporting ready, one worker runs the warmers while the others wait for it
+    """
+    try:
+        master_cache = app.state.context.mastercache.backend
+        timeout = settings.CACHE_WARMUP_TIMEOUT
+        if await master_cache.set(WARMUP_LOCK_KEY, "1", ex=timeout, nx=True):
+            try:
+                jobs = await asyncio.wait_for(_run_warmers(app), timeout)
+                logger.info(f"Cache warm-up ran {jobs} jobs")
+            finally:
+                await master_cache.set(WARMUP_DONE_KEY, "1", ex=timeout)
+                await master_cache.delete(WARMUP_LOCK_KEY)
+        else:
+            # Another worker is warming, or has just warmed, the shared cache
+            deadline = asyncio.get_running_loop().time() + timeout
+            while asyncio.get_running_loop().time() < deadline:
+                if await master_cache.exists(WARMUP_DONE_KEY) or not await master_cache.exists(WARMUP_LOCK_KEY):
+                    break
+                await asyncio.sleep(0.5)
+    finally:
+        # A failed or timed out warm-up must not keep the worker out of rotation
+        app.state.ready = True
+
+
 def on_startup(
     func: LifespanCallable
 ):
@@ -89,4 +162,63 @@ def on_shutdown(
     Configure service shutdown tasks
     """
     shutdown_list.append(func)
-    return func
\ No newline at end of file
+    return func
+
+
+def on_warmup(
+    name: str
+):
+    """
+    Configure a cache warmer, enabled when its name is listed in settings.CACHE_WARMUP
+    """
+    def decorator(func: WarmupCallable):
+        warmup_dict[name] = func
+        return func
+    return decorator
+
+
+async def run_on_one_worker(context: Context, lock_key: str, interval: float, job: Callable[[], Awaitable[Any]], delay: bool = False) -> NoReturn:
+    """
+    Run a periodic job every interval seconds on one worker at a time
+
+    The first worker to take the lock of an interval runs the job. The lock outlives the tick, and is extended
+    while the job runs, so a run longer than the interval is not started again by another worker.
+
+    :param delay: Wait an interval before the first run
+    """
+    master_cache = context.mastercache.backend
+    ttl = max(int(interval) - 1, 1)
+
+    async def hold_lock() -> NoReturn:
+        while True:
+            await asyncio.sleep(max(ttl / 2, 0.5))
+            await master_cache.expire(lock_key, ttl)
+
+    while True:
+        if delay:
+            await asyncio.sleep(interval)
+        delay = True
+        try:
+            if not await master_cache.set(lock_key, "1", ex=ttl, nx=True):
+                continue
+            holder = asyncio.create_task(hold_lock(), name=f"{lock_key}:hold")
+            try:
+                await job()
+            finally:
+                holder.cancel()
+        except Exception as e:
+            logger.error(f"Periodic job {lock_key} error: {e}")
+
+
+def run_command(job: Callable[[Context], Awaitable[Any]]) -> Any:
+    """Run a command line job (rebuilds, backfills) with the cache and database connections of the app"""
+    async def main():
+        context = Context(
+            mastercache=cache.RedisConfig(settings.CACHE_URL),
+            slavecache=cache.RedisConfig(settings.SLAVE_CACHE_URL),
+            databases={key: db.DatabaseConfig(url) for key, url in settings.DATABASE_DICT.items()},
+        )
+        async with context:
+            return await job(context)
+
+    return asyncio.run(main())
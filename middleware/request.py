@@ -4,6 +4,7 @@ from typing import Any, Callable, Coroutine, Awaitable, Sequence
 from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
 from starlette.types import ASGIApp, Receive, Scope, Send
 from fastapi.requests import Request as BaseRequest
+from starlette.requests import empty_receive
 from fastapi.responses import Response as BaseResponse
 from .security import SecurityData, RS256Checker, SecurityCheckerBase
 from data.logger import create_logger
@@ -109,6 +110,13 @@ class Request(BaseRequest):
     def from_request(cls, request: BaseRequest) -> 'Request':
         return cls(request.scope, request.receive)
 
+    @classmethod
+    def for_app(cls, app: Any) -> 'Request':
+        """
+        Request bound to the app only, for running request based services outside of a request (consumers, jobs)
+        """
+        return cls({'type': 'http', 'app': app, 'headers': []}, empty_receive)
+
 
 class RequestMiddleware(BaseHTTPMiddleware):
     def __init__(self, app: ASGIApp, public_key: str, url_filters: Sequence[str] = ['/ping']) -> None:
@@ -0,0 +1,75 @@
+import gzip
+import unittest
+from unittest.mock import AsyncMock, patch
+
+import brotli
+
+
+async def collect(app, headers):
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    await app({"type": "http", "method": "GET", "path": "/", "headers": headers}, AsyncMock(), send)
+    return sent
+
+
+class TestCompression(unittest.IsolatedAsyncioTestCase):
+
+    def test_choose_encoding_follows_preference_and_skips_refused(self):
+        from utils.compression import choose_encoding
+
+        with patch("settings.RESPONSE_COMPRESSION", ["br", "gzip"]):
+            self.assertEqual(choose_encoding("gzip, deflate, br"), "br")
+            self.assertEqual(choose_encoding("gzip, br;q=0"), "gzip")
+            self.assertEqual(choose_encoding("*"), "br")
+            self.assertIsNone(choose_encoding("deflate"))
+            self.assertIsNone(choose_encoding(None))
+
+    async def test_middleware_compresses_large_json_and_weakens_etag(self):
+        from middleware.compression import CompressionMiddleware
+        from views.render import APIResponse
+
+        response = APIResponse(data=[{"content": "pepe to the moon " * 10, "index": index} for index in range(50)])
+        etag = response.headers["etag"]
+        sent = await collect(CompressionMiddleware(response), [(b"accept-encoding", b"gzip")])
+
+        headers = dict(sent[0]["headers"])
+        self.assertEqual(headers[b"content-encoding"], b"gzip")
+        self.assertEqual(headers[b"vary"], b"Accept-Encoding")
+        self.assertEqual(headers[b"etag"].decode(), f"W/{etag}")
+        self.assertEqual(gzip.decompress(sent[1]["body"]), response.body)
+        self.assertEqual(int(headers[b"content-length"]), len(sent[1]["body"]))
+
+    async def test_middleware_passes_small_bodies(self):
+        from middleware.compression import CompressionMiddleware
+        from views.render import APIResponse
+
+        response = APIResponse(data={"symbol": "PEPE"}, is_pagination=False)
+        sent = await collect(CompressionMiddleware(response), [(b"accept-encoding", b"br")])
+
+        self.assertNotIn(b"content-encoding", dict(sent[0]["headers"]))
+        self.assertEqual(sent[1]["body"], response.body)
+
+    async def test_raw_response_sends_stored_variant(self):
+        from middleware.compression import CompressionMiddleware
+        from utils.compression import precompress
+        from views.render import RawAPIResponse
+
+        body = b'{"data":"' + b"pepe " * 1000 + b'"}'
+        variants = precompress(body)
+
+        sent = await collect(CompressionMiddleware(RawAPIResponse(body, variants=variants)), [(b"accept-encoding", b"br")])
+        headers = dict(sent[0]["headers"])
+        self.assertEqual(headers[b"content-encoding"], b"br")
+        self.assertIs(sent[1]["body"], variants["br"])
+        self.assertEqual(brotli.decompress(sent[1]["body"]), body)
+
+        sent = await collect(RawAPIResponse(body, variants=variants), [])
+        self.assertNotIn(b"content-encoding", dict(sent[0]["headers"]))
+        self.assertEqual(sent[1]["body"], body)
+
+
+if __name__ == '__main__':
+    unittest.main()
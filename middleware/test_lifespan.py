@@ -0,0 +1,79 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+
+class TestWarmUp(unittest.IsolatedAsyncioTestCase):
+
+    def _app(self, lock_acquired: bool):
+        app = MagicMock()
+        master_cache = app.state.context.mastercache.backend
+        master_cache.set = AsyncMock(return_value=lock_acquired)
+        master_cache.delete = AsyncMock()
+        master_cache.exists = AsyncMock(return_value=True)
+        app.state.ready = False
+        return app
+
+    async def test_lock_holder_runs_warmers_with_bounded_concurrency(self):
+        from middleware import lifespan
+
+        running, peak = 0, 0
+
+        async def job():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0)
+            running -= 1
+
+        app = self._app(lock_acquired=True)
+        with patch.dict(lifespan.warmup_dict, {"test": lambda request: [job() for _ in range(6)]}, clear=True), \
+                patch.object(lifespan.settings, "CACHE_WARMUP", ["test"]), \
+                patch.object(lifespan.settings, "CACHE_WARMUP_CONCURRENCY", 2):
+            await lifespan.warm_up(app)
+
+        self.assertTrue(app.state.ready)
+        self.assertEqual(peak, 2)
+        app.state.context.mastercache.backend.delete.assert_awaited_once_with(lifespan.WARMUP_LOCK_KEY)
+
+    async def test_other_workers_wait_for_the_holder(self):
+        from middleware import lifespan
+
+        warmer = MagicMock(return_value=[])
+        app = self._app(lock_acquired=False)
+        with patch.dict(lifespan.warmup_dict, {"test": warmer}, clear=True), \
+                patch.object(lifespan.settings, "CACHE_WARMUP", ["test"]):
+            await lifespan.warm_up(app)
+
+        self.assertTrue(app.state.ready)
+        warmer.assert_not_called()
+        app.state.context.mastercache.backend.exists.assert_awaited_with(lifespan.WARMUP_DONE_KEY)
+
+
+class TestPeriodicJobs(unittest.IsolatedAsyncioTestCase):
+
+    async def test_job_runs_on_the_lock_holder_which_keeps_the_lock(self):
+        from middleware import lifespan
+
+        context = MagicMock()
+        backend = context.mastercache.backend
+        # Another worker holds the first interval
+        backend.set = AsyncMock(side_effect=[False, True, False])
+        backend.expire = AsyncMock()
+        done = asyncio.Event()
+
+        async def job():
+            # Longer than the lock, which is extended meanwhile
+            await asyncio.sleep(0.7)
+            done.set()
+
+        task = asyncio.create_task(lifespan.run_on_one_worker(context, "job:lock", 0.01, job))
+        await asyncio.wait_for(done.wait(), 2)
+        task.cancel()
+
+        backend.expire.assert_awaited_with("job:lock", 1)
+        self.assertEqual(backend.set.await_args_list[1].kwargs, {"ex": 1, "nx": True})
+
+
+if __name__ == '__main__':
+    unittest.main()
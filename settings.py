@@ -95,9 +95,83 @@ EXPIRES_FOR_REFRESH_TOKEN = int(os.getenv('EXPIRES_FOR_REFRESH_TOKEN', 86400 * 3
 # Intelligence Page Cache Time
 EXPIRES_FOR_INTELLIGENCE = int(os.getenv('EXPIRES_FOR_INTELLIGENCE', 60 * 3))
 
+# Age after which a cached intelligence page is served stale while one worker refreshes it
+EXPIRES_FOR_INTELLIGENCE_SOFT = int(os.getenv('EXPIRES_FOR_INTELLIGENCE_SOFT', 30))
+
+# Longest wait for another worker to build a missing intelligence page before building it too
+INTELLIGENCE_PAGE_WAIT_TIMEOUT = float(os.getenv('INTELLIGENCE_PAGE_WAIT_TIMEOUT', 2))
+
+# Store the rendered response bytes with each cached intelligence page and return them as is on a hit
+INTELLIGENCE_PAGE_CACHE_BODY = os.getenv('INTELLIGENCE_PAGE_CACHE_BODY', 'true').lower() == 'true'
+
+# Response encodings in order of preference (br, gzip; empty disables compression) and the smallest body compressed.
+# Cached pages and responses store their variants compressed once at the highest level
+RESPONSE_COMPRESSION = [name for name in os.getenv('RESPONSE_COMPRESSION', 'br,gzip').split(',') if name]
+RESPONSE_COMPRESSION_MIN_SIZE = int(os.getenv('RESPONSE_COMPRESSION_MIN_SIZE', 1024))
+
+# Lifetime of the rendered responses (and ETags) of the intelligence detail, token info and entities endpoints
+EXPIRES_FOR_RESPONSE_CACHE = int(os.getenv('EXPIRES_FOR_RESPONSE_CACHE', 5))
+
+# Most intelligence ids the latest entities endpoint reads per request, further ids are ignored
+INTELLIGENCE_ENTITIES_MAX_IDS = int(os.getenv('INTELLIGENCE_ENTITIES_MAX_IDS', 100))
+
 # Intelligence Real-time Hot Data Cache Time
 EXPIRES_FOR_INTELLIGENCE_HOT_DATA = int(os.getenv('EXPIRES_FOR_INTELLIGENCE_HOT_DATA', 3600 * 24 * 3))
 
+# Intelligence Feed Index Item Cache Time
+EXPIRES_FOR_FEED_ITEM = int(os.getenv('EXPIRES_FOR_FEED_ITEM', 60 * 3))
+
+# Number of newest intelligence kept per feed index sorted set
+FEED_INDEX_MAX_LENGTH = int(os.getenv('FEED_INDEX_MAX_LENGTH', 1000))
+
+# Intelligence filter counter lifetime, refreshed by every reconciliation while the counter is in use
+EXPIRES_FOR_INTELLIGENCE_COUNTER = int(os.getenv('EXPIRES_FOR_INTELLIGENCE_COUNTER', 3600 * 24))
+
+# Interval of the intelligence counter reconciliation against Postgres
+INTELLIGENCE_COUNTER_RECONCILE_INTERVAL = int(os.getenv('INTELLIGENCE_COUNTER_RECONCILE_INTERVAL', 60 * 10))
+
+# Demand-driven prefetch of intelligence pages: a page is prefetched when at least PREFETCH_THRESHOLD of the
+# readers of the current page (once it has PREFETCH_MIN_SAMPLES views) went on to it, up to PREFETCH_MAX_DEPTH pages ahead
+PREFETCH_THRESHOLD = float(os.getenv('PREFETCH_THRESHOLD', 0.3))
+PREFETCH_MIN_SAMPLES = int(os.getenv('PREFETCH_MIN_SAMPLES', 20))
+PREFETCH_MAX_DEPTH = int(os.getenv('PREFETCH_MAX_DEPTH', 3))
+
+# Prefetch jobs run per worker at once, queued per worker (more are dropped), and their cross-worker claim lifetime
+PREFETCH_CONCURRENCY = int(os.getenv('PREFETCH_CONCURRENCY', 2))
+PREFETCH_QUEUE_SIZE = int(os.getenv('PREFETCH_QUEUE_SIZE', 100))
+PREFETCH_JOB_TTL = int(os.getenv('PREFETCH_JOB_TTL', 10))
+
+# Lifetime of the page transition statistics of a filter since its last view
+PREFETCH_STATS_TTL = int(os.getenv('PREFETCH_STATS_TTL', 3600))
+
+# Cache warmers run by one worker at startup before the workers report ready (see /ready), the number of
+# default list pages warmed, the warm-up jobs run at once, and the longest warm-up / wait for it in seconds
+CACHE_WARMUP = [name for name in os.getenv('CACHE_WARMUP', 'intelligence_pages,link_types,latest_entities,ai_agents').split(',') if name]
+CACHE_WARMUP_PAGES = int(os.getenv('CACHE_WARMUP_PAGES', 3))
+CACHE_WARMUP_CONCURRENCY = int(os.getenv('CACHE_WARMUP_CONCURRENCY', 4))
+CACHE_WARMUP_TIMEOUT = int(os.getenv('CACHE_WARMUP_TIMEOUT', 60))
+
+# Optional in-process L1 cache in front of the Redis replica, entries per worker (0, the default, disables it) and
+# lifetime in seconds; writes then publish invalidations so every worker drops its copies
+CACHE_LOCAL_SIZE = int(os.getenv('CACHE_LOCAL_SIZE', 0))
+CACHE_LOCAL_TTL = float(os.getenv('CACHE_LOCAL_TTL', 2))
+
+# Sliding TTL refreshes of cache hits, flushed to the master in one pipeline every CACHE_TOUCH_INTERVAL seconds
+# (0 sends an EXPIRE per hit); CACHE_TOUCH_MIN_REMAINING > 0 only refreshes keys with fewer seconds left
+CACHE_TOUCH_INTERVAL = float(os.getenv('CACHE_TOUCH_INTERVAL', 0.5))
+CACHE_TOUCH_MIN_REMAINING = int(os.getenv('CACHE_TOUCH_MIN_REMAINING', 0))
+
+# In-process snapshots of the live token market data per worker: entries (0 disables), longest lifetime in seconds
+# without a keyspace notification, the keyspace pattern followed on the master and the batching of re-reads
+TOKEN_SNAPSHOT_SIZE = int(os.getenv('TOKEN_SNAPSHOT_SIZE', 10000))
+TOKEN_SNAPSHOT_TTL = float(os.getenv('TOKEN_SNAPSHOT_TTL', 30))
+TOKEN_SNAPSHOT_PATTERN = os.getenv('TOKEN_SNAPSHOT_PATTERN', '__keyspace@*__:token:network:*')
+TOKEN_SNAPSHOT_REFRESH_INTERVAL = float(os.getenv('TOKEN_SNAPSHOT_REFRESH_INTERVAL', 0.2))
+
+# Codec of large cache values (pages, showed tokens, author / chain infos): zstd, lz4 or none, smaller values stay plain
+CACHE_CODEC = os.getenv('CACHE_CODEC', 'zstd')
+CACHE_CODEC_MIN_SIZE = int(os.getenv('CACHE_CODEC_MIN_SIZE', 512))
+
 # Intelligence Author Info Cache Time
 EXPIRES_FOR_AUTHOR_INFO = int(os.getenv('EXPIRES_FOR_AUTHOR_INFO', 60 * 10))
 
@@ -113,12 +187,23 @@ EXPIRES_FOR_SEARCH_TOKEN = int(os.getenv('EXPIRES_FOR_SEARCH_TOKEN', 60 * 10))
 # Search Token Cache Time
 EXPIRES_FOR_LATEST_APPEAR_TOKEN = int(os.getenv('EXPIRES_FOR_SEARCH_TOKEN', 60))
 
+# Pages after a /token/latest cursor pre-cached together, read with one query
+LATEST_APPEAR_TOKEN_FOLLOW_PAGES = int(os.getenv('LATEST_APPEAR_TOKEN_FOLLOW_PAGES', 5))
+
 # Token URLs Cache Time
 EXPIRES_FOR_TOKEN_URLS = int(os.getenv('EXPIRES_FOR_SEARCH_TOKEN', 86400 * 3))
 
 # AI Agent List Cache Time
 EXPIRES_FOR_AI_AGENT_LIST = int(os.getenv('EXPIRES_FOR_AI_AGENT_LIST', 60 * 5))
 
+# Read token highest increase rates from the token_increase_rate table instead of aggregating entity_intelligence,
+# and the interval of its incremental refresh
+INCREASE_RATE_FROM_TABLE = os.getenv('INCREASE_RATE_FROM_TABLE', 'true').lower() == 'true'
+INCREASE_RATE_REFRESH_INTERVAL = int(os.getenv('INCREASE_RATE_REFRESH_INTERVAL', 60))
+
+# Most tokens the batch token info endpoint resolves per request, further tokens are ignored
+TOKEN_INFO_BATCH_MAX = int(os.getenv('TOKEN_INFO_BATCH_MAX', 50))
+
 # The Highest Increase Rate Cache Time
 EXPIRES_FOR_HIGHEST_INCREASE_RATE = int(os.getenv('EXPIRES_FOR_AI_AGENT_LIST', 60 * 30))
 
@@ -157,4 +242,17 @@ TASK_WORKER = os.getenv('TASK_WORKER', 'TaskWorker')
 PULL_WORKER = os.getenv('PULL_WORKER', 'PullWorker')
 
 
-EXPIRES_FOR_TOKEN_SOCIAL_LINK_TYPES = int(os.getenv('EXPIRES_FOR_TOKEN_SOCIAL_LINK_TYPES', 3600 * 12))
\ No newline at end of file
+EXPIRES_FOR_TOKEN_SOCIAL_LINK_TYPES = int(os.getenv('EXPIRES_FOR_TOKEN_SOCIAL_LINK_TYPES', 3600 * 12))
+
+# Serve token social links from an index held by every worker, refreshed by delta every SOCIAL_LINK_REFRESH_INTERVAL
+# seconds and reloaded in full every SOCIAL_LINK_RELOAD_INTERVAL seconds
+SOCIAL_LINK_INDEX = os.getenv('SOCIAL_LINK_INDEX', 'true').lower() == 'true'
+SOCIAL_LINK_REFRESH_INTERVAL = int(os.getenv('SOCIAL_LINK_REFRESH_INTERVAL', 60))
+SOCIAL_LINK_RELOAD_INTERVAL = int(os.getenv('SOCIAL_LINK_RELOAD_INTERVAL', 3600))
+
+
+# Serve /token/latest from a feed of the newest LATEST_TOKENS_SIZE displayed tokens kept in Redis and copied by
+# every worker, published and synced every LATEST_TOKENS_REFRESH_INTERVAL seconds
+LATEST_TOKENS_FEED = os.getenv('LATEST_TOKENS_FEED', 'true').lower() == 'true'
+LATEST_TOKENS_SIZE = int(os.getenv('LATEST_TOKENS_SIZE', 1000))
+LATEST_TOKENS_REFRESH_INTERVAL = int(os.getenv('LATEST_TOKENS_REFRESH_INTERVAL', 5))
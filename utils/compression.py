@@ -0,0 +1,57 @@
+"""
+Response body compression (brotli / gzip) shared by the compression middleware and cached responses
+"""
+import gzip
+import brotli
+import settings
+
+
+__all__ = ["choose_encoding", "compress", "precompress", "encoded_etag"]
+
+# Levels of bodies compressed per response (fast) and of cached variants compressed once (small)
+DYNAMIC_LEVELS = {"br": 4, "gzip": 6}
+STATIC_LEVELS = {"br": 9, "gzip": 9}
+
+
+def choose_encoding(accept_encoding: str | None) -> str | None:
+    """
+    Preferred encoding of settings.RESPONSE_COMPRESSION the client accepts (q=0 excluded), None for identity
+    """
+    if not accept_encoding:
+        return None
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(name.strip())
+    return next(
+        (encoding for encoding in settings.RESPONSE_COMPRESSION if encoding in accepted or "*" in accepted),
+        None
+    )
+
+
+def compress(body: bytes, encoding: str, static: bool = False) -> bytes:
+    """
+    Compress a body with an encoding ('br' / 'gzip')
+    """
+    level = (STATIC_LEVELS if static else DYNAMIC_LEVELS)[encoding]
+    if encoding == "br":
+        return brotli.compress(body, quality=level)
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+def precompress(body: bytes) -> dict[str, bytes]:
+    """
+    Compressed variants of a cached body in every enabled encoding, empty for small bodies
+    """
+    if len(body) < settings.RESPONSE_COMPRESSION_MIN_SIZE:
+        return {}
+    return {encoding: compress(body, encoding, static=True) for encoding in settings.RESPONSE_COMPRESSION}
+
+
+def encoded_etag(etag: str) -> str:
+    """
+    ETag of an encoded representation, weakened since its bytes differ from the identity body it was computed on
+    """
+    return etag if etag.startswith("W/") else f"W/{etag}"
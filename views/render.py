@@ -19,6 +19,10 @@ from fastapi import status
 from fastapi.responses import ORJSONResponse
 from fastapi.encoders import jsonable_encoder
 from uuid import UUID
+from starlette.datastructures import Headers
+from starlette.types import Scope, Receive, Send
+from utils.compression import choose_encoding, encoded_etag
+import xxhash
 
 
 class Text(PlainTextResponse):
@@ -183,6 +187,46 @@ class HTTPException(FastAPIHTTPException):
         return Json(_exc.data, code=_exc.code, message=_exc.message, status_code=_exc.status_code, headers=_exc.headers)
 
 
+def make_etag(body: bytes) -> str:
+    """
+    Strong ETag of a response body
+    """
+    return f'"{xxhash.xxh3_64_hexdigest(body)}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    Whether an If-None-Match header value matches the ETag (weak comparison, as RFC 9110 specifies for it)
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag.removeprefix("W/") in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+
+class NotModified(BaseResponse):
+    """
+    304 response of a conditional request whose ETag matches
+    """
+
+    def __init__(self, etag: str, background: BackgroundTask | None = None) -> None:
+        super().__init__(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}, background=background)
+
+
+class ConditionalResponse:
+    """
+    Mixin answering a 200 response with 304 Not Modified when the request's If-None-Match matches its ETag
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        etag = self.headers.get("etag")
+        if etag and self.status_code == status.HTTP_200_OK and etag_matches(Headers(scope=scope).get("if-none-match"), etag):
+            await NotModified(etag, background=self.background)(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
 # Define custom JsonEncoder
 custom_encoder = {
     Decimal: lambda v: str(v.quantize(Decimal('0.000000000000000001'))),  # Convert Decimal to string
@@ -191,7 +235,7 @@ custom_encoder = {
 }
 
 
-class APIResponse(ORJSONResponse):
+class APIResponse(ConditionalResponse, ORJSONResponse):
     def __init__(
             self,
             data: Optional[List[Any]] | BaseModel | Dict = None,
@@ -202,12 +246,23 @@ class APIResponse(ORJSONResponse):
             total: int = 0,
             status_code: int = status.HTTP_200_OK,
             is_pagination: bool = True,
+            cursor: Optional[str] = None,
+            next_cursor: Optional[str] = None,
             **kwargs
     ):
         pagination: Optional[dict[str, Any]] = None
         total_page: int = 0
 
-        if isinstance(data, list) and is_pagination:
+        if isinstance(data, list) and is_pagination and cursor is not None:
+            # Keyset pagination, has_next comes from the extra row fetched by the query instead of a COUNT
+            pagination = {
+                "size": page_size,
+                "cursor": cursor,
+                "next_cursor": next_cursor,
+                "has_next": next_cursor is not None
+            }
+
+        elif isinstance(data, list) and is_pagination:
             has_next_page: bool = False
 
             if total is not None:
@@ -230,3 +285,37 @@ class APIResponse(ORJSONResponse):
             **kwargs
         }
         super().__init__(content=jsonable_encoder(self.data, custom_encoder=custom_encoder), status_code=status_code)
+        self.headers["ETag"] = make_etag(self.body)
+
+
+class RawAPIResponse(ConditionalResponse, BaseResponse):
+    """
+    Response of an already rendered APIResponse body (e.g. a cached page), sent as is without re-encoding
+    """
+    media_type = 'application/json'
+
+    def __init__(
+            self,
+            body: bytes,
+            status_code: int = status.HTTP_200_OK,
+            headers: Mapping[str, str] | None = None,
+            background: BackgroundTask | None = None,
+            etag: str | None = None,
+            variants: Mapping[str, bytes] | None = None
+    ):
+        super().__init__(content=body, status_code=status_code, headers=headers, background=background)
+        # Pass the ETag stored with a cached body to skip hashing it again
+        self.headers["ETag"] = etag or make_etag(body)
+        # Pre-compressed bodies by encoding, sent instead of compressing the body per request
+        self.variants = variants or {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self.variants:
+            self.headers.add_vary_header("Accept-Encoding")
+            encoding = choose_encoding(Headers(scope=scope).get("accept-encoding"))
+            if encoding in self.variants:
+                self.body = self.variants[encoding]
+                self.headers["Content-Encoding"] = encoding
+                self.headers["Content-Length"] = str(len(self.body))
+                self.headers["ETag"] = encoded_etag(self.headers["etag"])
+        await super().__call__(scope, receive, send)